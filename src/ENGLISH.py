@@ -1,24 +1,32 @@
+import os
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, colorchooser
-import qrcode
-from barcode import EAN13, Code128, Code39, UPCA, ISBN13, PZN, JAN, EAN8, ISBN10, ISSN, ITF, Gs1_128
-from barcode.writer import ImageWriter
-from pylibdmtx.pylibdmtx import encode as dmtx_encode
-from PIL import Image, ImageTk, ImageDraw, ImageOps
-from io import BytesIO
-import pdf417gen
-import pyqrcodeng
+from PIL import ImageTk
 import ttkbootstrap as ttkb
-from reportlab.pdfgen import canvas
-import base64
-import svgwrite
-from reportlab.lib.utils import ImageReader
+from barcode_core import (BARCODE_TYPES, LINEAR_TYPES, FILE_TYPES, DEFAULT_TEMPLATE, save_code,
+                          run_batch, default_workers, plan_outputs, parse_grid,
+                          write_label_sheet, read_rows, Manifest, MANIFEST_NAME,
+                          ArchiveWriter, write_tiff_pages, PROFILES, save_formats, format_paths,
+                          PreviewWorker, PREVIEW_SIZE, PREVIEW_DELAY_MS, generate_preview, Scheduler,
+                          BatchCancelled)
 
 
 class BarcodeGenerator:
     def __init__(self, root):
         self.root = root
+        # The scheduler owns the worker pool: previews and single saves go first, batches use what is left.
+        self.scheduler = Scheduler()
+        self.batch_job = None
+        # Previews render on a background thread; only the newest request is kept.
+        self.preview_worker = PreviewWorker(self.render_preview)
+        self.preview_window = None
+        self.preview_job = None
+        self.preview_poll = None
         self.setup_ui()
+        # While the preview pane is open, any edit re-renders it once typing pauses.
+        self.root.bind_all('<KeyRelease>', self.schedule_preview, add='+')
+        self.root.bind_all('<<ComboboxSelected>>', self.schedule_preview, add='+')
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
     def setup_ui(self):
         self.root.title("Enhanced QR Code & Barcode Generator")
@@ -32,9 +40,7 @@ class BarcodeGenerator:
 
         ttk.Label(frame, text="Select Code Type:", style='TLabel').grid(row=0, column=0, sticky=tk.W, pady=5)
         self.barcode_type_combobox = ttk.Combobox(frame,
-                                                  values=["QR Code", "EAN13", "EAN8", "Code128", "Code39", "UPCA",
-                                                          "ISBN13", "ISBN10", "ISSN", "PZN", "JAN", "ITF", "GS1-128",
-                                                          "DataMatrix", "Aztec", "PDF417"], state="readonly",
+                                                  values=BARCODE_TYPES, state="readonly",
                                                   style='TCombobox')
         self.barcode_type_combobox.grid(row=0, column=1, sticky=(tk.W, tk.E), pady=5)
         self.barcode_type_combobox.current(0)
@@ -121,6 +127,79 @@ class BarcodeGenerator:
         self.batch_entry.grid(row=0, column=1, sticky=(tk.W, tk.E), pady=5)
         self.batch_entry.insert(0, "data1,data2,data3")  # Placeholder for batch data
 
+        ttk.Label(self.batch_frame, text="Worker Processes:", style='TLabel').grid(row=1, column=0, sticky=tk.W,
+                                                                                   pady=5)
+        self.workers_entry = ttk.Entry(self.batch_frame, width=10, style='TEntry')
+        self.workers_entry.grid(row=1, column=1, sticky=(tk.W, tk.E), pady=5)
+        self.workers_entry.insert(0, str(default_workers()))
+
+        ttk.Label(self.batch_frame, text="Filename Template:", style='TLabel').grid(row=2, column=0, sticky=tk.W,
+                                                                                    pady=5)
+        self.template_entry = ttk.Entry(self.batch_frame, width=40, style='TEntry')
+        self.template_entry.grid(row=2, column=1, sticky=(tk.W, tk.E), pady=5)
+        self.template_entry.insert(0, DEFAULT_TEMPLATE)
+
+        ttk.Label(self.batch_frame, text="Output Format:", style='TLabel').grid(row=3, column=0, sticky=tk.W, pady=5)
+        self.format_combobox = ttk.Combobox(self.batch_frame, values=[pattern[2:] for _, pattern in FILE_TYPES],
+                                            state="readonly", style='TCombobox')
+        self.format_combobox.grid(row=3, column=1, sticky=(tk.W, tk.E), pady=5)
+        self.format_combobox.current(0)
+
+        self.sheet_var = tk.IntVar()
+        self.sheet_checkbutton = ttk.Checkbutton(self.batch_frame, text="Label Sheet PDF", variable=self.sheet_var,
+                                                 style='TCheckbutton')
+        self.sheet_checkbutton.grid(row=4, column=0, sticky=tk.W)
+        self.grid_entry = ttk.Entry(self.batch_frame, width=10, style='TEntry')
+        self.grid_entry.grid(row=4, column=1, sticky=(tk.W, tk.E), pady=5)
+        self.grid_entry.insert(0, "10x3")
+
+        ttk.Label(self.batch_frame, text="Input File:", style='TLabel').grid(row=5, column=0, sticky=tk.W, pady=5)
+        self.input_entry = ttk.Entry(self.batch_frame, width=40, style='TEntry')
+        self.input_entry.grid(row=5, column=1, sticky=(tk.W, tk.E), pady=5)
+        ttk.Button(self.batch_frame, text="...", width=3, command=self.choose_input_file).grid(row=5, column=2, padx=5)
+
+        self.archive_var = tk.IntVar()
+        ttk.Checkbutton(self.batch_frame, text="Save as Archive", variable=self.archive_var,
+                        style='TCheckbutton').grid(row=6, column=0, sticky=tk.W)
+
+        self.tiff_var = tk.IntVar()
+        ttk.Checkbutton(self.batch_frame, text="Multi-page TIFF (DPI)", variable=self.tiff_var,
+                        style='TCheckbutton').grid(row=7, column=0, sticky=tk.W)
+        self.dpi_entry = ttk.Entry(self.batch_frame, width=10, style='TEntry')
+        self.dpi_entry.grid(row=7, column=1, sticky=(tk.W, tk.E), pady=5)
+        self.dpi_entry.insert(0, "300")
+
+        ttk.Label(self.batch_frame, text="Output Profile:", style='TLabel').grid(row=8, column=0, sticky=tk.W, pady=5)
+        self.profile_combobox = ttk.Combobox(self.batch_frame, values=list(PROFILES), state="readonly",
+                                             style='TCombobox')
+        self.profile_combobox.grid(row=8, column=1, sticky=(tk.W, tk.E), pady=5)
+        self.profile_combobox.current(0)
+
+        # Extra formats written next to a single saved code, encoded only once
+        ttk.Label(frame, text="Also Save As:", style='TLabel').grid(row=6, column=0, sticky=tk.W, pady=5)
+        self.extra_formats_entry = ttk.Entry(frame, width=40, style='TEntry')
+        self.extra_formats_entry.grid(row=6, column=1, sticky=(tk.W, tk.E), pady=5)
+
+        # Optional physical size; modules are snapped to whole printer pixels
+        ttk.Label(frame, text="Print Width (mm):", style='TLabel').grid(row=7, column=0, sticky=tk.W, pady=5)
+        self.size_entry = ttk.Entry(frame, width=10, style='TEntry')
+        self.size_entry.grid(row=7, column=1, sticky=(tk.W, tk.E), pady=5)
+
+        ttk.Label(frame, text="Printer DPI:", style='TLabel').grid(row=8, column=0, sticky=tk.W, pady=5)
+        self.print_dpi_entry = ttk.Entry(frame, width=10, style='TEntry')
+        self.print_dpi_entry.grid(row=8, column=1, sticky=(tk.W, tk.E), pady=5)
+        self.print_dpi_entry.insert(0, "300")
+
+        # Progress of the running batch with its ETA; shown only while a batch runs
+        self.progress_frame = ttk.Frame(frame, style='TFrame')
+        self.progress_frame.grid(row=10, column=0, columnspan=2, pady=5, sticky=(tk.W, tk.E))
+        self.progress_label = ttk.Label(self.progress_frame, style='TLabel')
+        self.progress_label.grid(row=0, column=0, sticky=tk.W)
+        self.pause_button = ttk.Button(self.progress_frame, text="Pause", command=self.toggle_pause)
+        self.pause_button.grid(row=0, column=1, padx=5)
+        ttk.Button(self.progress_frame, text="Cancel", command=self.cancel_batch).grid(row=0, column=2)
+        self.progress_frame.grid_remove()
+
         button_frame = ttk.Frame(frame, style='TFrame')
         button_frame.grid(row=12, column=0, columnspan=2, pady=10)
 
@@ -146,8 +225,7 @@ class BarcodeGenerator:
         if barcode_type == 'QR Code':
             self.qr_settings_frame.grid()
             self.barcode_settings_frame.grid_remove()
-        elif barcode_type in ['EAN13', 'EAN8', 'Code128', 'Code39', 'UPCA', 'ISBN13', 'ISBN10', 'ISSN', 'PZN', 'JAN',
-                              'ITF', 'GS1-128']:
+        elif barcode_type in LINEAR_TYPES:
             self.qr_settings_frame.grid_remove()
             self.barcode_settings_frame.grid()
         else:
@@ -158,284 +236,385 @@ class BarcodeGenerator:
         color_code = colorchooser.askcolor(title="Choose color")[1]
         if color_code:
             btn.config(bg=color_code)
-
-    def on_generate_or_preview(self, preview=False):
-        fill_color = self.fill_color_btn['bg'] if self.fill_color_btn['bg'] != "SystemButtonFace" else "black"
-        back_color = self.back_color_btn['bg'] if self.back_color_btn['bg'] != "SystemButtonFace" else "white"
-
+            self.schedule_preview()
+
+    def choose_input_file(self):
+        file_path = filedialog.askopenfilename(title="Choose batch input file",
+                                               filetypes=[("CSV files", "*.csv"), ("JSON Lines files", "*.jsonl"),
+                                                          ("Text files", "*.txt"), ("All files", "*.*")])
+        if file_path:
+            self.input_entry.delete(0, tk.END)
+            self.input_entry.insert(0, file_path)
+
+    def batch_rows(self):
+        input_path = self.input_entry.get().strip()
+        if input_path:
+            return read_rows(input_path)
+        return [data.strip() for data in self.batch_entry.get().split(',')]
+
+    def current_colors(self):
+        fill_color = self.fill_color_btn['bg']
+        back_color = self.back_color_btn['bg']
         if fill_color == "SystemButtonFace":
             fill_color = "black"
         if back_color == "SystemButtonFace":
             back_color = "white"
+        return fill_color, back_color
+
+    def on_generate_or_preview(self, preview=False):
+        if preview:
+            self.show_preview()
+            return
+        fill_color, back_color = self.current_colors()
 
+        filetypes = [(f"{name} files", pattern) for name, pattern in FILE_TYPES] + [("All files", "*.*")]
         try:
             if self.batch_var.get() == 1:
-                batch_data = self.batch_entry.get().split(',')
-                for data in batch_data:
-                    img = self.generate_image(data.strip(), fill_color, back_color)
-                    if not preview:
-                        output_path = filedialog.asksaveasfilename(defaultextension=".png",
-                                                                   filetypes=[("PNG files", "*.png"),
-                                                                              ("JPG files", "*.jpg"),
-                                                                              ("BMP files", "*.bmp"),
-                                                                              ("GIF files", "*.gif"),
-                                                                              ("TIFF files", "*.tiff"),
-                                                                              ("ICO files", "*.ico"),
-                                                                              ("WEBP files", "*.webp"),
-                                                                              ("SVG files", "*.svg"),
-                                                                              ("PDF files", "*.pdf"),
-                                                                              ("EPS files", "*.eps"),
-                                                                              ("PBM files", "*.pbm"),
-                                                                              ("PGM files", "*.pgm"),
-                                                                              ("PPM files", "*.ppm"),
-                                                                              ("XBM files", "*.xbm"),
-                                                                              ("XPM files", "*.xpm"),
-                                                                              ("PCX files", "*.pcx"),
-                                                                              ("TGA files", "*.tga"),
-                                                                              ("All files", "*.*")])
-                        if output_path:
-                            self.save_image(img, output_path)
+                if self.batch_job is not None and not self.batch_job.future.done():
+                    raise ValueError("A batch export is already running")
+                batch_data = self.batch_rows()
+                if self.sheet_var.get() == 1:
+                    output_path = filedialog.asksaveasfilename(defaultextension=".pdf", filetypes=[("PDF", "*.pdf")],
+                                                               title="Save label sheet")
+                    if output_path:
+                        self.start_sheet(batch_data, output_path, fill_color, back_color)
+                elif self.tiff_var.get() == 1:
+                    output_path = filedialog.asksaveasfilename(defaultextension=".tif", title="Save multi-page TIFF",
+                                                               filetypes=[("TIFF", "*.tif *.tiff")])
+                    if output_path:
+                        self.start_tiff(batch_data, output_path)
+                elif self.archive_var.get() == 1:
+                    output_path = filedialog.asksaveasfilename(
+                        defaultextension=".zip", title="Save archive",
+                        filetypes=[("ZIP", "*.zip"), ("TAR", "*.tar"), ("TAR.GZ", "*.tar.gz")])
+                    if output_path:
+                        self.start_archive(batch_data, output_path, fill_color, back_color)
+                else:
+                    directory = filedialog.askdirectory(title="Choose output folder")
+                    if directory:
+                        self.start_batch(batch_data, directory, fill_color, back_color)
             else:
                 data = self.data_entry.get()
-                img = self.generate_image(data, fill_color, back_color)
-                if preview:
-                    self.preview_image(img)
-                else:
-                    output_path = filedialog.asksaveasfilename(defaultextension=".png",
-                                                               filetypes=[("PNG files", "*.png"),
-                                                                          ("JPG files", "*.jpg"),
-                                                                          ("BMP files", "*.bmp"),
-                                                                          ("GIF files", "*.gif"),
-                                                                          ("TIFF files", "*.tiff"),
-                                                                          ("ICO files", "*.ico"),
-                                                                          ("WEBP files", "*.webp"),
-                                                                          ("SVG files", "*.svg"),
-                                                                          ("PDF files", "*.pdf"),
-                                                                          ("EPS files", "*.eps"),
-                                                                          ("PBM files", "*.pbm"),
-                                                                          ("PGM files", "*.pgm"),
-                                                                          ("PPM files", "*.ppm"),
-                                                                          ("XBM files", "*.xbm"),
-                                                                          ("XPM files", "*.xpm"),
-                                                                          ("PCX files", "*.pcx"),
-                                                                          ("TGA files", "*.tga"),
-                                                                          ("All files", "*.*")])
-                    if output_path:
-                        self.save_image(img, output_path)
+                output_path = filedialog.asksaveasfilename(defaultextension=".png", filetypes=filetypes)
+                if output_path:
+                    self.save_code(data, output_path, fill_color, back_color)
         except Exception as e:
             messagebox.showerror("Error", f"An error occurred: {e}")
 
-    def generate_image(self, data, fill_color="black", back_color="white"):
+    def start_batch(self, batch_data, directory, fill_color, back_color):
+        workers = int(self.workers_entry.get())
+        if workers < 1:
+            raise ValueError("Worker count must be at least 1")
         barcode_type = self.barcode_type_combobox.get()
-        if barcode_type == 'QR Code':
-            version = int(self.version_entry.get())
-            error_correction = self.error_correction_combobox.get()
-            box_size = int(self.box_size_entry.get())
-            border = int(self.border_entry.get())
-            self.validate_inputs(data, barcode_type, version, box_size, border, None, None, None, None)
-            img = self.generate_qr_code(data, version, error_correction, box_size, border, fill_color=fill_color,
-                                        back_color=back_color)
-        elif barcode_type == 'DataMatrix':
-            img = self.generate_datamatrix(data, fill_color=fill_color, back_color=back_color)
-        elif barcode_type == 'Aztec':
-            img = self.generate_aztec(data, fill_color=fill_color, back_color=back_color)
-        elif barcode_type == 'PDF417':
-            img = self.generate_pdf417(data, fill_color=fill_color, back_color=back_color)
+        options = self.get_options()
+        profile = self.profile_combobox.get()
+        items = plan_outputs(batch_data, directory, self.template_entry.get(), self.format_combobox.get(),
+                             barcode_type)
+        # Finished items are checkpointed in the folder, so an interrupted export can pick up where it stopped
+        manifest_path = os.path.join(directory, MANIFEST_NAME)
+        if os.path.exists(manifest_path) and not messagebox.askyesno(
+                "Resume export", "This folder has a checkpoint from an earlier export.\n"
+                                 "Skip the images it already saved and continue from there?"):
+            os.remove(manifest_path)
+
+        def export(mapper):
+            with Manifest(manifest_path) as manifest:
+                return list(run_batch(items, barcode_type, fill_color, back_color, manifest=manifest,
+                                      profile=profile, mapper=mapper, **options))
+
+        self.track_batch(self.scheduler.start(export, total=self.batch_total(batch_data), limit=workers))
+        self.root.after(100, self.poll_batch, self.batch_job.future)
+
+    def poll_batch(self, future):
+        if not future.done():
+            self.root.after(100, self.poll_batch, future)
+            return
+        try:
+            results = future.result()
+        except BatchCancelled:
+            messagebox.showinfo("Cancelled", "Batch export cancelled; the files already saved are kept")
+            return
+        except Exception as e:
+            messagebox.showerror("Error", f"Batch export failed: {e}")
+            return
+        failed = [result for result in results if result.error]
+        if failed:
+            details = "\n".join(f"{result.data}: {result.error}" for result in failed[:10])
+            messagebox.showerror("Error", f"{len(failed)} of {len(results)} images failed:\n{details}")
         else:
-            module_width = float(self.module_width_entry.get())
-            module_height = float(self.module_height_entry.get())
-            font_size = int(self.font_size_entry.get())
-            text_distance = int(self.text_distance_entry.get())
-            self.validate_inputs(data, barcode_type, None, None, None, module_width, module_height, font_size,
-                                 text_distance)
-            img = self.generate_barcode(data, barcode_type, module_width, module_height, font_size, text_distance,
-                                        fill_color=fill_color, back_color=back_color)
-        return img
-
-    def generate_qr_code(self, data, version, error_correction, box_size, border, fill_color="black",
-                         back_color="white"):
-        error_correction_map = {
-            "L": qrcode.constants.ERROR_CORRECT_L,
-            "M": qrcode.constants.ERROR_CORRECT_M,
-            "Q": qrcode.constants.ERROR_CORRECT_Q,
-            "H": qrcode.constants.ERROR_CORRECT_H,
-        }
-
-        qr = qrcode.QRCode(
-            version=version,
-            error_correction=error_correction_map[error_correction],
-            box_size=box_size,
-            border=border,
-        )
-        qr.add_data(data)
-        qr.make(fit=True)
-        img = qr.make_image(fill_color=fill_color, back_color=back_color).convert("RGB")
-        return img
-
-    def generate_barcode(self, data, barcode_type='EAN13', module_width=0.2, module_height=15, font_size=10,
-                         text_distance=5, fill_color="black", back_color="white"):
-        writer = ImageWriter()
-        writer.set_options({
-            'module_width': module_width,
-            'module_height': module_height,
-            'font_size': font_size,
-            'text_distance': text_distance,
-        })
-
-        if barcode_type == 'EAN13':
-            barcode = EAN13(data, writer=writer)
-        elif barcode_type == 'EAN8':
-            barcode = EAN8(data, writer=writer)
-        elif barcode_type == 'Code128':
-            barcode = Code128(data, writer=writer)
-        elif barcode_type == 'Code39':
-            barcode = Code39(data, writer=writer)
-        elif barcode_type == 'UPCA':
-            barcode = UPCA(data, writer=writer)
-        elif barcode_type == 'ISBN13':
-            barcode = ISBN13(data, writer=writer)
-        elif barcode_type == 'ISBN10':
-            barcode = ISBN10(data, writer=writer)
-        elif barcode_type == 'ISSN':
-            barcode = ISSN(data, writer=writer)
-        elif barcode_type == 'PZN':
-            barcode = PZN(data, writer=writer)
-        elif barcode_type == 'JAN':
-            barcode = JAN(data, writer=writer)
-        elif barcode_type == 'ITF':
-            barcode = ITF(data, writer=writer)
-        elif barcode_type == 'GS1-128':
-            barcode = Gs1_128(data, writer=writer)
+            resumed = sum(result.resumed for result in results)
+            reused = sum(result.duplicate_of is not None and not result.resumed for result in results)
+            note = f"\n{reused} renders saved by reusing repeated values" if reused else ""
+            if resumed:
+                note += f"\n{resumed} of them were already saved by an earlier export and skipped"
+            stats = [result.stats for result in results if result.stats is not None]
+            if stats:
+                note += (f"\n{sum(s.size for s in stats) / len(stats):.0f} bytes and "
+                         f"{sum(s.seconds for s in stats) * 1000 / len(stats):.1f} ms per rendered image")
+            messagebox.showinfo("Success", f"{len(results)} images saved successfully{note}")
+
+    def start_archive(self, batch_data, file_path, fill_color, back_color):
+        workers = int(self.workers_entry.get())
+        if workers < 1:
+            raise ValueError("Worker count must be at least 1")
+        barcode_type = self.barcode_type_combobox.get()
+        options = self.get_options()
+        profile = self.profile_combobox.get()
+        items = plan_outputs(batch_data, "", self.template_entry.get(), self.format_combobox.get(), barcode_type)
+
+        def export(mapper):
+            # Images go straight into the archive as they are rendered; the format follows the extension
+            with ArchiveWriter(file_path) as archive:
+                return list(run_batch(items, barcode_type, fill_color, back_color, archive=archive,
+                                      profile=profile, mapper=mapper, **options))
+
+        self.track_batch(self.scheduler.start(export, total=self.batch_total(batch_data), limit=workers))
+        self.root.after(100, self.poll_batch, self.batch_job.future)
+
+    def start_sheet(self, datas, file_path, fill_color, back_color):
+        workers = int(self.workers_entry.get())
+        if workers < 1:
+            raise ValueError("Worker count must be at least 1")
+        rows, columns = parse_grid(self.grid_entry.get())
+        barcode_type = self.barcode_type_combobox.get()
+        options = self.get_options()
+        self.track_batch(self.scheduler.start(write_label_sheet, datas, file_path, barcode_type, fill_color,
+                                              back_color, total=self.batch_total(datas), limit=workers, rows=rows,
+                                              columns=columns, **options))
+        self.root.after(100, self.poll_sheet, self.batch_job.future)
+
+    def start_tiff(self, datas, file_path):
+        workers = int(self.workers_entry.get())
+        if workers < 1:
+            raise ValueError("Worker count must be at least 1")
+        dpi = float(self.dpi_entry.get())
+        barcode_type = self.barcode_type_combobox.get()
+        options = self.get_options()
+        # Group 4 pages are bilevel, so the chosen colors do not apply
+        self.track_batch(self.scheduler.start(write_tiff_pages, datas, file_path, barcode_type, dpi,
+                                              total=self.batch_total(datas), limit=workers, **options))
+        self.root.after(100, self.poll_sheet, self.batch_job.future, "Multi-page TIFF")
+
+    def poll_sheet(self, future, name="Label sheet"):
+        if not future.done():
+            self.root.after(100, self.poll_sheet, future, name)
+            return
+        try:
+            result = future.result()
+        except BatchCancelled:
+            messagebox.showinfo("Cancelled", f"{name} cancelled")
+            return
+        except Exception as e:
+            messagebox.showerror("Error", f"{name} failed: {e}")
+            return
+        total = result.written + len(result.failed)
+        if result.failed:
+            details = "\n".join(f"{data}: {error}" for _, data, error in result.failed[:10])
+            messagebox.showerror("Error", f"{len(result.failed)} of {total} codes failed:\n{details}")
         else:
-            raise ValueError("Unsupported barcode type")
+            note = f"\n{result.reused} renders saved by reusing repeated values" if result.reused else ""
+            messagebox.showinfo("Success", f"{result.written} codes placed on {result.pages} page(s){note}")
 
-        barcode_bytes = BytesIO()
-        barcode.write(barcode_bytes)
-        barcode_bytes.seek(0)
-        img = Image.open(barcode_bytes).convert("RGB")
-
-        img = ImageOps.colorize(ImageOps.grayscale(img), black=fill_color, white=back_color)
-
-        return img
-
-    def generate_datamatrix(self, data, fill_color="black", back_color="white"):
-        encoded = dmtx_encode(data.encode('utf-8'))
-        img = Image.frombytes('RGB', (encoded.width, encoded.height), encoded.pixels)
-        img = ImageOps.colorize(ImageOps.grayscale(img), black=fill_color, white=back_color)
-        return img
-
-    def generate_aztec(self, data, fill_color="black", back_color="white"):
-        qr = pyqrcodeng.create(data)
-        buffer = BytesIO()
-        qr.png(buffer, scale=5, module_color=fill_color, background=back_color)
-        img = Image.open(buffer)
-        return img
-
-    def generate_pdf417(self, data, fill_color="black", back_color="white"):
-        codes = pdf417gen.encode(data)
-        img = pdf417gen.render_image(codes, scale=3, ratio=3)
-        img = ImageOps.colorize(ImageOps.grayscale(img), black=fill_color, white=back_color)
-        return img
-
-    def save_image(self, img, file_path):
+    def get_options(self):
+        barcode_type = self.barcode_type_combobox.get()
+        if barcode_type == 'QR Code':
+            options = {
+                'version': int(self.version_entry.get()),
+                'error_correction': self.error_correction_combobox.get(),
+                'box_size': int(self.box_size_entry.get()),
+                'border': int(self.border_entry.get()),
+            }
+        elif barcode_type in LINEAR_TYPES:
+            options = {
+                'module_width': float(self.module_width_entry.get()),
+                'module_height': float(self.module_height_entry.get()),
+                'font_size': int(self.font_size_entry.get()),
+                'text_distance': int(self.text_distance_entry.get()),
+            }
+        else:
+            options = {}
+        if self.size_entry.get().strip():
+            options['size_mm'] = float(self.size_entry.get())
+            options['print_dpi'] = float(self.print_dpi_entry.get())
+        return options
+
+    def save_code(self, data, file_path, fill_color, back_color):
+        extras = [extension for extension in self.extra_formats_entry.get().split(',') if extension.strip()]
+        barcode_type = self.barcode_type_combobox.get()
+        profile = self.profile_combobox.get()
+        # Runs on the scheduler's interactive lane, ahead of any batch items waiting for a worker;
+        # the job encodes before writing anything, so bad input is reported by poll_save
+        if extras:
+            future = self.scheduler.submit(save_formats, data, format_paths(file_path, extras), barcode_type,
+                                           fill_color, back_color, profile, **self.get_options())
+        else:
+            future = self.scheduler.submit(save_code, data, file_path, barcode_type, fill_color, back_color,
+                                           profile, **self.get_options())
+        self.root.after(50, self.poll_save, future, file_path)
+
+    def poll_save(self, future, file_path):
+        if not future.done():
+            self.root.after(50, self.poll_save, future, file_path)
+            return
         try:
-            extension = file_path.split('.')[-1].lower()
-            if extension == 'pdf':
-                self.save_as_pdf(img, file_path)
-            elif extension == 'svg':
-                self.save_as_svg(img, file_path)
-            elif extension == 'bmp':
-                img.save(file_path, format='BMP')
-            elif extension == 'gif':
-                img = img.convert("P", palette=Image.ADAPTIVE)
-                img.save(file_path, format='GIF')
-            elif extension in ['tiff', 'tif']:
-                img.save(file_path, format='TIFF')
-            elif extension == 'ico':
-                img.save(file_path, format='ICO')
-            elif extension == 'webp':
-                img.save(file_path, format='WEBP')
-            elif extension in ['jpg', 'jpeg']:
-                img.save(file_path, format='JPEG')
-            elif extension == 'eps':
-                img.save(file_path, format='EPS')
-            elif extension == 'pbm':
-                img.save(file_path, format='PBM')
-            elif extension == 'pgm':
-                img.save(file_path, format='PGM')
-            elif extension == 'ppm':
-                img.save(file_path, format='PPM')
-            elif extension == 'xbm':
-                img.save(file_path, format='XBM')
-            elif extension == 'xpm':
-                img.save(file_path, format='XPM')
-            elif extension == 'pcx':
-                img.save(file_path, format='PCX')
-            elif extension == 'tga':
-                img.save(file_path, format='TGA')
-            else:
-                img.save(file_path, format='PNG')
-            messagebox.showinfo("Success", f"Image saved successfully to {file_path}")
+            result = future.result()
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save image: {e}")
-
-    def save_as_pdf(self, img, file_path):
+            return
+        if isinstance(result, list):
+            self.show_format_results(result)
+        else:
+            messagebox.showinfo("Success", f"Image saved successfully to {file_path}\n"
+                                           f"{result.size} bytes, encoded in {result.seconds * 1000:.1f} ms")
+
+    def show_format_results(self, results):
+        lines = [f"{result.path}: failed - {result.error}" if result.error else
+                 f"{result.path}: {result.stats.size} bytes, {result.stats.seconds * 1000:.1f} ms"
+                 for result in results]
+        if any(result.error for result in results):
+            messagebox.showerror("Error", "Some formats could not be saved:\n" + "\n".join(lines))
+        else:
+            messagebox.showinfo("Success", "Images saved:\n" + "\n".join(lines))
+
+    def show_preview(self):
+        # One preview pane is reused; it renders the current settings right away
+        if self.preview_window is None:
+            self.preview_window = tk.Toplevel(self.root)
+            self.preview_window.title("Preview")
+            self.preview_window.protocol("WM_DELETE_WINDOW", self.hide_preview)
+            width, height = PREVIEW_SIZE
+            self.preview_canvas = tk.Canvas(self.preview_window, width=width, height=height)
+            self.preview_canvas.pack()
+            self.preview_status = ttk.Label(self.preview_window, style='TLabel')
+            self.preview_status.pack(fill=tk.X)
+        else:
+            self.preview_window.deiconify()
+            self.preview_window.lift()
+        self.request_preview()
+
+    def hide_preview(self):
+        if self.preview_job is not None:
+            self.root.after_cancel(self.preview_job)
+            self.preview_job = None
+        if self.preview_poll is not None:
+            self.root.after_cancel(self.preview_poll)
+            self.preview_poll = None
+        self.preview_worker.cancel()
+        self.preview_window.withdraw()
+
+    def preview_visible(self):
+        return self.preview_window is not None and self.preview_window.state() != 'withdrawn'
+
+    def schedule_preview(self, event=None):
+        # Debounced: every edit restarts the delay, so a burst of typing renders once
+        if not self.preview_visible():
+            return
+        if self.preview_job is not None:
+            self.root.after_cancel(self.preview_job)
+        self.preview_job = self.root.after(PREVIEW_DELAY_MS, self.request_preview)
+
+    def request_preview(self):
+        # Widgets are read here on the Tk thread; the render itself runs on the preview worker
+        self.preview_job = None
         try:
-            buffer = BytesIO()
-            img.save(buffer, format='PNG')
-            buffer.seek(0)
-            pdf_canvas = canvas.Canvas(file_path, pagesize=(img.width, img.height))
-            pdf_canvas.drawImage(ImageReader(buffer), 0, 0, width=img.width, height=img.height)
-            pdf_canvas.showPage()
-            pdf_canvas.save()
+            if self.batch_var.get() == 1:
+                first = next(iter(self.batch_rows()), None)
+                if first is None:
+                    raise ValueError("No batch data to preview")
+                data = first if isinstance(first, str) else first.data
+            else:
+                data = self.data_entry.get()
+            fill_color, back_color = self.current_colors()
+            barcode_type = self.barcode_type_combobox.get()
+            options = self.get_options()
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to save PDF: {e}")
-
-    def save_as_svg(self, img, file_path):
-        buffer = BytesIO()
-        img.save(buffer, format='PNG')
-        buffer.seek(0)
-        dwg = svgwrite.Drawing(file_path, profile='tiny', size=img.size)
-        image_data = buffer.getvalue()
-        image_base64 = base64.b64encode(image_data).decode('utf-8')
-        dwg.add(dwg.image(href='data:image/png;base64,' + image_base64, insert=(0, 0), size=img.size))
-        dwg.save()
-
-    def preview_image(self, img):
-        preview_window = tk.Toplevel(self.root)
-        preview_window.title("Preview")
-        preview_window.geometry("600x600")
-        preview_canvas = tk.Canvas(preview_window, width=600, height=600)
-        preview_canvas.pack()
-
-        img.thumbnail((600, 600), Image.LANCZOS)
-        tk_img = ImageTk.PhotoImage(img)
-
-        preview_canvas.create_image(300, 300, image=tk_img, anchor=tk.CENTER)
-        preview_canvas.image = tk_img
-        preview_window.mainloop()
-
-    def validate_inputs(self, data, barcode_type, version, box_size, border, module_width, module_height, font_size,
-                        text_distance):
-        if not data:
-            raise ValueError("Please enter data to encode")
-
-        if barcode_type == 'QR Code':
-            if not (1 <= version <= 40):
-                raise ValueError("QR Code version must be between 1 and 40")
-            if box_size <= 0:
-                raise ValueError("Box size must be greater than 0")
-            if border < 0:
-                raise ValueError("Border size cannot be negative")
+            self.preview_worker.cancel()
+            self.preview_status.config(text=f"Error: {e}")
+            return
+        self.preview_status.config(text="Rendering...")
+        self.preview_worker.submit(data, barcode_type, fill_color, back_color, options)
+        # Polled only until the worker goes idle; the next request starts polling again
+        if self.preview_poll is None:
+            self.preview_poll = self.root.after(50, self.poll_preview)
+
+    def render_preview(self, token, data, barcode_type, fill_color, back_color, options):
+        # Runs on the preview worker, rendered straight at canvas size with whole-pixel modules
+        if token.cancelled:
+            return None
+        future = self.scheduler.submit(generate_preview, data, barcode_type, fill_color, back_color, PREVIEW_SIZE,
+                                       **options)
+        # A newer request takes this one off the scheduler queue if no worker has started it yet;
+        # the CancelledError from result() is then dropped with the superseded render
+        token.on_cancel(future.cancel)
+        img = future.result()
+        return None if token.cancelled else img
+
+    def poll_preview(self):
+        # Only the newest finished render is painted
+        self.preview_poll = None
+        busy = self.preview_worker.busy()
+        result = self.preview_worker.poll()
+        if result is not None:
+            if result.error is not None:
+                self.preview_status.config(text=f"Error: {result.error}")
+            else:
+                width, height = PREVIEW_SIZE
+                tk_img = ImageTk.PhotoImage(result.image)
+                self.preview_canvas.delete("all")
+                self.preview_canvas.create_image(width // 2, height // 2, image=tk_img, anchor=tk.CENTER)
+                self.preview_canvas.image = tk_img
+                self.preview_status.config(text="")
+        if busy and self.preview_visible():
+            self.preview_poll = self.root.after(50, self.poll_preview)
+
+    def batch_total(self, batch_data):
+        # Unknown for input files, which are streamed
+        return len(batch_data) if isinstance(batch_data, list) else None
+
+    def track_batch(self, job):
+        self.batch_job = job
+        self.pause_button.config(text="Pause")
+        self.progress_frame.grid()
+        self.poll_progress()
+
+    def poll_progress(self):
+        job = self.batch_job
+        if job is None or job.future.done():
+            self.progress_frame.grid_remove()
+            return
+        progress = job.progress()
+        if progress.total:
+            text = f"{progress.done} of {progress.total} done ({progress.done * 100 / progress.total:.0f}%)"
+        else:
+            text = f"{progress.done} done"
+        text += f", {progress.rate:.0f}/s"
+        if progress.eta is not None:
+            text += f", about {int(progress.eta) // 60}:{int(progress.eta) % 60:02d} left"
+        if progress.paused:
+            text = "Paused - " + text
+        self.progress_label.config(text=text)
+        self.root.after(250, self.poll_progress)
+
+    def toggle_pause(self):
+        # Items already on a worker finish; no new ones start until resumed
+        if self.batch_job is None:
+            return
+        if self.pause_button['text'] == "Pause":
+            self.batch_job.pause()
+            self.pause_button.config(text="Resume")
         else:
-            if module_width <= 0:
-                raise ValueError("Module width must be greater than 0")
-            if module_height <= 0:
-                raise ValueError("Module height must be greater than 0")
-            if font_size <= 0:
-                raise ValueError("Font size must be greater than 0")
-            if text_distance < 0:
-                raise ValueError("Text distance cannot be negative")
+            self.batch_job.resume()
+            self.pause_button.config(text="Pause")
+
+    def cancel_batch(self):
+        if self.batch_job is not None:
+            self.batch_job.cancel()
+
+    def on_close(self):
+        self.cancel_batch()
+        self.preview_worker.close()
+        self.scheduler.shutdown()
+        self.root.destroy()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,67 @@
+"""
+Headless rendering core shared by the Tkinter front-ends and the command line.
+
+Nothing in this package imports tkinter or ttkbootstrap, so it can be used on
+machines without a display.
+
+Importing the package loads none of its modules: every name below is
+imported from its module the first time it is used, and the symbology and
+writer libraries only when a code of that type or format is made (see
+registry.py). `python -m barcode_core --startup-report` shows what an
+import costs.
+"""
+import importlib
+
+# Public names by the module that defines them.
+_EXPORTS = {
+    'symbol': ('Symbol',),
+    'cache': ('CacheStats', 'RenderCache', 'configure_cache', 'get_cache'),
+    'raster': ('rasterize', 'rasterize_mask', 'iter_mask_stripes'),
+    'options': ('BARCODE_TYPES', 'LINEAR_TYPES', 'DEFAULT_OPTIONS', 'PROFILES', 'PRINTER_LANGUAGES'),
+    'generators': ('generate_image', 'generate_qr_code', 'generate_barcode', 'generate_datamatrix', 'generate_aztec',
+                   'generate_pdf417', 'validate_inputs', 'render_key', 'encode_symbol', 'fit_symbol',
+                   'symbol_size_mm'),
+    'symbologies.qr': ('encode_qr_code',),
+    'symbologies.linear': ('encode_barcode',),
+    'symbologies.datamatrix': ('encode_datamatrix',),
+    'symbologies.aztec': ('encode_aztec',),
+    'symbologies.pdf417': ('encode_pdf417',),
+    'registry': ('SYMBOLOGIES', 'SYMBOL_WRITERS', 'IMAGE_WRITERS', 'IMPORT_TIMES', 'ImportCost', 'Registry',
+                 'import_costs', 'startup_report'),
+    'stripes': ('STRIPE_PIXELS', 'StripedPNG', 'StripedTIFF', 'write_striped'),
+    'svg': ('build_svg', 'write_svg', 'svg_string', 'save_as_svg'),
+    'pdf': ('draw_symbol_pdf', 'write_pdf', 'save_as_pdf', 'PdfStream'),
+    'output': ('FILE_TYPES', 'EncodeStats', 'FormatResult', 'save_image', 'save_symbol', 'save_code',
+               'save_formats', 'format_paths', 'render_bytes', 'timed_render', 'symbol_bytes'),
+    'preview': ('PREVIEW_SIZE', 'PREVIEW_DELAY_MS', 'PreviewResult', 'PreviewWorker', 'preview_symbol',
+                'generate_preview'),
+    'pipeline': ('run_stages', 'bounded_imap', 'default_workers'),
+    'scheduler': ('BatchCancelled', 'BatchJob', 'BatchProgress', 'Scheduler'),
+    'server': ('DEFAULT_HOST', 'DEFAULT_PORT', 'RenderServer', 'serve'),
+    'manifest': ('MANIFEST_NAME', 'Manifest'),
+    'archive': ('ARCHIVE_FORMATS', 'ArchiveWriter'),
+    'batch': ('BatchResult', 'EncodedItem', 'SheetResult', 'DuplicateFinder', 'run_batch', 'encode_batch'),
+    'sheet': ('PAGE_SIZES', 'LabelSheet', 'parse_grid', 'parse_page_size', 'write_label_sheet'),
+    'tiff': ('TiffPages', 'write_tiff_pages'),
+    'printer': ('PrinterJob', 'write_printer_job'),
+    'naming': ('DEFAULT_TEMPLATE', 'OutputNamer', 'sanitize_filename', 'plan_outputs'),
+    'readers': ('INPUT_FORMATS', 'OVERRIDE_FIELDS', 'Row', 'read_rows', 'read_csv', 'read_jsonl', 'read_lines'),
+}
+
+_MODULES = {name: module for module, names in _EXPORTS.items() for name in names}
+
+__all__ = list(_MODULES)
+
+
+def __getattr__(name):
+    module = _MODULES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f"{__name__}.{module}"), name)
+    # Later lookups find it directly, without coming back here.
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
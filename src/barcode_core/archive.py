@@ -0,0 +1,96 @@
+import io
+import tarfile
+import time
+import zipfile
+
+ARCHIVE_FORMATS = ('zip', 'tar', 'tar.gz')
+
+# Formats that are compressed already; deflating them again costs time and
+# saves next to nothing, so ZIP stores them as they are.
+STORED_EXTENSIONS = frozenset(['png', 'webp', 'jpg', 'jpeg', 'gif'])
+
+
+def archive_format_for(target):
+    """Archive format implied by a file name: tar, tar.gz/tgz, or zip otherwise."""
+    name = target.lower() if isinstance(target, str) else ""
+    if name.endswith('.tar'):
+        return 'tar'
+    if name.endswith(('.tar.gz', '.tgz')):
+        return 'tar.gz'
+    return 'zip'
+
+
+class ArchiveWriter:
+    """
+    Writes batch outputs as members of one ZIP or tar archive, in order, as
+    they arrive. `target` is a path or a binary file object; it does not
+    need to be seekable, so the archive can go straight to standard output
+    or a socket. Nothing is buffered beyond the member being written, and no
+    temporary files are created.
+
+    ZIP members in STORED_EXTENSIONS are stored, the rest deflated. ZIP has
+    to keep a small central directory record per member until the end; tar
+    keeps nothing, and records repeats as hard links (`links` is True).
+    """
+
+    def __init__(self, target, archive_format=None):
+        archive_format = archive_format or archive_format_for(target)
+        if archive_format not in ARCHIVE_FORMATS:
+            raise ValueError(f"Unknown archive format {archive_format!r}; use one of {', '.join(ARCHIVE_FORMATS)}")
+        self.archive_format = archive_format
+        self.owned = isinstance(target, str)
+        self.file = open(target, 'wb') if self.owned else target
+        self.date_time = time.localtime()[:6]
+        self.mtime = time.time()
+        self.links = archive_format != 'zip'
+        if archive_format == 'zip':
+            self.archive = zipfile.ZipFile(self.file, 'w', zipfile.ZIP_DEFLATED, allowZip64=True)
+        else:
+            # Stream mode ("w|") never seeks back into the output.
+            self.archive = tarfile.open(fileobj=self.file, mode='w|gz' if archive_format == 'tar.gz' else 'w|')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def add(self, name, content):
+        """Add one member holding `content`."""
+        if self.archive_format == 'zip':
+            info = zipfile.ZipInfo(name, self.date_time)
+            info.external_attr = 0o644 << 16
+            stored = name.split('.')[-1].lower() in STORED_EXTENSIONS
+            info.compress_type = zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED
+            self.archive.writestr(info, content)
+        else:
+            info = self.tar_info(name)
+            info.size = len(content)
+            self.archive.addfile(info, io.BytesIO(content))
+            self.forget()
+
+    def link(self, name, target_name):
+        """Add `name` as a hard link to the earlier member `target_name` (tar only)."""
+        if not self.links:
+            raise ValueError("ZIP archives cannot hold links")
+        info = self.tar_info(name)
+        info.type = tarfile.LNKTYPE
+        info.linkname = target_name
+        self.archive.addfile(info)
+        self.forget()
+
+    def tar_info(self, name):
+        info = tarfile.TarInfo(name)
+        info.mtime = self.mtime
+        info.mode = 0o644
+        return info
+
+    def forget(self):
+        # TarFile remembers every member it wrote, which a write-only stream
+        # never needs; dropping them keeps memory flat on endless batches.
+        self.archive.members.clear()
+
+    def close(self):
+        self.archive.close()
+        if self.owned:
+            self.file.close()
@@ -0,0 +1,332 @@
+import hashlib
+import os
+import shutil
+from collections import OrderedDict, namedtuple
+from functools import partial
+
+from .cache import DEFAULT_MEMORY_BYTES, RenderCache
+from .generators import encode_symbol
+from .manifest import file_digest
+from .options import DEFAULT_OPTIONS
+from .output import check_profile, timed_render
+from .pipeline import DEFAULT_QUEUE_SIZE, bounded_imap, run_stages
+
+# `duplicate_of` is the index of the earlier item whose rendering was reused,
+# or None for items that were rendered themselves. `resumed` marks items a
+# checkpoint manifest showed to be finished already. `stats` is the
+# output.EncodeStats of items rendered in this run.
+BatchResult = namedtuple('BatchResult', 'index data output_path error duplicate_of resumed stats',
+                         defaults=(None, False, None))
+# `barcode_type` and `options` are the settings the symbol was encoded with,
+# per-item overrides included.
+EncodedItem = namedtuple('EncodedItem', 'index data symbol error duplicate_of barcode_type options',
+                         defaults=(None, None, None))
+# Outcome of a writer that puts a whole batch into one file, such as a
+# label sheet, a multi-page TIFF or a print job.
+SheetResult = namedtuple('SheetResult', 'written failed pages reused', defaults=(0,))
+
+# One batch item on its way through the stages. `original` is None or the
+# (index, output_path) of an earlier item to reuse; `done` is set for items
+# a manifest already records as finished.
+Job = namedtuple('Job', 'index data output_path overrides offset original done')
+
+# Distinct payloads remembered for deduplication. Older repeats are rendered
+# again, which the render cache usually makes cheap.
+DEDUPE_WINDOW = 10000
+
+
+def describe_error(error):
+    return f"{type(error).__name__}: {error}"
+
+
+class DuplicateFinder:
+    """
+    Remembers the most recent `window` distinct keys and the position each
+    was first seen at, so memory stays bounded on endless input.
+    """
+
+    def __init__(self, window=DEDUPE_WINDOW):
+        self.window = window
+        self.first_seen = OrderedDict()
+
+    def __call__(self, key, position):
+        """Position of an earlier occurrence of `key`, or None if it is new."""
+        first = self.first_seen.get(key)
+        if first is None:
+            self.first_seen[key] = position
+            if len(self.first_seen) > self.window:
+                self.first_seen.popitem(last=False)
+        else:
+            self.first_seen.move_to_end(key)
+        return first
+
+
+class RecentOutputs:
+    """
+    What a consumer of encode_batch produced for the most recent `window`
+    originals, by index. Entries are refreshed and evicted in the same order
+    as the DuplicateFinder of an encode_batch run with the same window, so
+    every repeat it reports still finds its original here.
+    """
+
+    def __init__(self, window=DEDUPE_WINDOW):
+        self.window = window
+        self.outputs = OrderedDict()
+
+    def add(self, index, output):
+        self.outputs[index] = output
+        if len(self.outputs) > self.window:
+            self.outputs.popitem(last=False)
+
+    def get(self, index):
+        self.outputs.move_to_end(index)
+        return self.outputs[index]
+
+
+def override_settings(settings, overrides):
+    """
+    (barcode_type, fill_color, back_color, options) of a batch with one
+    item's overrides (see readers.OVERRIDE_FIELDS) applied.
+    """
+    barcode_type, fill_color, back_color, options = settings
+    if not overrides:
+        return settings
+    options = dict(options, **{key: value for key, value in overrides.items() if key in DEFAULT_OPTIONS})
+    return (overrides.get('type', barcode_type), overrides.get('fill_color', fill_color),
+            overrides.get('back_color', back_color), options)
+
+
+def override_key(overrides):
+    # Hashable form of the overrides that change the rendering.
+    return tuple(sorted((key, str(value)) for key, value in overrides.items() if key != 'output'))
+
+
+def prepare_jobs(dedupe, manifest, start, items):
+    """
+    First batch stage: number the items from `start`, point repeats of a
+    payload with the same overrides and format at their first occurrence,
+    and mark the items `manifest` has already finished. Yields Jobs.
+    """
+    finder = DuplicateFinder()
+    for index, (data, output_path, *rest) in enumerate(items, start):
+        overrides = rest[0] if rest else {}
+        offset = rest[1] if len(rest) > 1 else None
+        first = None
+        if dedupe:
+            key = (data, output_path.split('.')[-1].lower(), override_key(overrides))
+            first = finder(key, (index, output_path))
+        done = manifest is not None and manifest.is_done(index)
+        yield Job(index, data, output_path, overrides, offset, first, done)
+
+
+def render_job(settings, job, profile='default'):
+    """
+    Encode, rasterize and file-encode one job inside a worker, returning
+    (job, content, error, stats). Repeats pass through untouched. Errors are
+    returned rather than raised so one bad payload does not abort the rest
+    of the batch.
+    """
+    if job.original is not None or job.done:
+        return job, None, None, None
+    try:
+        barcode_type, fill_color, back_color, options = override_settings(settings, job.overrides)
+        content, stats = timed_render(job.data, job.output_path.split('.')[-1].lower(), barcode_type, fill_color,
+                                      back_color, profile, **options)
+    except Exception as e:
+        return job, None, describe_error(e), None
+    return job, content, None, stats
+
+
+def copy_output(original_path, output_path, link=False):
+    """
+    Give a repeated item the file already written at `original_path`, as a
+    hard link when `link` is set and the file system allows it, else as a
+    byte copy.
+    """
+    if os.path.lexists(output_path):
+        os.remove(output_path)
+    if link:
+        try:
+            os.link(original_path, output_path)
+            return
+        except OSError:
+            pass
+    shutil.copyfile(original_path, output_path)
+
+
+def write_jobs(link_duplicates, manifest, rendered):
+    """
+    Last batch stage: write rendered bytes, fan them out to repeats and
+    checkpoint every finished item in `manifest`.
+    """
+    failed = {}
+    for job, content, error, stats in rendered:
+        first = job.original[0] if job.original is not None else None
+        if job.done:
+            yield BatchResult(job.index, job.data, job.output_path, None, first, True)
+            continue
+        digest = size = None
+        if first is not None:
+            error = failed.get(first)
+            if error is None:
+                try:
+                    copy_output(job.original[1], job.output_path, link_duplicates)
+                    if manifest is not None:
+                        digest, size = file_digest(job.output_path), os.path.getsize(job.output_path)
+                except OSError as e:
+                    error = describe_error(e)
+        elif error is None:
+            try:
+                with open(job.output_path, 'wb') as f:
+                    f.write(content)
+                digest, size = hashlib.sha256(content).hexdigest(), len(content)
+            except OSError as e:
+                error = describe_error(e)
+        if error is not None and first is None:
+            failed[job.index] = error
+        if manifest is not None:
+            manifest.record(job.index, job.offset, job.output_path, digest, size, error)
+        yield BatchResult(job.index, job.data, job.output_path, error, first, stats=stats)
+
+
+def archive_jobs(settings, profile, archive, rendered):
+    """
+    Last batch stage when writing into an archive.ArchiveWriter: add the
+    rendered bytes as members named by output_path. Repeats become links
+    where the archive supports them; otherwise their bytes come from the
+    recent renders kept in memory, or are rendered again once those have
+    been evicted. Errors writing the archive abort the batch, since the
+    archive is unusable afterwards.
+    """
+    failed = {}
+    recent = RenderCache(DEFAULT_MEMORY_BYTES)
+    for job, content, error, stats in rendered:
+        first = job.original[0] if job.original is not None else None
+        if first is not None:
+            error = failed.get(first)
+            if error is None and archive.links:
+                archive.link(job.output_path, job.original[1])
+            elif error is None:
+                content = recent.get(str(first))
+                if content is None:
+                    _, content, error, _ = render_job(settings, job._replace(original=None), profile)
+                if error is None:
+                    archive.add(job.output_path, content)
+        elif error is None:
+            archive.add(job.output_path, content)
+            if not archive.links:
+                recent.put(str(job.index), content)
+        else:
+            failed[job.index] = error
+        yield BatchResult(job.index, job.data, job.output_path, error, first, stats=stats)
+
+
+def run_batch(items, barcode_type='QR Code', fill_color="black", back_color="white", workers=None, chunksize=None,
+              dedupe=True, link_duplicates=False, manifest=None, start=0, archive=None, profile='default',
+              queue_size=DEFAULT_QUEUE_SIZE, mapper=bounded_imap, **options):
+    """
+    Render and save every (data, output_path) pair in `items` across a pool
+    of worker processes. An item may carry a third element, a dict of
+    per-item overrides such as readers.Row.overrides, which replaces the
+    symbology, colors or options for that item only, and a fourth, its
+    offset in the input.
+
+    `items` may be any iterable, including an endless generator: it is read
+    lazily through a staged pipeline (prepare, render in the worker pool,
+    write), so memory stays flat however many items pass through and the
+    first files are written right away. Yields one BatchResult per item, in
+    input order. `workers` defaults to the number of CPUs; with a single
+    worker everything runs in-process.
+
+    With `dedupe`, a payload repeated with the same output format is
+    rendered once and its file copied (or hard linked, with
+    `link_duplicates`) to the other outputs; their results carry the index
+    of the rendered item in `duplicate_of`.
+
+    With a manifest.Manifest, every finished item is checkpointed and items
+    it already records as finished are skipped, their results marked
+    `resumed`. `start` is the index of the first item when the caller has
+    skipped ahead in the input, see Manifest.resume_point.
+
+    With an archive.ArchiveWriter as `archive`, outputs become archive
+    members named by their output_path instead of files; the caller closes
+    the archive. Archives cannot be resumed.
+
+    `profile` selects the encoder settings, see options.PROFILES; every
+    rendered item's result carries the size and encoding time of its file.
+
+    `mapper` runs the render stage; it defaults to pipeline.bounded_imap
+    and may be replaced by a scheduler.BatchJob's `map` to share a pool.
+    """
+    settings = (barcode_type, fill_color, back_color, options)
+    if archive is not None and manifest is not None:
+        raise ValueError("Batches written into an archive cannot be resumed")
+    check_profile(profile)
+    if manifest is not None:
+        checked = {'type': barcode_type, 'fill_color': fill_color, 'back_color': back_color, 'options': options}
+        if profile != 'default':
+            checked['profile'] = profile
+        manifest.check_settings(checked)
+    if archive is None:
+        write = partial(write_jobs, link_duplicates, manifest)
+    else:
+        write = partial(archive_jobs, settings, profile, archive)
+    stages = [
+        partial(prepare_jobs, dedupe, manifest, start),
+        partial(mapper, partial(render_job, settings, profile=profile), workers=workers, chunksize=chunksize),
+        write,
+    ]
+    yield from run_stages(items, stages, queue_size)
+
+
+def encode_job(settings, job):
+    """Encode one job inside a worker, returning its EncodedItem."""
+    index, data, overrides, original = job
+    barcode_type, _, _, options = override_settings(settings, overrides)
+    if original is not None:
+        return EncodedItem(index, data, None, None, original, barcode_type, options)
+    try:
+        return EncodedItem(index, data, encode_symbol(data, barcode_type, **options), None, None, barcode_type,
+                           options)
+    except Exception as e:
+        return EncodedItem(index, data, None, describe_error(e), None, barcode_type, options)
+
+
+def prepare_payloads(dedupe, window, datas):
+    finder = DuplicateFinder(window)
+    for index, item in enumerate(datas):
+        data, overrides = (item, {}) if isinstance(item, str) else (item.data, item.overrides or {})
+        key = (data, override_key(overrides))
+        yield index, data, overrides, finder(key, index) if dedupe else None
+
+
+def carry_errors(items):
+    # Repeats of a payload that failed to encode fail the same way.
+    failed = {}
+    for item in items:
+        if item.duplicate_of is not None and item.duplicate_of in failed:
+            item = item._replace(error=failed[item.duplicate_of])
+        elif item.error:
+            failed[item.index] = item.error
+        yield item
+
+
+def encode_batch(datas, barcode_type='QR Code', workers=None, chunksize=None, dedupe=True,
+                 window=DEDUPE_WINDOW, queue_size=DEFAULT_QUEUE_SIZE, mapper=bounded_imap, **options):
+    """
+    Encode every payload in `datas` to a Symbol across the worker pool,
+    yielding EncodedItems in input order. Used by outputs that draw many
+    symbols into one file, such as label sheets. `datas` is read lazily
+    like in run_batch and may hold readers.Row records, whose symbology and
+    option overrides are applied. With `dedupe`, repeated payloads are encoded once;
+    their items have no symbol and name the first occurrence in
+    `duplicate_of`. Only the last `window` distinct payloads are remembered,
+    as in DuplicateFinder. `mapper` runs the encode stage, as in run_batch.
+    """
+    stages = [
+        partial(prepare_payloads, dedupe, window),
+        partial(mapper, partial(encode_job, (barcode_type, None, None, options)), workers=workers,
+                chunksize=chunksize),
+        carry_errors,
+    ]
+    yield from run_stages(datas, stages, queue_size)
@@ -0,0 +1,145 @@
+import os
+import tempfile
+import threading
+from collections import OrderedDict, namedtuple
+
+DEFAULT_MEMORY_BYTES = 64 * 1024 * 1024
+
+CacheStats = namedtuple('CacheStats', 'hits disk_hits misses evictions entries size')
+
+
+class RenderCache:
+    """
+    Content-addressed store of rendered output bytes.
+
+    Keys are hex digests such as the ones built by generators.render_key.
+    Entries live in an in-memory LRU limited to `max_bytes` and, when
+    `directory` is given, in an on-disk tier that survives restarts and is
+    shared by every process pointed at the same folder. The disk tier is
+    not size limited; delete the folder to clear it. `max_bytes=0` turns
+    the memory tier off.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MEMORY_BYTES, directory=None):
+        if max_bytes < 0:
+            raise ValueError("Cache size cannot be negative")
+        self.max_bytes = max_bytes
+        self.directory = directory
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return bool(self.max_bytes or self.directory)
+
+    def settings(self):
+        """Arguments that recreate an empty cache with the same configuration."""
+        return self.max_bytes, self.directory
+
+    def stats(self):
+        with self.lock:
+            return CacheStats(self.hits, self.disk_hits, self.misses, self.evictions, len(self.entries), self.size)
+
+    def get(self, key, disk=True):
+        """
+        Cached bytes for `key`, or None. Disk hits are promoted to memory;
+        with `disk` False only the memory tier is looked at, which never
+        blocks on I/O.
+        """
+        with self.lock:
+            content = self.entries.get(key)
+            if content is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return content
+        content = self.read_disk(key) if disk else None
+        with self.lock:
+            if content is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self.remember(key, content)
+        return content
+
+    def put(self, key, content, disk=True):
+        with self.lock:
+            self.remember(key, content)
+        if disk:
+            self.write_disk(key, content)
+
+    def clear(self):
+        """Empty the memory tier. The disk tier is left alone."""
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def remember(self, key, content):
+        # Caller holds the lock.
+        if len(content) > self.max_bytes:
+            return
+        previous = self.entries.pop(key, None)
+        if previous is not None:
+            self.size -= len(previous)
+        self.entries[key] = content
+        self.size += len(content)
+        while self.size > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= len(evicted)
+            self.evictions += 1
+
+    def disk_path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def read_disk(self, key):
+        if not self.directory:
+            return None
+        try:
+            with open(self.disk_path(key), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def write_disk(self, key, content):
+        if not self.directory:
+            return
+        path = self.disk_path(key)
+        if os.path.exists(path):
+            return
+        folder = os.path.dirname(path)
+        # Write to a temporary name and rename, so concurrent readers never
+        # see a partial file. A failing disk tier only costs a later miss.
+        try:
+            os.makedirs(folder, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=folder, suffix='.tmp')
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+            os.replace(temp_path, path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+
+_cache = RenderCache()
+
+
+def get_cache():
+    """The process-wide cache used by generate_image and save_code."""
+    return _cache
+
+
+def configure_cache(max_bytes=DEFAULT_MEMORY_BYTES, directory=None):
+    """Replace the process-wide cache with an empty one using these settings."""
+    global _cache
+    _cache = RenderCache(max_bytes, directory)
+    return _cache
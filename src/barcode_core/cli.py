@@ -0,0 +1,376 @@
+import argparse
+import os
+import sys
+from collections import namedtuple
+
+# Only modules that import no imaging or PDF library are loaded here, so
+# --help and argument errors stay quick; every output path imports what it
+# writes with when it runs (see --startup-report).
+from .archive import ARCHIVE_FORMATS
+from .cache import DEFAULT_MEMORY_BYTES, configure_cache
+from .manifest import MANIFEST_NAME
+from .naming import DEFAULT_TEMPLATE, index_prefixed, plan_outputs
+from .options import BARCODE_TYPES, DEFAULT_OPTIONS, DEFAULT_PRINTER_DPI, PRINTER_LANGUAGES, PROFILES
+from .readers import INPUT_FORMATS, read_rows
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="barcode_core",
+                                     description="Generate a QR code or barcode without starting the GUI.")
+    parser.add_argument("data", nargs="*", help="data to encode; several values require --output-dir")
+    parser.add_argument("-o", "--output", help="output file; the extension selects the format (png, svg, pdf, ...)")
+    parser.add_argument("--also", help="also write the code in these comma-separated formats next to --output, "
+                                       "e.g. svg,pdf; it is encoded only once")
+    parser.add_argument("-t", "--type", dest="barcode_type", default="QR Code", choices=BARCODE_TYPES,
+                        help="code type (default: %(default)s)")
+    parser.add_argument("--fill-color", default="black", help="foreground color (default: %(default)s)")
+    parser.add_argument("--back-color", default="white", help="background color (default: %(default)s)")
+
+    qr_group = parser.add_argument_group("QR Code settings")
+    qr_group.add_argument("--version", type=int, default=DEFAULT_OPTIONS['version'])
+    qr_group.add_argument("--error-correction", choices=["L", "M", "Q", "H"],
+                          default=DEFAULT_OPTIONS['error_correction'])
+    qr_group.add_argument("--box-size", type=int, default=DEFAULT_OPTIONS['box_size'])
+    qr_group.add_argument("--border", type=int, default=DEFAULT_OPTIONS['border'])
+
+    batch_group = parser.add_argument_group("batch output")
+    batch_group.add_argument("-i", "--input", help="read batch items from a file instead, '-' for stdin")
+    batch_group.add_argument("--input-format", choices=INPUT_FORMATS, default="auto",
+                             help="csv (with a 'data' column and optional per-row settings), jsonl, or lines "
+                                  "(one value per line); auto picks by file extension (default: %(default)s)")
+    batch_group.add_argument("--output-dir", help="write every code into this directory without prompting")
+    batch_group.add_argument("--template", default=DEFAULT_TEMPLATE,
+                             help="file name template with {index}, {data}, {type} and {ext} (default: %(default)s)")
+    batch_group.add_argument("--format", default="png", help="output format extension (default: %(default)s)")
+    batch_group.add_argument("--profile", choices=PROFILES, default="default",
+                             help="encoder settings: fastest compresses little, smallest as far as it helps "
+                                  "(default: %(default)s)")
+    batch_group.add_argument("--report", action="store_true",
+                             help="print the size and encoding time of every file written")
+    batch_group.add_argument("--workers", type=int, help="worker processes (default: number of CPUs)")
+    batch_group.add_argument("--no-dedupe", dest="dedupe", action="store_false",
+                             help="render repeated values again instead of reusing the first rendering")
+    batch_group.add_argument("--link-duplicates", action="store_true",
+                             help="hard link files of repeated values instead of copying them")
+    batch_group.add_argument("--archive", help="write every code into this ZIP or tar archive instead of a directory, "
+                                               "'-' for stdout")
+    batch_group.add_argument("--archive-format", choices=ARCHIVE_FORMATS,
+                             help="archive type (default: from the --archive extension, zip otherwise)")
+    batch_group.add_argument("--resume", action="store_true",
+                             help=f"checkpoint finished codes in {MANIFEST_NAME} in the output directory and "
+                                  f"skip the ones it lists as written when run again")
+    batch_group.add_argument("--manifest", help="checkpoint file to use instead; implies --resume")
+    batch_group.add_argument("--verify", action="store_true",
+                             help="when resuming, check the hash of existing files, not just their size")
+
+    sheet_group = parser.add_argument_group("label sheet PDF")
+    sheet_group.add_argument("--sheet", help="lay every code out on label sheets in this single PDF")
+    sheet_group.add_argument("--page-size", default="A4", help="A3, A4, A5, LETTER, LEGAL or WIDTHxHEIGHT in mm "
+                                                               "(default: %(default)s)")
+    sheet_group.add_argument("--grid", default="10x3", help="labels per page as ROWSxCOLUMNS (default: %(default)s)")
+    sheet_group.add_argument("--margin", type=float, default=10, help="page margin in mm (default: %(default)s)")
+    sheet_group.add_argument("--spacing", type=float, default=2, help="gap between labels in mm (default: %(default)s)")
+    sheet_group.add_argument("--caption", help="caption template under each label, e.g. \"{data}\"")
+
+    tiff_group = parser.add_argument_group("multi-page TIFF")
+    tiff_group.add_argument("--tiff", help="append every code as a 1-bit Group 4 page of this single TIFF")
+
+    printer_group = parser.add_argument_group("label printer")
+    printer_group.add_argument("--printer", help="write one ZPL or EPL print job with a label per code to this file "
+                                                 "or device, '-' for stdout")
+    printer_group.add_argument("--printer-language", choices=PRINTER_LANGUAGES,
+                               help="printer language (default: epl for .epl files, zpl otherwise)")
+
+    cache_group = parser.add_argument_group("render cache")
+    cache_group.add_argument("--cache-dir", help="keep rendered codes in this folder and reuse them across runs")
+    cache_group.add_argument("--cache-size", type=float, default=DEFAULT_MEMORY_BYTES / 2 ** 20,
+                             help="in-memory cache size in MiB per process, 0 to disable (default: %(default)s)")
+
+    serve_group = parser.add_argument_group("HTTP service")
+    serve_group.add_argument("--serve", action="store_true",
+                             help="run a local HTTP service rendering codes on a warm pool of --workers processes")
+    # The service and asyncio are only imported when --serve is given; see run_server.
+    serve_group.add_argument("--host", help="loopback address to listen on (default: 127.0.0.1)")
+    serve_group.add_argument("--port", type=int, help="port (default: 8765)")
+
+    startup_group = parser.add_argument_group("start-up time")
+    startup_group.add_argument("--startup-report", action="store_true",
+                               help="show which libraries the rest of the command line imports, and how long "
+                                    "each takes, instead of running it")
+
+    size_group = parser.add_argument_group("physical size")
+    size_group.add_argument("--size-mm", type=float,
+                            help="fit the code to this width in millimetres, quiet zone included, with every module "
+                                 "a whole number of device pixels")
+    size_group.add_argument("--dpi", dest="print_dpi", type=float,
+                            help="device resolution for --size-mm, the TIFF pages or the label printer "
+                                 "(default: 300, 203 for printers)")
+
+    barcode_group = parser.add_argument_group("barcode settings")
+    barcode_group.add_argument("--module-width", type=float, default=DEFAULT_OPTIONS['module_width'])
+    barcode_group.add_argument("--module-height", type=float, default=DEFAULT_OPTIONS['module_height'])
+    barcode_group.add_argument("--font-size", type=int, default=DEFAULT_OPTIONS['font_size'])
+    barcode_group.add_argument("--text-distance", type=int, default=DEFAULT_OPTIONS['text_distance'])
+    return parser
+
+
+def options_from_args(args):
+    return {key: getattr(args, key) for key in DEFAULT_OPTIONS}
+
+
+def batch_source(args):
+    return read_rows(args.input, args.input_format) if args.input else args.data
+
+
+def open_manifest(args):
+    if not (args.resume or args.manifest):
+        return None
+    from .manifest import Manifest
+    os.makedirs(args.output_dir, exist_ok=True)
+    return Manifest(args.manifest or os.path.join(args.output_dir, MANIFEST_NAME), args.verify)
+
+
+def resumed_source(args, manifest):
+    """
+    (items, first index) to run. An input file is read from the first item
+    the manifest still needs, as long as the names of the skipped items
+    cannot affect the names of later ones.
+    """
+    index, offset = manifest.resume_point() if manifest is not None else (0, None)
+    if not args.input or args.input == '-' or offset is None or not index_prefixed(args.template):
+        return batch_source(args), 0
+    return read_rows(args.input, args.input_format, offset), index
+
+
+# Counts of a batch run; `size` and `seconds` add up the files rendered in it.
+Tally = namedtuple('Tally', 'total failures reused resumed rendered size seconds')
+
+
+def count_results(results, report=False):
+    """Tally of a batch run, reporting every failure and, with `report`, every rendered file."""
+    total = failures = reused = resumed = rendered = size = 0
+    seconds = 0.0
+    for result in results:
+        total += 1
+        if result.error:
+            failures += 1
+            print(f"Error: item {result.index} ({result.data!r}): {result.error}", file=sys.stderr)
+        elif result.resumed:
+            resumed += 1
+        elif result.duplicate_of is not None:
+            reused += 1
+        if result.stats is not None:
+            rendered += 1
+            size += result.stats.size
+            seconds += result.stats.seconds
+            if report:
+                print(f"{result.output_path}: {result.stats.size} bytes in {result.stats.seconds * 1000:.1f} ms",
+                      file=sys.stderr)
+    return Tally(total, failures, reused, resumed, rendered, size, seconds)
+
+
+def stats_note(tally):
+    if not tally.rendered:
+        return ""
+    return (f"; {tally.size / tally.rendered:.0f} bytes and {tally.seconds * 1000 / tally.rendered:.1f} ms "
+            f"per rendered image")
+
+
+def run_archive_export(args):
+    from .archive import ArchiveWriter
+    from .batch import run_batch
+    items = plan_outputs(batch_source(args), "", args.template, args.format, args.barcode_type)
+    target = sys.stdout.buffer if args.archive == '-' else args.archive
+    with ArchiveWriter(target, args.archive_format) as archive:
+        tally = count_results(run_batch(
+            items, args.barcode_type, args.fill_color, args.back_color, workers=args.workers, dedupe=args.dedupe,
+            archive=archive, profile=args.profile, **options_from_args(args)), args.report)
+    # The archive itself may be going to stdout.
+    print(f"{tally.total - tally.failures} of {tally.total} codes written to "
+          f"{'stdout' if args.archive == '-' else args.archive}{reused_note(tally.reused)}{stats_note(tally)}",
+          file=sys.stderr if args.archive == '-' else sys.stdout)
+    return 1 if tally.failures else 0
+
+
+def run_batch_export(args):
+    from .batch import run_batch
+    manifest = open_manifest(args)
+    try:
+        source, start = resumed_source(args, manifest)
+        items = plan_outputs(source, args.output_dir, args.template, args.format, args.barcode_type, start)
+        tally = count_results(run_batch(
+            items, args.barcode_type, args.fill_color, args.back_color, workers=args.workers, dedupe=args.dedupe,
+            link_duplicates=args.link_duplicates, manifest=manifest, start=start, profile=args.profile,
+            **options_from_args(args)), args.report)
+    finally:
+        if manifest is not None:
+            manifest.close()
+    skipped = start + tally.resumed
+    print(f"{tally.total - tally.failures - tally.resumed} of {tally.total - tally.resumed} codes written to "
+          f"{args.output_dir}{reused_note(tally.reused)}" + (f"; {skipped} already done" if skipped else "") +
+          stats_note(tally))
+    return 1 if tally.failures else 0
+
+
+def reused_note(reused):
+    return f" ({reused} renders saved by reusing repeated values)" if reused else ""
+
+
+def run_sheet_export(args):
+    from .sheet import parse_grid, write_label_sheet
+    rows, columns = parse_grid(args.grid)
+    result = write_label_sheet(batch_source(args), args.sheet, args.barcode_type, args.fill_color, args.back_color,
+                               caption=args.caption, page_size=args.page_size, rows=rows, columns=columns,
+                               margin=args.margin, spacing=args.spacing, workers=args.workers,
+                               dedupe=args.dedupe, **options_from_args(args))
+    for index, data, error in result.failed:
+        print(f"Error: item {index} ({data!r}): {error}", file=sys.stderr)
+    total = result.written + len(result.failed)
+    print(f"{result.written} of {total} codes placed on {result.pages} page(s) in {args.sheet}"
+          f"{reused_note(result.reused)}")
+    return 1 if result.failed else 0
+
+
+def run_tiff_export(args):
+    from .tiff import write_tiff_pages
+    dpi = {'dpi': args.print_dpi} if args.print_dpi else {}
+    result = write_tiff_pages(batch_source(args), args.tiff, args.barcode_type, workers=args.workers,
+                              dedupe=args.dedupe, **dpi, **options_from_args(args))
+    for index, data, error in result.failed:
+        print(f"Error: item {index} ({data!r}): {error}", file=sys.stderr)
+    total = result.written + len(result.failed)
+    print(f"{result.written} of {total} codes written as pages of {args.tiff}{reused_note(result.reused)}")
+    return 1 if result.failed else 0
+
+
+def run_printer_export(args):
+    from .printer import write_printer_job
+    target = sys.stdout.buffer if args.printer == '-' else args.printer
+    dpi = args.print_dpi or DEFAULT_PRINTER_DPI
+    # Codes given a physical size are fitted at the printer's own resolution.
+    options = dict(options_from_args(args), print_dpi=dpi)
+    result = write_printer_job(batch_source(args), target, args.printer_language, args.barcode_type,
+                               workers=args.workers, dedupe=args.dedupe, dpi=dpi, **options)
+    for index, data, error in result.failed:
+        print(f"Error: item {index} ({data!r}): {error}", file=sys.stderr)
+    total = result.written + len(result.failed)
+    # The job itself may be going to stdout.
+    print(f"{result.written} of {total} labels written to {'stdout' if args.printer == '-' else args.printer}"
+          f"{reused_note(result.reused)}", file=sys.stderr if args.printer == '-' else sys.stdout)
+    return 1 if result.failed else 0
+
+
+def run_multi_format(args):
+    from .output import format_paths, save_formats
+    paths = format_paths(args.output, [extension for extension in args.also.split(',') if extension.strip()])
+    try:
+        results = save_formats(args.data, paths, args.barcode_type, args.fill_color, args.back_color, args.profile,
+                               **options_from_args(args))
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    for result in results:
+        if result.error:
+            print(f"Error: {result.path}: {result.error}", file=sys.stderr)
+        else:
+            print(f"{result.path}: {result.stats.size} bytes in {result.stats.seconds * 1000:.1f} ms")
+    return 1 if any(result.error for result in results) else 0
+
+
+def run_server(args):
+    from .server import DEFAULT_HOST, DEFAULT_PORT, serve
+    serve(args.host or DEFAULT_HOST, args.port or DEFAULT_PORT, args.workers)
+    return 0
+
+
+def run_startup_report(argv):
+    from .registry import startup_report
+    argv = [arg for arg in argv if arg != '--startup-report']
+    # Without a command to time, time the package import alone.
+    statement = f"from barcode_core.cli import main; main({argv!r})" if argv else "import barcode_core"
+    print(startup_report(statement))
+    return 0
+
+
+def run_single(args):
+    from .output import save_code
+    try:
+        stats = save_code(args.data, args.output, args.barcode_type, args.fill_color, args.back_color, args.profile,
+                          **options_from_args(args))
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    if args.report:
+        print(f"{args.output}: {stats.size} bytes in {stats.seconds * 1000:.1f} ms", file=sys.stderr)
+        if args.size_mm:
+            from .generators import encode_symbol, symbol_size_mm
+            symbol = encode_symbol(args.data, args.barcode_type, **options_from_args(args))
+            width, height = symbol_size_mm(symbol)
+            print(f"{args.output}: {width:.2f} x {height:.2f} mm at {symbol.dpi:g} dpi, "
+                  f"{symbol.module_width} pixels per module", file=sys.stderr)
+    return 0
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.startup_report:
+        try:
+            return run_startup_report(sys.argv[1:] if argv is None else argv)
+        except RuntimeError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+    try:
+        configure_cache(int(args.cache_size * 2 ** 20), args.cache_dir)
+    except (OSError, ValueError) as e:
+        parser.error(f"cannot use render cache: {e}")
+    if args.serve:
+        if args.data or args.input or args.output:
+            parser.error("--serve takes no data or output; clients send their requests")
+        try:
+            return run_server(args)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+    if args.input and args.data:
+        parser.error("give data values or --input, not both")
+    if (args.resume or args.manifest) and not args.output_dir:
+        parser.error("--resume and --manifest need --output-dir")
+    if sum(bool(target) for target in (args.archive, args.output_dir, args.sheet, args.tiff, args.printer)) > 1:
+        parser.error("choose one of --archive, --output-dir, --sheet, --tiff and --printer")
+    if args.sheet:
+        try:
+            return run_sheet_export(args)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+    if args.printer:
+        try:
+            return run_printer_export(args)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+    if args.tiff:
+        try:
+            return run_tiff_export(args)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+    if args.archive:
+        try:
+            return run_archive_export(args)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+    if args.output_dir:
+        try:
+            return run_batch_export(args)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+    if args.output is None or args.input or len(args.data) != 1:
+        parser.error("a single code needs exactly one data value and --output; use --output-dir for batches")
+    args.data = args.data[0]
+    if args.also:
+        return run_multi_format(args)
+    return run_single(args)
@@ -0,0 +1,198 @@
+import hashlib
+import json
+
+from PIL import ImageColor
+
+from .cache import get_cache
+from .options import DEFAULT_OPTIONS, LINEAR_DPI, LINEAR_OPTIONS, LINEAR_TYPES, QR_OPTIONS, SIZING_OPTIONS
+from .raster import image_from_raw, image_to_raw, rasterize
+from .registry import SYMBOLOGIES
+from .symbol import Symbol
+
+
+def mm_to_px(mm, dpi=LINEAR_DPI):
+    return max(1, round(mm * dpi / 25.4))
+
+
+def pt_to_px(pt, dpi=LINEAR_DPI):
+    return max(1, round(pt * dpi / 72))
+
+
+def generate_image(data, barcode_type='QR Code', fill_color="black", back_color="white", **options):
+    """
+    Render `data` as `barcode_type` and return a PIL image.
+
+    Any key of DEFAULT_OPTIONS may be passed as a keyword argument; missing
+    ones fall back to their defaults. Results go through the render cache
+    uncompressed (see raster.image_to_raw), apart from the PNG entries
+    save_code keeps for .png files.
+    """
+    cache = get_cache()
+    if not cache.enabled:
+        return rasterize(encode_symbol(data, barcode_type, **options), fill_color, back_color)
+    # Not a file extension, so save_code never finds these entries.
+    key = render_key(data, barcode_type, fill_color, back_color, 'image:raw', **options)
+    content = cache.get(key)
+    if content is not None:
+        return image_from_raw(content)
+    img = rasterize(encode_symbol(data, barcode_type, **options), fill_color, back_color)
+    cache.put(key, image_to_raw(img))
+    return img
+
+
+def resolve_options(options):
+    unknown = set(options) - set(DEFAULT_OPTIONS)
+    if unknown:
+        raise ValueError(f"Unknown option(s): {', '.join(sorted(unknown))}")
+    return dict(DEFAULT_OPTIONS, **options)
+
+
+def render_key(data, barcode_type='QR Code', fill_color="black", back_color="white", file_format='png',
+               profile='default', **options):
+    """
+    Canonical cache key for one rendering: a SHA-256 hex digest of the
+    symbology, the payload, the options that symbology actually reads,
+    the physical size when one is set, the colors as RGB, the output format
+    and the encoder profile.
+    Equivalent spellings such as "black" and "#000000" give the same key.
+    """
+    settings = resolve_options(options)
+    if barcode_type == 'QR Code':
+        used = QR_OPTIONS
+    elif barcode_type in LINEAR_TYPES:
+        used = LINEAR_OPTIONS
+    else:
+        used = {}
+    rendering = [barcode_type, data, {name: convert(settings[name]) for name, convert in used.items()},
+                 ImageColor.getrgb(fill_color), ImageColor.getrgb(back_color), file_format.lower()]
+    if settings['size_mm'] is not None:
+        rendering.append({name: convert(settings[name] or LINEAR_DPI) for name, convert in SIZING_OPTIONS.items()})
+    if profile != 'default':
+        # Appended only when set, so default renderings keep their keys.
+        rendering.append(profile)
+    canonical = json.dumps(rendering, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def encode_symbol(data, barcode_type='QR Code', **options):
+    """
+    Encode `data` as `barcode_type` into a Symbol, the module matrix every
+    output path renders from. Takes the same options as generate_image;
+    with `size_mm` set, the symbol is fitted to that width at `print_dpi`.
+    """
+    settings = resolve_options(options)
+    # The symbology's library is imported here the first time it is used.
+    encode = SYMBOLOGIES.get(barcode_type)
+
+    if barcode_type == 'QR Code':
+        version = int(settings['version'])
+        box_size = int(settings['box_size'])
+        border = int(settings['border'])
+        validate_inputs(data, barcode_type, version, box_size, border, None, None, None, None)
+        symbol = encode(data, version, settings['error_correction'], box_size, border)
+    elif barcode_type in LINEAR_TYPES:
+        module_width = float(settings['module_width'])
+        module_height = float(settings['module_height'])
+        font_size = int(settings['font_size'])
+        text_distance = int(settings['text_distance'])
+        validate_inputs(data, barcode_type, None, None, None, module_width, module_height, font_size,
+                        text_distance)
+        symbol = encode(data, barcode_type, module_width, module_height, font_size, text_distance)
+    else:
+        symbol = encode(data)
+    if settings['size_mm'] is not None:
+        return fit_symbol(symbol, float(settings['size_mm']), float(settings['print_dpi'] or LINEAR_DPI))
+    return symbol
+
+
+def fit_module_size(modules, size_mm, dpi):
+    """
+    Whole device pixels per module that bring `modules` modules closest to
+    `size_mm` at `dpi`. Raises ValueError if `size_mm` is narrower than one
+    pixel per module.
+    """
+    pixels = size_mm * dpi / 25.4
+    if pixels < modules:
+        raise ValueError(f"{size_mm:g} mm is too small for {modules} modules at {dpi:g} dpi; "
+                         f"use at least {modules * 25.4 / dpi:.2f} mm")
+    return round(pixels / modules)
+
+
+def fit_symbol(symbol, size_mm, dpi=LINEAR_DPI):
+    """
+    `symbol` resized so that its full width, quiet zone included, is as close
+    to `size_mm` millimetres as whole pixels per module allow at `dpi`.
+    Every module stays an exact block of device pixels, so nothing is ever
+    resampled and edges stay sharp on the printer. 2D codes keep their
+    module aspect ratio; linear codes keep their bar height and text size in
+    millimetres. Returns a new Symbol whose `dpi` is set; a `size_mm` below
+    one pixel per module raises ValueError.
+    """
+    if size_mm <= 0:
+        raise ValueError("Print size must be greater than 0")
+    if dpi <= 0:
+        raise ValueError("DPI must be greater than 0")
+    module = fit_module_size(symbol.columns + 2 * symbol.quiet_zone[0], size_mm, dpi)
+    factor = dpi / (symbol.dpi or LINEAR_DPI)
+    if symbol.is_linear:
+        module_height = max(1, round(symbol.module_height * factor))
+    else:
+        module_height = max(1, round(module * symbol.module_height / symbol.module_width))
+    font_size = max(1, round(symbol.font_size * factor)) if symbol.font_size else 0
+    return Symbol(symbol.modules, module, module_height, symbol.quiet_zone, symbol.text, font_size,
+                  round(symbol.text_distance * factor), dpi, symbol.guards, round(symbol.guard_height * factor),
+                  symbol.text_blocks)
+
+
+def symbol_size_mm(symbol):
+    """(width, height) of `symbol` in millimetres when printed at its resolution."""
+    dpi = symbol.dpi or LINEAR_DPI
+    return tuple(pixels * 25.4 / dpi for pixels in symbol.size())
+
+
+def generate_qr_code(data, version, error_correction, box_size, border, fill_color="black", back_color="white"):
+    symbol = SYMBOLOGIES.get('QR Code')(data, version, error_correction, box_size, border)
+    return rasterize(symbol, fill_color, back_color)
+
+
+def generate_barcode(data, barcode_type='EAN13', module_width=0.2, module_height=15, font_size=10,
+                     text_distance=5, fill_color="black", back_color="white"):
+    if barcode_type not in LINEAR_TYPES:
+        raise ValueError("Unsupported barcode type")
+    symbol = SYMBOLOGIES.get(barcode_type)(data, barcode_type, module_width, module_height, font_size, text_distance)
+    return rasterize(symbol, fill_color, back_color)
+
+
+def generate_datamatrix(data, fill_color="black", back_color="white"):
+    return rasterize(SYMBOLOGIES.get('DataMatrix')(data), fill_color, back_color)
+
+
+def generate_aztec(data, fill_color="black", back_color="white"):
+    return rasterize(SYMBOLOGIES.get('Aztec')(data), fill_color, back_color)
+
+
+def generate_pdf417(data, fill_color="black", back_color="white"):
+    return rasterize(SYMBOLOGIES.get('PDF417')(data), fill_color, back_color)
+
+
+def validate_inputs(data, barcode_type, version, box_size, border, module_width, module_height, font_size,
+                    text_distance):
+    if not data:
+        raise ValueError("Please enter data to encode")
+
+    if barcode_type == 'QR Code':
+        if not (1 <= version <= 40):
+            raise ValueError("QR Code version must be between 1 and 40")
+        if box_size <= 0:
+            raise ValueError("Box size must be greater than 0")
+        if border < 0:
+            raise ValueError("Border size cannot be negative")
+    else:
+        if module_width <= 0:
+            raise ValueError("Module width must be greater than 0")
+        if module_height <= 0:
+            raise ValueError("Module height must be greater than 0")
+        if font_size <= 0:
+            raise ValueError("Font size must be greater than 0")
+        if text_distance < 0:
+            raise ValueError("Text distance cannot be negative")
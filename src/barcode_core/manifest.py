@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+
+MANIFEST_NAME = ".batch-manifest.jsonl"
+
+
+def file_digest(path):
+    """SHA-256 hex digest of a file, read in 1 MiB blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class Manifest:
+    """
+    Append-only checkpoint of a batch export, one JSON line per finished
+    item: its index, input offset, output path and the SHA-256 and size of
+    the bytes written, or the error that stopped it.
+
+    Opening an existing manifest replays it to find where the batch can pick
+    up again. An item counts as done when its last record has no error and
+    its file still has the recorded size (and hash, with `verify`). Only the
+    unfinished items below the highest recorded index are remembered, so
+    memory does not grow with the length of the batch. A record cut short by
+    a crash is ignored and its item simply runs again.
+    """
+
+    def __init__(self, path, verify=False):
+        self.path = path
+        self.settings = None
+        self.high = -1
+        self.high_offset = None
+        self.pending = {}
+        complete = True
+        if os.path.exists(path):
+            complete = self.replay(verify)
+        self.file = open(path, 'a', encoding='utf-8')
+        if not complete:
+            # Terminate a record cut short by a crash so it cannot swallow the next one.
+            self.file.write("\n")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def replay(self, verify):
+        """Replay every record; returns False if the last line is incomplete."""
+        line = "\n"
+        with open(self.path, encoding='utf-8', errors='replace') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if 'settings' in record:
+                    self.settings = record['settings']
+                elif 'index' in record:
+                    self.replay_item(record, verify)
+        return line.endswith("\n")
+
+    def replay_item(self, record, verify):
+        index = record['index']
+        for missing in range(self.high + 1, index):
+            self.pending[missing] = None
+        if index > self.high:
+            self.high = index
+            self.high_offset = record.get('offset')
+        if record.get('error') is None and self.still_valid(record, verify):
+            self.pending.pop(index, None)
+        else:
+            self.pending[index] = record.get('offset')
+
+    @staticmethod
+    def still_valid(record, verify):
+        try:
+            if os.path.getsize(record['path']) != record['size']:
+                return False
+            return not verify or file_digest(record['path']) == record['sha256']
+        except (KeyError, OSError):
+            return False
+
+    def check_settings(self, settings):
+        """
+        Tie the manifest to one set of batch settings. A manifest written with
+        different settings raises ValueError instead of mixing two batches.
+        """
+        if self.settings is None:
+            self.settings = settings
+            self.append({'settings': settings})
+        elif self.settings != settings:
+            raise ValueError(f"{self.path} belongs to a batch with different settings; "
+                             f"remove it to start over")
+
+    def is_done(self, index):
+        return index <= self.high and index not in self.pending
+
+    def resume_point(self):
+        """
+        (index, offset) to restart reading the input from: the first item
+        that still needs work, or the last finished one (which is then
+        skipped). The offset is None when it is unknown.
+        """
+        if self.pending:
+            index = min(self.pending)
+            return index, self.pending[index]
+        if self.high < 0:
+            return 0, None
+        return self.high, self.high_offset
+
+    def record(self, index, offset, path, sha256=None, size=None, error=None):
+        if error is None:
+            entry = {'index': index, 'offset': offset, 'path': path, 'sha256': sha256, 'size': size}
+        else:
+            entry = {'index': index, 'offset': offset, 'path': path, 'error': error}
+        self.append(entry)
+
+    def append(self, entry):
+        self.file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
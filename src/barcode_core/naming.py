@@ -0,0 +1,110 @@
+import os
+import re
+import string
+
+DEFAULT_TEMPLATE = "{index:06d}_{data}.{ext}"
+
+# Characters that are invalid in file names on at least one common platform.
+_UNSAFE_CHARS = re.compile(r'[<>:"/\\|?*\x00-\x1f]')
+_RESERVED_NAMES = {"CON", "PRN", "AUX", "NUL"} | {f"COM{i}" for i in range(1, 10)} | {f"LPT{i}" for i in range(1, 10)}
+MAX_FIELD_LENGTH = 80
+
+
+def sanitize_filename(value, max_length=MAX_FIELD_LENGTH):
+    """
+    Make `value` safe to use as (part of) a file name on Windows, macOS and
+    Linux.
+    """
+    name = _UNSAFE_CHARS.sub("_", str(value)).strip().rstrip(". ")
+    name = name[:max_length]
+    if not name:
+        name = "_"
+    if name.split(".")[0].upper() in _RESERVED_NAMES:
+        name = "_" + name
+    return name
+
+
+class OutputNamer:
+    """
+    Turns batch items into unique output paths inside one directory.
+
+    The template is a str.format pattern with the fields `index`, `data`,
+    `type` and `ext`; `data` and `type` are sanitized before substitution.
+    Names that collide (case-insensitively) get a numeric suffix. Templates
+    that start with the decimal index followed by a separator, like
+    DEFAULT_TEMPLATE, cannot collide, so their names are not remembered and
+    memory stays flat on any batch size. Explicit per-item names bypass the
+    template; they get the default extension if they have none and are
+    checked against each other.
+    """
+
+    def __init__(self, directory, template=DEFAULT_TEMPLATE, ext="png", barcode_type=""):
+        self.directory = directory
+        self.template = template
+        self.ext = ext.lstrip(".").lower()
+        self.barcode_type = sanitize_filename(barcode_type)
+        self.used = set()
+        try:
+            self.format(0, "data")
+            self.unique = index_prefixed(template)
+        except (KeyError, IndexError, ValueError) as e:
+            raise ValueError(f"Invalid filename template {template!r}: {e}")
+
+    def format(self, index, data, barcode_type=None):
+        barcode_type = self.barcode_type if barcode_type is None else sanitize_filename(barcode_type)
+        return self.template.format(index=index, data=sanitize_filename(data), type=barcode_type, ext=self.ext)
+
+    def __call__(self, index, data, barcode_type=None, name=None):
+        if name is None:
+            name = sanitize_filename(self.format(index, data, barcode_type), max_length=255)
+            if self.unique:
+                return os.path.join(self.directory, name)
+        else:
+            name = sanitize_filename(name, max_length=255)
+            if "." not in name:
+                name = f"{name}.{self.ext}"
+        stem, dot, ext = name.rpartition(".")
+        if not dot:
+            stem, ext = name, ""
+        candidate = name
+        counter = 1
+        while candidate.lower() in self.used:
+            candidate = f"{stem}_{counter}.{ext}" if dot else f"{stem}_{counter}"
+            counter += 1
+        self.used.add(candidate.lower())
+        return os.path.join(self.directory, candidate)
+
+
+def index_prefixed(template):
+    """True if every name the template gives starts with the decimal index and a non-digit."""
+    fields = list(string.Formatter().parse(template))
+    literal, field, spec, conversion = fields[0] if fields else ("", None, None, None)
+    if literal or field != "index" or conversion or not re.fullmatch(r"0?\d*d?", spec or ""):
+        return False
+    following = fields[1][0] if len(fields) > 1 else ""
+    return bool(following) and not following[0].isdigit()
+
+
+def plan_outputs(datas, directory, template=DEFAULT_TEMPLATE, ext="png", barcode_type="", start=0):
+    """
+    Pair every payload in `datas` with its output path, creating `directory`
+    if needed; an empty `directory` gives bare names, as used for archive
+    members. Returns a lazy iterator of (data, output_path) tuples for
+    run_batch, so `datas` may be a stream of any length.
+
+    Items may also be readers.Row records; those become (data, output_path,
+    overrides, offset) tuples, named by their "output" override when present.
+    `start` is the index of the first item, for batches resumed part way.
+    """
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    namer = OutputNamer(directory, template, ext, barcode_type)
+    return (plan_item(namer, index, item) for index, item in enumerate(datas, start))
+
+
+def plan_item(namer, index, item):
+    if isinstance(item, str):
+        return item, namer(index, item)
+    overrides = dict(item.overrides or {})
+    name = overrides.pop('output', None)
+    return item.data, namer(index, item.data, overrides.get('type'), name), overrides, item.offset
@@ -0,0 +1,62 @@
+"""
+Code types and the settings the renderers and writers accept.
+
+This module imports nothing, so the command line can build its parser, and
+the batch readers check their overrides, without loading numpy or Pillow.
+generators.py, output.py and printer.py use these tables.
+"""
+BARCODE_TYPES = ["QR Code", "EAN13", "EAN8", "Code128", "Code39", "UPCA", "ISBN13", "ISBN10", "ISSN", "PZN", "JAN",
+                 "ITF", "GS1-128", "DataMatrix", "Aztec", "PDF417"]
+
+LINEAR_TYPES = ['EAN13', 'EAN8', 'Code128', 'Code39', 'UPCA', 'ISBN13', 'ISBN10', 'ISSN', 'PZN', 'JAN', 'ITF',
+                'GS1-128']
+
+# Settings understood by generate_image, with the same defaults the GUI starts with.
+DEFAULT_OPTIONS = {
+    'version': 1,
+    'error_correction': 'H',
+    'box_size': 10,
+    'border': 4,
+    'module_width': 0.2,
+    'module_height': 15,
+    'font_size': 10,
+    'text_distance': 5,
+    # Physical width in millimetres and device resolution; see fit_symbol.
+    'size_mm': None,
+    'print_dpi': None,
+}
+
+# The options each symbology reads, with the conversion encode_symbol applies.
+QR_OPTIONS = {'version': int, 'error_correction': str, 'box_size': int, 'border': int}
+LINEAR_OPTIONS = {'module_width': float, 'module_height': float, 'font_size': int, 'text_distance': int}
+SIZING_OPTIONS = {'size_mm': float, 'print_dpi': float}
+
+# Linear barcode sizes are given in millimetres and points, as python-barcode's
+# ImageWriter takes them, and converted to pixels at its default resolution.
+LINEAR_DPI = 300
+
+# Encoder settings per output profile and Pillow format. "default" is
+# Pillow's own behaviour; "fastest" spends as little CPU as possible on
+# compression and "smallest" as much as helps. Rasterized codes are
+# two-color palette images, which Pillow already writes as 1-bit PNG, and
+# only lossless settings are used: lossy compression blurs module edges.
+PROFILES = {
+    'default': {},
+    'fastest': {
+        'PNG': {'compress_level': 1},
+        'WEBP': {'lossless': True, 'method': 0, 'quality': 0},
+        'TIFF': {'compression': 'packbits'},
+    },
+    'smallest': {
+        'PNG': {'optimize': True},
+        'GIF': {'optimize': True},
+        # Higher WebP methods take seconds per code for no smaller files.
+        'WEBP': {'lossless': True, 'method': 4, 'quality': 100},
+        'TIFF': {'compression': 'tiff_adobe_deflate'},
+    },
+}
+
+PRINTER_LANGUAGES = ('zpl', 'epl')
+
+# Most thermal label printers print at 8 dots per millimetre.
+DEFAULT_PRINTER_DPI = 203
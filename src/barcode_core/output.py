@@ -0,0 +1,299 @@
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from PIL import Image
+
+from .cache import get_cache
+from .generators import encode_symbol, render_key
+from .options import PROFILES
+from .raster import rasterize
+from .registry import IMAGE_WRITERS, SYMBOL_WRITERS
+from .stripes import needs_stripes, write_striped
+
+# (description, pattern) pairs in the order the save dialogs offer them.
+FILE_TYPES = [("PNG", "*.png"), ("JPG", "*.jpg"), ("BMP", "*.bmp"), ("GIF", "*.gif"), ("TIFF", "*.tiff"),
+              ("ICO", "*.ico"), ("WEBP", "*.webp"), ("SVG", "*.svg"), ("PDF", "*.pdf"), ("EPS", "*.eps"),
+              ("PBM", "*.pbm"), ("PGM", "*.pgm"), ("PPM", "*.ppm"), ("XBM", "*.xbm"), ("XPM", "*.xpm"),
+              ("PCX", "*.pcx"), ("TGA", "*.tga")]
+
+
+# Image modes each format can store, best first. Two-color palette images
+# from the rasterizer are only expanded when the format cannot hold them.
+FORMAT_MODES = {
+    'PNG': ('P', '1', 'L', 'RGB'),
+    'GIF': ('P', '1', 'L'),
+    'BMP': ('P', '1', 'L', 'RGB'),
+    'TIFF': ('P', '1', 'L', 'RGB'),
+    'WEBP': ('P', 'L', 'RGB'),
+    'PCX': ('P', '1', 'L', 'RGB'),
+    'TGA': ('P', 'L', 'RGB'),
+    'ICO': ('RGBA', 'RGB'),
+    'JPEG': ('L', 'RGB'),
+    'EPS': ('L', 'RGB'),
+    'PBM': ('1',),
+    'PGM': ('L',),
+    'PPM': ('RGB',),
+    'XBM': ('1',),
+}
+
+
+# Bytes and encoding time of one output file.
+EncodeStats = namedtuple('EncodeStats', 'extension profile size seconds')
+# Outcome of one format written by save_formats; `stats` is None on error.
+FormatResult = namedtuple('FormatResult', 'extension path error stats')
+
+# Formats Pillow can store a print resolution in.
+DPI_FORMATS = ('PNG', 'TIFF', 'JPEG', 'BMP')
+
+# Formats drawn from the Symbol itself rather than from the raster image.
+VECTOR_EXTENSIONS = ('svg', 'pdf')
+
+# Pillow format written for each file extension; others are written as PNG.
+# SVG and PDF go through the registry.IMAGE_WRITERS plugins instead.
+PIL_FORMATS = {
+    'png': 'PNG',
+    'bmp': 'BMP',
+    'gif': 'GIF',
+    'tif': 'TIFF',
+    'tiff': 'TIFF',
+    'ico': 'ICO',
+    'webp': 'WEBP',
+    'jpg': 'JPEG',
+    'jpeg': 'JPEG',
+    'eps': 'EPS',
+    'pbm': 'PBM',
+    'pgm': 'PGM',
+    'ppm': 'PPM',
+    'xbm': 'XBM',
+    'pcx': 'PCX',
+    'tga': 'TGA',
+}
+
+
+def check_profile(profile):
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown output profile {profile!r}; use one of {', '.join(PROFILES)}")
+
+
+def is_black_on_white(img):
+    return img.mode == 'P' and img.getpalette()[:6] == [255, 255, 255, 0, 0, 0] and len(img.getpalette()) == 6
+
+
+def to_bilevel(img):
+    """
+    Mode "1" copy of `img` with the fill in black. Palette images from the
+    rasterizer are mapped by index, so light-on-dark colors stay correct.
+    """
+    if img.mode == '1':
+        return img
+    if img.mode == 'P' and len(img.getpalette()) == 6:
+        return img.point([255, 0] + [255] * 254, '1')
+    return img.convert('L').point(lambda value: 255 if value >= 128 else 0, '1')
+
+
+def convert_for_format(img, pil_format):
+    modes = FORMAT_MODES.get(pil_format, ('RGB',))
+    if img.mode in modes:
+        return img
+    if modes[0] == '1':
+        return to_bilevel(img)
+    if pil_format == 'GIF':
+        return img.convert("P", palette=Image.ADAPTIVE)
+    return img.convert('RGB' if 'RGB' in modes else modes[0])
+
+
+def write_image(img, file_path, pil_format, profile='default'):
+    params = PROFILES[profile].get(pil_format, {})
+    if profile == 'smallest' and pil_format == 'TIFF' and is_black_on_white(img):
+        # Plain black-on-white codes fit CCITT Group 4, far smaller than deflate.
+        img, params = to_bilevel(img), {'compression': 'group4'}
+    if 'dpi' in img.info and pil_format in DPI_FORMATS:
+        params = dict(params, dpi=img.info['dpi'])
+    img = convert_for_format(img, pil_format)
+    # Pillow registers the portable bitmap family under a single "PPM" writer.
+    if pil_format in ('PBM', 'PGM'):
+        pil_format = 'PPM'
+    img.save(file_path, format=pil_format, **params)
+
+
+def save_image(img, file_path, extension=None, profile='default'):
+    """
+    Save `img` to `file_path`, choosing the format from the file extension.
+    Unknown extensions are written as PNG. `file_path` may also be a binary
+    file object, in which case `extension` names the format. `profile` is a
+    key of PROFILES selecting the encoder settings.
+    """
+    check_profile(profile)
+    extension = (extension or file_path.split('.')[-1]).lower()
+    if extension in IMAGE_WRITERS:
+        IMAGE_WRITERS.get(extension)(img, file_path)
+    elif extension == 'xpm':
+        raise ValueError("XPM output is not supported by Pillow")
+    else:
+        write_image(img, file_path, PIL_FORMATS.get(extension, 'PNG'), profile)
+
+
+def save_symbol(symbol, file_path, fill_color="black", back_color="white", extension=None, profile='default'):
+    """
+    Save an encoded Symbol to `file_path`. SVG and PDF are written as vector
+    geometry; every other format is rasterized and handled by save_image
+    with the encoder settings of `profile`. PNG and TIFF files of more than
+    stripes.STRIPE_PIXELS pixels are rendered and encoded in stripes
+    instead, without ever holding the whole image.
+    """
+    extension = (extension or file_path.split('.')[-1]).lower()
+    if extension in SYMBOL_WRITERS:
+        SYMBOL_WRITERS.get(extension)(symbol, file_path, fill_color, back_color)
+    elif needs_stripes(symbol, extension):
+        write_striped(symbol, file_path, fill_color, back_color, extension, profile)
+    else:
+        save_image(rasterize(symbol, fill_color, back_color), file_path, extension, profile)
+
+
+def symbol_bytes(symbol, extension, fill_color="black", back_color="white", profile='default'):
+    """The file contents save_symbol would write for `extension`."""
+    buffer = BytesIO()
+    save_symbol(symbol, buffer, fill_color, back_color, extension, profile)
+    return buffer.getvalue()
+
+
+def render_bytes(data, extension='png', barcode_type='QR Code', fill_color="black", back_color="white",
+                 profile='default', **options):
+    """
+    Encoded file contents for `data` in the format of `extension`, served
+    from the render cache when the same code was rendered before.
+    """
+    check_profile(profile)
+    cache = get_cache()
+    if not cache.enabled:
+        return symbol_bytes(encode_symbol(data, barcode_type, **options), extension, fill_color, back_color, profile)
+    key = render_key(data, barcode_type, fill_color, back_color, extension, profile, **options)
+    content = cache.get(key)
+    if content is None:
+        content = symbol_bytes(encode_symbol(data, barcode_type, **options), extension, fill_color, back_color,
+                               profile)
+        cache.put(key, content)
+    return content
+
+
+def timed_render(data, extension='png', barcode_type='QR Code', fill_color="black", back_color="white",
+                 profile='default', **options):
+    """render_bytes that also returns the EncodeStats of the rendering."""
+    started = time.perf_counter()
+    content = render_bytes(data, extension, barcode_type, fill_color, back_color, profile, **options)
+    return content, EncodeStats(extension, profile, len(content), time.perf_counter() - started)
+
+
+def save_code(data, file_path, barcode_type='QR Code', fill_color="black", back_color="white", profile='default',
+              **options):
+    """
+    Encode `data` and save it to `file_path` like save_symbol, reusing cached
+    output for repeated codes. Returns the EncodeStats of the file; a cache
+    hit costs next to no time.
+    """
+    check_profile(profile)
+    extension = file_path.split('.')[-1].lower()
+    started = time.perf_counter()
+    cache = get_cache()
+    key = content = None
+    if cache.enabled:
+        key = render_key(data, barcode_type, fill_color, back_color, extension, profile, **options)
+        content = cache.get(key)
+    if content is None:
+        symbol = encode_symbol(data, barcode_type, **options)
+        if needs_stripes(symbol, extension):
+            # Streamed straight into the file; the output is too large to be worth caching.
+            write_striped(symbol, file_path, fill_color, back_color, extension, profile)
+            return EncodeStats(extension, profile, os.path.getsize(file_path), time.perf_counter() - started)
+        content = symbol_bytes(symbol, extension, fill_color, back_color, profile)
+        if key is not None:
+            cache.put(key, content)
+    with open(file_path, 'wb') as f:
+        f.write(content)
+    return EncodeStats(extension, profile, len(content), time.perf_counter() - started)
+
+
+def encode_format(symbol, img, extension, fill_color, back_color, profile):
+    """(content, seconds) of one format for save_formats, with `img` the shared rasterization."""
+    started = time.perf_counter()
+    buffer = BytesIO()
+    if extension in VECTOR_EXTENSIONS:
+        save_symbol(symbol, buffer, fill_color, back_color, extension, profile)
+    else:
+        # Image.save keeps per-call state on the image, so threads get their own copy.
+        save_image(img.copy(), buffer, extension, profile)
+    return buffer.getvalue(), time.perf_counter() - started
+
+
+def save_formats(data, file_paths, barcode_type='QR Code', fill_color="black", back_color="white",
+                 profile='default', **options):
+    """
+    Save one code to several files whose extensions select their formats,
+    e.g. a PNG for the web, an SVG for design and a PDF for print. `data` is
+    encoded once and rasterized at most once; the format encoders then run
+    concurrently in threads, which Pillow and zlib let run in parallel.
+    Cached formats are not encoded again.
+
+    Returns one FormatResult per path, in order. A format that fails, such
+    as XPM, is reported in its result without stopping the others; invalid
+    data raises ValueError as in save_code.
+    """
+    check_profile(profile)
+    cache = get_cache()
+    extensions = [path.split('.')[-1].lower() for path in file_paths]
+    contents = {}
+    if cache.enabled:
+        for extension in extensions:
+            key = render_key(data, barcode_type, fill_color, back_color, extension, profile, **options)
+            started = time.perf_counter()
+            content = cache.get(key)
+            if content is not None:
+                contents[extension] = content, time.perf_counter() - started
+    missing = [extension for extension in dict.fromkeys(extensions) if extension not in contents]
+    errors = {}
+    if missing:
+        symbol = encode_symbol(data, barcode_type, **options)
+        raster = any(extension not in VECTOR_EXTENSIONS for extension in missing)
+        img = rasterize(symbol, fill_color, back_color) if raster else None
+        with ThreadPoolExecutor(max_workers=len(missing)) as executor:
+            futures = {extension: executor.submit(encode_format, symbol, img, extension, fill_color, back_color,
+                                                  profile)
+                       for extension in missing}
+        for extension, future in futures.items():
+            try:
+                contents[extension] = future.result()
+            except Exception as e:
+                errors[extension] = f"{type(e).__name__}: {e}"
+                continue
+            if cache.enabled:
+                cache.put(render_key(data, barcode_type, fill_color, back_color, extension, profile, **options),
+                          contents[extension][0])
+
+    results = []
+    for path, extension in zip(file_paths, extensions):
+        if extension in errors:
+            results.append(FormatResult(extension, path, errors[extension], None))
+            continue
+        content, seconds = contents[extension]
+        try:
+            with open(path, 'wb') as f:
+                f.write(content)
+        except OSError as e:
+            results.append(FormatResult(extension, path, f"{type(e).__name__}: {e}", None))
+            continue
+        results.append(FormatResult(extension, path, None, EncodeStats(extension, profile, len(content), seconds)))
+    return results
+
+
+def format_paths(file_path, extensions):
+    """`file_path` followed by the same path with each extra extension, e.g. for save_formats."""
+    stem = os.path.splitext(file_path)[0]
+    paths = [file_path]
+    for extension in extensions:
+        path = f"{stem}.{extension.strip().lstrip('.').lower()}"
+        if path not in paths:
+            paths.append(path)
+    return paths
@@ -0,0 +1,213 @@
+import zlib
+from array import array
+
+from PIL import ImageColor
+from reportlab.lib.colors import Color
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+
+from .vector import symbol_geometry, text_positions
+
+
+def pdf_color(color):
+    red, green, blue = ImageColor.getrgb(color)[:3]
+    return Color(red / 255, green / 255, blue / 255)
+
+
+def new_canvas(file_path, width, height):
+    """reportlab canvas of one `width` x `height` point page size, with compressed page streams."""
+    return canvas.Canvas(file_path, pagesize=(width, height), pageCompression=1)
+
+
+def draw_symbol_pdf(pdf_canvas, symbol, x, y, fill_color="black", back_color="white", factor=1.0):
+    """
+    Draw `symbol` on a reportlab canvas with its bottom-left corner at
+    (x, y) points, one symbol pixel mapping to `factor` points. All modules
+    are emitted as rectangle operators of a single filled path, in symbol
+    pixel units under one transformation matrix.
+    """
+    width, height = symbol.size()
+    pdf_canvas.saveState()
+    pdf_canvas.transform(factor, 0, 0, factor, x, y)
+    if back_color is not None:
+        pdf_canvas.setFillColor(pdf_color(back_color))
+        pdf_canvas.rect(0, 0, width, height, stroke=0, fill=1)
+    pdf_canvas.setFillColor(pdf_color(fill_color))
+    rects = [f"{left} {height - top - h} {w} {h} re" for left, top, w, h in symbol_geometry(symbol)]
+    pdf_canvas.addLiteral("\n".join(rects) + "\nf")
+    if symbol.text_height():
+        pdf_canvas.setFont("Courier", symbol.font_size)
+        for center_x, baseline, text in text_positions(symbol):
+            pdf_canvas.drawCentredString(center_x, height - baseline, text)
+    pdf_canvas.restoreState()
+
+
+def write_pdf(symbol, file_path, fill_color="black", back_color="white", scale=1):
+    """
+    Single-page vector PDF sized like the raster output, one pixel per point,
+    or at its physical size for symbols fitted to a resolution.
+    `file_path` may also be a binary file object.
+    """
+    factor = 72 / symbol.dpi if symbol.dpi else scale
+    width, height = symbol.size()
+    pdf_canvas = new_canvas(file_path, width * factor, height * factor)
+    draw_symbol_pdf(pdf_canvas, symbol, 0, 0, fill_color, back_color, factor)
+    pdf_canvas.showPage()
+    pdf_canvas.save()
+
+
+def number(value):
+    """`value` as a PDF number, with at most four decimals."""
+    return f"{value:.4f}".rstrip('0').rstrip('.') or "0"
+
+
+def color_operands(color):
+    """The "r g b" operands of a color for the rg operator."""
+    return " ".join(number(channel / 255) for channel in ImageColor.getrgb(color)[:3])
+
+
+def text_operators(text, font, size, center_x, baseline):
+    """
+    Operators drawing `text` centred on `center_x` in one of the
+    PdfStream.FONTS, which hold Latin-1 text; other characters become "?".
+    """
+    x = center_x - stringWidth(text, font, size) / 2
+    encoded = text.encode('cp1252', 'replace').decode('latin-1')
+    escaped = encoded.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+    return f"BT /{PdfStream.FONTS[font]} {number(size)} Tf {number(x)} {number(baseline)} Td ({escaped}) Tj ET"
+
+
+def symbol_operators(symbol, fill_color="black", back_color="white"):
+    """
+    PDF operators drawing `symbol` as draw_symbol_pdf does, in symbol pixel
+    units with the origin at its bottom-left corner, for a PdfStream.
+    """
+    width, height = symbol.size()
+    operators = []
+    if back_color is not None:
+        operators.append(f"{color_operands(back_color)} rg 0 0 {width} {height} re f")
+    operators.append(f"{color_operands(fill_color)} rg")
+    operators.extend(f"{number(left)} {number(height - top - h)} {number(w)} {number(h)} re"
+                     for left, top, w, h in symbol_geometry(symbol))
+    operators.append("f")
+    if symbol.text_height():
+        operators.extend(text_operators(text, "Courier", symbol.font_size, center_x, height - baseline)
+                         for center_x, baseline, text in text_positions(symbol))
+    return "\n".join(operators)
+
+
+class PdfStream:
+    """
+    Writes a PDF of equally sized pages one page at a time, for documents
+    too large to build in memory the way a reportlab canvas does until it
+    is saved. Every page is compressed and written as soon as it is
+    finished, and content shared between pages is written once as a form
+    XObject. Only the file offset of each object written is kept, eight
+    bytes per page and per form, for the cross-reference table close()
+    writes. `file_path` may also be a binary
+    file object; it is never read or seeked.
+
+    Content is given as PDF operators in points; the standard fonts in
+    FONTS can be used without embedding them.
+    """
+
+    # Resource name of each font pages and forms may use.
+    FONTS = {'Helvetica': 'F1', 'Courier': 'F2'}
+
+    def __init__(self, file_path, width, height):
+        self.width = width
+        self.height = height
+        self.owned = isinstance(file_path, str)
+        self.file = open(file_path, 'wb') if self.owned else file_path
+        self.position = 0
+        # Offset of object n at index n - 1, and the object numbers of the pages.
+        self.offsets = array('Q')
+        self.pages = array('Q')
+        self.operators = []
+        self.forms = set()
+        self.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        # Object 1 is the page tree, written last when every page is known.
+        self.offsets.append(0)
+        fonts = []
+        for font, name in self.FONTS.items():
+            font_object = self.add_object(f"<</Type/Font/Subtype/Type1/BaseFont/{font}/Encoding/WinAnsiEncoding>>")
+            fonts.append(f"/{name} {font_object} 0 R")
+        self.font_resources = f"/Font<<{''.join(fonts)}>>"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, data):
+        self.file.write(data)
+        self.position += len(data)
+
+    def add_object(self, body):
+        """Write one indirect object and return its number. `body` is text or bytes."""
+        self.offsets.append(self.position)
+        object_number = len(self.offsets)
+        if isinstance(body, str):
+            body = body.encode('latin-1')
+        self.write(f"{object_number} 0 obj\n".encode('ascii') + body + b"\nendobj\n")
+        return object_number
+
+    def add_stream(self, entries, content):
+        data = zlib.compress(content.encode('latin-1'))
+        return self.add_object(f"<<{entries}/Filter/FlateDecode/Length {len(data)}>>stream\n".encode('latin-1') +
+                               data + b"\nendstream")
+
+    def add_form(self, content, width, height):
+        """Write `content` as a form XObject of `width` x `height` points and return its name for draw_form."""
+        form = self.add_stream(f"/Type/XObject/Subtype/Form/BBox[0 0 {number(width)} {number(height)}]"
+                               f"/Resources<<{self.font_resources}>>", content)
+        return f"X{form}"
+
+    def draw(self, operators, x=0, y=0, factor=1.0):
+        """Add operators to the current page, with their origin moved to (x, y) and scaled by `factor`."""
+        if (x, y, factor) != (0, 0, 1.0):
+            operators = f"q {number(factor)} 0 0 {number(factor)} {number(x)} {number(y)} cm\n{operators}\nQ"
+        self.operators.append(operators)
+
+    def draw_form(self, name, x, y, factor=1.0):
+        """Place the form `name` with its origin at (x, y), scaled by `factor`."""
+        self.operators.append(f"q {number(factor)} 0 0 {number(factor)} {number(x)} {number(y)} cm /{name} Do Q")
+        self.forms.add(name)
+
+    def end_page(self):
+        """Compress and write the current page; later operators go on a new one."""
+        content = self.add_stream("", "\n".join(self.operators))
+        forms = "".join(f"/{name} {name[1:]} 0 R" for name in sorted(self.forms))
+        self.pages.append(self.add_object(
+            f"<</Type/Page/Parent 1 0 R/MediaBox[0 0 {number(self.width)} {number(self.height)}]"
+            f"/Contents {content} 0 R/Resources<<{self.font_resources}/XObject<<{forms}>>>>>>"))
+        self.operators = []
+        self.forms = set()
+
+    def close(self):
+        """Write the page tree, catalog and cross-reference table; a document without pages gets a blank one."""
+        if not self.pages:
+            self.end_page()
+        self.offsets[0] = self.position
+        kids = " ".join(f"{page} 0 R" for page in self.pages)
+        self.write(f"1 0 obj\n<</Type/Pages/Kids[{kids}]/Count {len(self.pages)}>>\nendobj\n".encode('ascii'))
+        catalog = self.add_object("<</Type/Catalog/Pages 1 0 R>>")
+        xref = self.position
+        entries = "".join(f"{offset:010d} 00000 n \n" for offset in self.offsets)
+        self.write(f"xref\n0 {len(self.offsets) + 1}\n0000000000 65535 f \n{entries}"
+                   f"trailer\n<</Size {len(self.offsets) + 1}/Root {catalog} 0 R>>\n"
+                   f"startxref\n{xref}\n%%EOF\n".encode('ascii'))
+        if self.owned:
+            self.file.close()
+
+
+def save_as_pdf(img, file_path):
+    # Only used for plain images; save_symbol writes vector PDF.
+    # ImageReader takes the PIL image directly; going through an in-memory
+    # PNG would only compress and decompress it again.
+    pdf_canvas = canvas.Canvas(file_path, pagesize=(img.width, img.height))
+    pdf_canvas.drawImage(ImageReader(img), 0, 0, width=img.width, height=img.height)
+    pdf_canvas.showPage()
+    pdf_canvas.save()
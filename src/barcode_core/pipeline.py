@@ -0,0 +1,138 @@
+import os
+import queue
+import threading
+from collections import deque
+from concurrent import futures
+from itertools import chain, islice
+
+from .cache import configure_cache, get_cache
+
+# Items that may wait between two stages before the earlier one blocks.
+DEFAULT_QUEUE_SIZE = 256
+# Items sent to a worker process in one task.
+DEFAULT_CHUNKSIZE = 4
+# How often blocked stages check whether the consumer has gone away.
+POLL_INTERVAL = 0.1
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, error):
+        self.error = error
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def run_stages(source, stages, maxsize=DEFAULT_QUEUE_SIZE):
+    """
+    Stream `source` through `stages`, yielding what the last stage produces.
+
+    A stage is a function that takes an iterator and returns an iterator.
+    Every stage runs in its own thread and hands its output to the next one
+    through a queue holding at most `maxsize` items; a full queue blocks the
+    producer, so a slow stage throttles everything before it, down to the
+    reading of `source`. Memory use therefore does not depend on how many
+    items pass through. An exception in any stage is re-raised to the
+    consumer, and closing the generator early stops every stage.
+    """
+    stop = threading.Event()
+    inbound = iter(source)
+    for stage in stages:
+        outbound = queue.Queue(maxsize)
+        thread = threading.Thread(target=_pump, args=(stage, inbound, outbound, stop), daemon=True)
+        thread.start()
+        inbound = _drain(outbound, stop)
+    try:
+        yield from inbound
+    finally:
+        stop.set()
+
+
+def _pump(stage, inbound, outbound, stop):
+    results = stage(inbound)
+    try:
+        for result in results:
+            if not _put(outbound, result, stop):
+                return
+        _put(outbound, _DONE, stop)
+    except BaseException as e:
+        _put(outbound, _Failure(e), stop)
+    finally:
+        close = getattr(results, 'close', None)
+        if close is not None:
+            close()
+
+
+def _put(outbound, item, stop):
+    while not stop.is_set():
+        try:
+            outbound.put(item, timeout=POLL_INTERVAL)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _drain(inbound, stop):
+    while True:
+        try:
+            item = inbound.get(timeout=POLL_INTERVAL)
+        except queue.Empty:
+            if stop.is_set():
+                return
+            continue
+        if item is _DONE:
+            return
+        if isinstance(item, _Failure):
+            raise item.error
+        yield item
+
+
+def run_chunk(task, chunk):
+    return [task(item) for item in chunk]
+
+
+def bounded_imap(task, iterable, workers=None, chunksize=None, window=None):
+    """
+    Apply `task` to every element of `iterable` in a process pool, yielding
+    results in input order.
+
+    Input is read lazily: at most `window` chunks of `chunksize` items are
+    in flight at once (two per worker by default), so results are produced
+    as soon as the first chunks finish and a slow consumer holds the input
+    back. With a single worker, or input that fits in one chunk, the work
+    runs in-process.
+    """
+    workers = workers or default_workers()
+    if workers < 1:
+        raise ValueError("Worker count must be at least 1")
+    chunksize = chunksize or DEFAULT_CHUNKSIZE
+    window = window or workers * 2
+
+    items = iter(iterable)
+    first = list(islice(items, chunksize))
+    second = list(islice(items, chunksize)) if workers > 1 else []
+    if not second:
+        for item in chain(first, items):
+            yield task(item)
+        return
+
+    # Workers get a render cache configured like this process's, so a shared
+    # disk tier is used by every worker; concurrent.futures loads
+    # multiprocessing only now, on first access to the pool class.
+    executor = futures.ProcessPoolExecutor(max_workers=workers, initializer=configure_cache,
+                                           initargs=get_cache().settings())
+    try:
+        pending = deque(executor.submit(run_chunk, task, chunk) for chunk in (first, second))
+        while pending:
+            while len(pending) < window:
+                chunk = list(islice(items, chunksize))
+                if not chunk:
+                    break
+                pending.append(executor.submit(run_chunk, task, chunk))
+            yield from pending.popleft().result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,186 @@
+import math
+import threading
+from collections import namedtuple
+
+from .cache import get_cache
+from .generators import encode_symbol, render_key
+from .raster import image_from_raw, image_to_raw, rasterize
+from .symbol import Symbol
+
+# Canvas size of the preview pane, in pixels.
+PREVIEW_SIZE = (600, 600)
+
+# Quiet time after the last edit before the preview re-renders.
+PREVIEW_DELAY_MS = 250
+
+# Outcome of one preview render: `image` is None when `error` is set.
+PreviewResult = namedtuple('PreviewResult', 'generation image error')
+
+
+class RenderToken:
+    """
+    Handed to every render; `cancelled` turns True as soon as a newer
+    request supersedes it, so a long render can stop between its stages.
+    """
+
+    def __init__(self, worker, generation):
+        self.worker = worker
+        self.generation = generation
+        self.callbacks = []
+
+    @property
+    def cancelled(self):
+        return self.worker.generation != self.generation
+
+    def on_cancel(self, callback):
+        """
+        Call `callback()` once this render is superseded, e.g. to cancel a
+        job it queued elsewhere; at once if it already is.
+        """
+        with self.worker.lock:
+            if not self.cancelled:
+                self.callbacks.append(callback)
+                return
+        callback()
+
+
+class PreviewWorker:
+    """
+    Renders previews on one background thread, keeping only the newest
+    request. `render(token, *args)` returns an image; it should check
+    `token.cancelled` between expensive steps and return None when set.
+
+    submit() never blocks. While a render is running, further requests
+    replace each other and only the last one is rendered next; a result
+    that was superseded while it rendered is dropped, and the callbacks the
+    render registered with token.on_cancel() are called. GUIs call poll()
+    from their event loop to pick up the newest finished result, so nothing
+    but painting happens on the UI thread, and can stop polling once busy()
+    is False.
+    """
+
+    def __init__(self, render):
+        self.render = render
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.pending = None
+        self.result = None
+        self.running = False
+        self.closed = False
+        self.token = None
+
+    def supersede(self):
+        # Caller holds the lock; the returned callbacks are run after releasing it.
+        self.generation += 1
+        if self.token is None:
+            return []
+        callbacks, self.token.callbacks = self.token.callbacks, []
+        return callbacks
+
+    def submit(self, *args):
+        """Queue a render of `args`, superseding any earlier request. Returns its generation."""
+        with self.lock:
+            callbacks = self.supersede()
+            generation = self.generation
+            self.pending = (generation, args)
+            if not self.running and not self.closed:
+                self.running = True
+                threading.Thread(target=self.run, name="preview-render", daemon=True).start()
+        for callback in callbacks:
+            callback()
+        return generation
+
+    def cancel(self):
+        """Supersede every queued and running render without starting a new one."""
+        with self.lock:
+            callbacks = self.supersede()
+            self.pending = None
+        for callback in callbacks:
+            callback()
+
+    def run(self):
+        while True:
+            with self.lock:
+                if self.pending is None or self.closed:
+                    self.running = False
+                    self.token = None
+                    return
+                generation, args = self.pending
+                self.pending = None
+                token = self.token = RenderToken(self, generation)
+            try:
+                result = PreviewResult(generation, self.render(token, *args), None)
+            except Exception as e:
+                result = PreviewResult(generation, None, e)
+            with self.lock:
+                if not token.cancelled:
+                    self.result = result
+
+    def busy(self):
+        """
+        True while a request is queued or rendering. Once it turns False,
+        the last result is already there for poll().
+        """
+        with self.lock:
+            return self.running
+
+    def poll(self):
+        """The newest finished result not returned before, or None."""
+        with self.lock:
+            result, self.result = self.result, None
+            return result
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            callbacks = self.supersede()
+            self.pending = None
+        for callback in callbacks:
+            callback()
+
+
+def preview_symbol(symbol, size=PREVIEW_SIZE):
+    """
+    `symbol` with its pixel sizes scaled by the largest factor that still
+    fits `size`: a whole multiple when it is smaller than the canvas,
+    otherwise whole pixels per module rounded down. Modules stay blocks of
+    whole pixels, so no resampling is needed to display it.
+    """
+    width, height = symbol.size()
+    factor = min(size[0] / width, size[1] / height)
+    if factor >= 1:
+        multiple = int(factor)
+
+        def fit(pixels):
+            return pixels * multiple
+    else:
+        def fit(pixels):
+            return max(1, math.floor(pixels * factor))
+    return Symbol(symbol.modules, fit(symbol.module_width), fit(symbol.module_height), symbol.quiet_zone,
+                  symbol.text, fit(symbol.font_size) if symbol.font_size else 0,
+                  fit(symbol.text_distance) if symbol.text else 0, guards=symbol.guards,
+                  guard_height=fit(symbol.guard_height) if symbol.guard_height else 0, text_blocks=symbol.text_blocks)
+
+
+def generate_preview(data, barcode_type='QR Code', fill_color="black", back_color="white", size=PREVIEW_SIZE,
+                     **options):
+    """
+    Render `data` directly at display size for a `size` canvas, using
+    preview_symbol instead of scaling down the full-resolution image, so the
+    cost depends on the canvas and not on box size, scale or print size.
+    Only a symbol too large for the canvas even at one pixel per module is
+    reduced afterwards. Results are cached uncompressed per canvas size.
+    """
+    cache = get_cache()
+    key = None
+    if cache.enabled:
+        key = render_key(data, barcode_type, fill_color, back_color, f"preview:{size[0]}x{size[1]}", **options)
+        content = cache.get(key)
+        if content is not None:
+            return image_from_raw(content)
+    img = rasterize(preview_symbol(encode_symbol(data, barcode_type, **options), size), fill_color, back_color)
+    if img.width > size[0] or img.height > size[1]:
+        img = img.convert('RGB').reduce(math.ceil(max(img.width / size[0], img.height / size[1])))
+    if key is not None:
+        cache.put(key, image_to_raw(img))
+    return img
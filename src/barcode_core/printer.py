@@ -0,0 +1,221 @@
+import numpy as np
+
+from .batch import RecentOutputs, SheetResult, encode_batch
+from .options import DEFAULT_OPTIONS, DEFAULT_PRINTER_DPI, LINEAR_DPI, PRINTER_LANGUAGES
+from .raster import rasterize
+from .symbol import Symbol
+
+# Labels kept for repeated payloads; a label is at most a few kilobytes.
+LABEL_WINDOW = 1024
+
+# Symbologies with a native ZPL command. The rest, including this
+# application's "Aztec" (a QR code drawn at a different scale), are sent as
+# ^GF bitmaps so the printout matches the other outputs.
+ZPL_NATIVE = ('QR Code', 'DataMatrix', 'PDF417', 'Code128', 'Code39', 'EAN13', 'JAN', 'EAN8', 'UPCA', 'ITF')
+# EPL2 B command selectors. 2D codes are not portable across EPL
+# firmware and are sent as GW bitmaps.
+EPL_BARCODES = {
+    'Code128': '1',
+    'Code39': '3C',
+    'EAN13': 'E30',
+    'JAN': 'E30',
+    'EAN8': 'E80',
+    'UPCA': 'UA0',
+    'ITF': '2',
+}
+# Digits sent to the printer for codes whose check digit it computes itself.
+NATIVE_DIGITS = {'EAN13': 12, 'JAN': 12, 'EAN8': 7, 'UPCA': 11}
+
+# Characters ZPL treats as commands or as the ^FH hex indicator.
+_ZPL_SPECIAL = frozenset(b'^~_')
+
+
+def language_for(target):
+    """Printer language implied by a file name: epl for .epl files, zpl otherwise."""
+    return 'epl' if isinstance(target, str) and target.lower().endswith('.epl') else 'zpl'
+
+
+def dots(pixels, dpi, source_dpi=LINEAR_DPI):
+    """Printer dots for a length the rasterizer draws as `pixels` at `source_dpi`."""
+    return max(1, round(pixels * dpi / source_dpi))
+
+
+def printer_symbol(symbol, dpi):
+    """
+    `symbol` with its module, text and font sizes converted to printer dots.
+    A symbol fitted at the printer's own resolution is used as it is.
+    """
+    if symbol.dpi == dpi:
+        return symbol
+    source_dpi = symbol.dpi or LINEAR_DPI
+    return Symbol(symbol.modules, dots(symbol.module_width, dpi, source_dpi),
+                  dots(symbol.module_height, dpi, source_dpi), symbol.quiet_zone, symbol.text,
+                  dots(symbol.font_size, dpi, source_dpi) if symbol.font_size else 0,
+                  dots(symbol.text_distance, dpi, source_dpi) if symbol.text else 0, dpi, symbol.guards,
+                  dots(symbol.guard_height, dpi, source_dpi) if symbol.guard_height else 0, symbol.text_blocks)
+
+
+def label_bitmap(symbol):
+    """Packed rows (1 = dark) of the whole symbol, human-readable text included."""
+    mask = np.asarray(rasterize(symbol)) == 1
+    return np.packbits(mask, axis=1)
+
+
+def native_data(symbol, data, barcode_type):
+    """Payload of a native linear barcode command, without printer-computed check characters."""
+    if barcode_type == 'Code128':
+        return data
+    if barcode_type == 'Code39':
+        return data.upper()
+    text = symbol.text or data
+    return text[:NATIVE_DIGITS.get(barcode_type, len(text))]
+
+
+def zpl_field(data):
+    """^FH^FD field data, with command characters and non-ASCII bytes hex-escaped."""
+    return ''.join(f'_{byte:02X}' if byte in _ZPL_SPECIAL or not 32 <= byte < 127 else chr(byte)
+                   for byte in data.encode('utf-8'))
+
+
+def zpl_barcode(symbol, data, barcode_type, options):
+    """ZPL commands drawing `symbol` natively, or None if there is no native command."""
+    if barcode_type not in ZPL_NATIVE:
+        return None
+    module = symbol.module_width
+    origin = f"^FO{symbol.quiet_zone[0] * module},{symbol.quiet_zone[1] * module}"
+    if barcode_type == 'QR Code':
+        error_correction = options.get('error_correction', DEFAULT_OPTIONS['error_correction'])
+        return f"{origin}^BQN,2,{min(module, 10)}^FH^FD{error_correction}A,{zpl_field(data)}^FS"
+    if barcode_type == 'DataMatrix':
+        return f"{origin}^BXN,{module},200^FH^FD{zpl_field(data)}^FS"
+    if barcode_type == 'PDF417':
+        # 17 modules per codeword column plus start and stop patterns.
+        columns = (symbol.columns - 1) // 17 - 4
+        return f"{origin}^BY{module}^B7N,{symbol.module_height},2,{columns}^FH^FD{zpl_field(data)}^FS"
+    readable = 'Y' if symbol.text else 'N'
+    height = symbol.module_height
+    if barcode_type == 'Code128':
+        command = f"^BCN,{height},{readable},N,N,A"
+    elif barcode_type == 'Code39':
+        command = f"^B3N,Y,{height},{readable},N"
+    elif barcode_type in ('EAN13', 'JAN'):
+        command = f"^BEN,{height},{readable},N"
+    elif barcode_type == 'EAN8':
+        command = f"^B8N,{height},{readable},N"
+    elif barcode_type == 'UPCA':
+        command = f"^BUN,{height},{readable},N,Y"
+    else:
+        command = f"^B2N,{height},{readable},N,N"
+    return f"{origin}^BY{module},3{command}^FH^FD{zpl_field(native_data(symbol, data, barcode_type))}^FS"
+
+
+def zpl_label(symbol, data, barcode_type, options):
+    """One ^XA...^XZ label for an encoded symbol already converted to printer dots."""
+    width, height = symbol.size()
+    body = zpl_barcode(symbol, data, barcode_type, options)
+    if body is None:
+        rows = label_bitmap(symbol)
+        total = rows.size
+        body = f"^FO0,0^GFA,{total},{total},{rows.shape[1]},{rows.tobytes().hex().upper()}^FS"
+    # ^CI28 reads the hex-escaped field data as UTF-8.
+    return f"^XA^CI28^PW{width}^LL{height}^LH0,0{body}^XZ\n".encode('ascii')
+
+
+def epl_label(symbol, data, barcode_type):
+    """One EPL2 label (N ... P1) for an encoded symbol already converted to printer dots."""
+    width, height = symbol.size()
+    header = f"\nN\nq{width}\nQ{height},24\n".encode('ascii')
+    selector = EPL_BARCODES.get(barcode_type)
+    if selector is None:
+        rows = label_bitmap(symbol)
+        # EPL prints cleared bits, so the bitmap is inverted.
+        body = f"GW0,0,{rows.shape[1]},{rows.shape[0]},".encode('ascii') + (~rows).tobytes() + b"\n"
+        return header + body + b"P1\n"
+    module = symbol.module_width
+    quoted = native_data(symbol, data, barcode_type).replace('\\', '\\\\').replace('"', '\\"')
+    readable = 'B' if symbol.text else 'N'
+    x, y = symbol.quiet_zone[0] * module, symbol.quiet_zone[1] * module
+    body = f'B{x},{y},0,{selector},{module},{module * 3},{symbol.module_height},{readable},"{quoted}"\n'
+    return header + body.encode('utf-8') + b"P1\n"
+
+
+class PrinterJob:
+    """
+    One print job for a ZPL or EPL thermal label printer, one label per
+    symbol. Symbologies the printer encodes itself are sent as native
+    barcode commands of a few dozen bytes, which the printer renders at
+    full speed; the others fall back to a bitmap. Sizes are converted from
+    the rasterizer's pixels to printer dots at `dpi`.
+
+    `target` is a path or a binary file object, such as standard output or
+    a socket file on the printer's raw port 9100. Labels are written as
+    they are added.
+    """
+
+    def __init__(self, target, language=None, dpi=DEFAULT_PRINTER_DPI):
+        language = language or language_for(target)
+        if language not in PRINTER_LANGUAGES:
+            raise ValueError(f"Unknown printer language {language!r}; use one of {', '.join(PRINTER_LANGUAGES)}")
+        if dpi <= 0:
+            raise ValueError("DPI must be positive")
+        self.language = language
+        self.dpi = dpi
+        self.owned = isinstance(target, str)
+        self.file = open(target, 'wb') if self.owned else target
+        self.labels = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def label(self, symbol, data, barcode_type='QR Code', options=None):
+        """The printer commands for one label, as bytes."""
+        symbol = printer_symbol(symbol, self.dpi)
+        if self.language == 'epl':
+            return epl_label(symbol, data, barcode_type)
+        return zpl_label(symbol, data, barcode_type, options or {})
+
+    def add_label(self, label):
+        self.file.write(label)
+        self.labels += 1
+
+    def add(self, symbol, data, barcode_type='QR Code', options=None):
+        label = self.label(symbol, data, barcode_type, options)
+        self.add_label(label)
+        return label
+
+    def close(self):
+        self.file.flush()
+        if self.owned:
+            self.file.close()
+
+
+def write_printer_job(datas, target, language=None, barcode_type='QR Code', dpi=DEFAULT_PRINTER_DPI, workers=None,
+                      dedupe=True, **options):
+    """
+    Encode every payload in `datas` (in parallel) and write one label per
+    item into a single ZPL or EPL job, in input order. Like
+    write_label_sheet, failed items are skipped and listed in the returned
+    SheetResult, whose `pages` counts the labels, and readers.Row overrides
+    apply except for the colors; label printers print black.
+
+    With `dedupe`, the commands of a repeated payload are sent again without
+    encoding it twice; `reused` in the result counts those labels.
+    """
+    failed = []
+    reused = 0
+    recent = RecentOutputs(LABEL_WINDOW)
+    with PrinterJob(target, language, dpi) as job:
+        for item in encode_batch(datas, barcode_type, workers, dedupe=dedupe, window=LABEL_WINDOW, **options):
+            if item.error:
+                failed.append((item.index, item.data, item.error))
+            elif item.duplicate_of is not None:
+                job.add_label(recent.get(item.duplicate_of))
+                reused += 1
+            else:
+                label = job.add(item.symbol, item.data, item.barcode_type, item.options)
+                if dedupe:
+                    recent.add(item.index, label)
+    return SheetResult(job.labels, failed, job.labels, reused)
@@ -0,0 +1,156 @@
+import os
+import struct
+from importlib.util import find_spec
+
+import numpy as np
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+
+# The monospace font python-barcode ships for its human-readable line. The
+# package is located without importing it, which only linear codes need.
+FONT_PATH = os.path.join(find_spec('barcode').submodule_search_locations[0], "fonts", "DejaVuSansMono.ttf")
+
+# Header of an uncompressed image in the render cache: mode, width, height,
+# horizontal and vertical resolution (0 when unset) and palette length.
+RAW_HEADER = struct.Struct('<4sIIddH')
+
+
+def scale_modules(modules, module_width, module_height):
+    """
+    Blow every module up to a module_width x module_height block in a single
+    broadcast copy.
+    """
+    rows, columns = modules.shape
+    blocks = np.broadcast_to(modules[:, None, :, None], (rows, module_height, columns, module_width))
+    return blocks.reshape(rows * module_height, columns * module_width)
+
+
+def rasterize_mask(symbol, scale=1):
+    """
+    Return the full pixel mask (True = dark) of `symbol`, quiet zone, guard
+    bar extensions and text area included, scaled by the integer factor
+    `scale`.
+    """
+    if scale < 1 or int(scale) != scale:
+        raise ValueError("Scale must be a positive integer")
+    scale = int(scale)
+    module_width = symbol.module_width * scale
+    module_height = symbol.module_height * scale
+    quiet_x = symbol.quiet_zone[0] * module_width
+    quiet_y = symbol.quiet_zone[1] * module_width
+    width, height = symbol.size(scale)
+
+    mask = np.zeros((height, width), dtype=bool)
+    bars = scale_modules(symbol.modules, module_width, module_height)
+    mask[quiet_y:quiet_y + bars.shape[0], quiet_x:quiet_x + bars.shape[1]] = bars
+    draw_guards(mask, symbol, scale)
+    return mask
+
+
+def draw_guards(mask, symbol, scale=1, top=0):
+    """Extend the guard bars below the others; `mask` starts at pixel row `top` of the symbol."""
+    if symbol.guards is None:
+        return
+    module_width = symbol.module_width * scale
+    left = symbol.quiet_zone[0] * module_width
+    first = symbol.quiet_zone[1] * module_width + symbol.rows * symbol.module_height * scale - top
+    guards = np.repeat(symbol.guards, module_width)
+    mask[max(first, 0):max(first + symbol.guard_height * scale, 0), left:left + guards.size] |= guards
+
+
+def draw_text(img, symbol, fill, scale=1, top=0):
+    """Draw the human-readable line; `img` starts at pixel row `top` of the symbol."""
+    if not symbol.text_height():
+        return
+    quiet_x, quiet_y = symbol.quiet_zone
+    module_width = symbol.module_width * scale
+    baseline = (quiet_y * module_width + symbol.rows * symbol.module_height * scale +
+                symbol.text_distance * scale) - top
+    font = ImageFont.truetype(FONT_PATH, symbol.font_size * scale)
+    draw = ImageDraw.Draw(img)
+    for column, text in symbol.text_layout():
+        draw.text(((quiet_x + column) * module_width, baseline), text, font=font, fill=fill, anchor="md")
+
+
+def rasterize(symbol, fill_color="black", back_color="white", scale=1):
+    """
+    Render `symbol` to a two-color palette image: index 0 is the background
+    and index 1 the fill, so each pixel costs one byte and PNG/GIF/TIFF can
+    store it at one bit per pixel. Scaling and the quiet zone are done with
+    whole-array NumPy operations; only the optional text line is drawn with
+    PIL.
+    """
+    mask = rasterize_mask(symbol, scale)
+    # The bool mask is reinterpreted as palette indices 0/1 and handed to
+    # Pillow as raw bytes; no intermediate file format is involved.
+    img = Image.fromarray(mask.view(np.uint8), "P")
+    img.putpalette(ImageColor.getrgb(back_color)[:3] + ImageColor.getrgb(fill_color)[:3])
+    draw_text(img, symbol, 1, scale)
+    if symbol.dpi:
+        # Formats that can record a resolution print fitted symbols at their size.
+        img.info['dpi'] = (symbol.dpi * scale, symbol.dpi * scale)
+    return img
+
+
+def iter_mask_stripes(symbol, stripe_rows, scale=1):
+    """
+    Yield the pixel mask of `symbol`, as rasterize_mask would return it, in
+    horizontal stripes of `stripe_rows` rows (the last may be shorter). Only
+    one stripe exists at a time, so memory follows the stripe, not the
+    symbol. The area below the bars, with the guard bar extensions and the
+    text line, is rendered once as a small band.
+    """
+    if scale < 1 or int(scale) != scale:
+        raise ValueError("Scale must be a positive integer")
+    if stripe_rows < 1:
+        raise ValueError("Stripes need at least one row")
+    scale = int(scale)
+    module_width = symbol.module_width * scale
+    module_height = symbol.module_height * scale
+    quiet_x = symbol.quiet_zone[0] * module_width
+    quiet_y = symbol.quiet_zone[1] * module_width
+    width, height = symbol.size(scale)
+    bars_end = quiet_y + symbol.rows * module_height
+
+    band = None
+    if symbol.footer_height():
+        band_img = Image.new("P", (width, height - bars_end), 0)
+        draw_text(band_img, symbol, 1, scale, top=bars_end)
+        band = np.asarray(band_img) == 1
+        draw_guards(band, symbol, scale, top=bars_end)
+
+    for top in range(0, height, stripe_rows):
+        bottom = min(top + stripe_rows, height)
+        stripe = np.zeros((bottom - top, width), dtype=bool)
+        first, last = max(top, quiet_y), min(bottom, bars_end)
+        if first < last:
+            module_rows = symbol.modules[(np.arange(first, last) - quiet_y) // module_height]
+            stripe[first - top:last - top, quiet_x:quiet_x + symbol.columns * module_width] = \
+                np.repeat(module_rows, module_width, axis=1)
+        if band is not None and bottom > bars_end:
+            first = max(top, bars_end)
+            stripe[first - top:] |= band[first - bars_end:bottom - bars_end]
+        yield stripe
+
+
+def image_to_raw(img):
+    """
+    `img` as uncompressed bytes for the render cache: a RAW_HEADER, the
+    palette and the pixels, so a cached image costs a copy to restore
+    instead of a PNG encode and decode.
+    """
+    palette = bytes(img.getpalette(rawmode='RGB') or ()) if img.mode == 'P' else b''
+    dpi_x, dpi_y = img.info.get('dpi', (0, 0))
+    header = RAW_HEADER.pack(img.mode.encode('ascii'), img.width, img.height, dpi_x, dpi_y, len(palette))
+    return header + palette + img.tobytes()
+
+
+def image_from_raw(content):
+    """The image image_to_raw turned into `content`."""
+    mode, width, height, dpi_x, dpi_y, palette_size = RAW_HEADER.unpack_from(content)
+    pixels = memoryview(content)[RAW_HEADER.size:]
+    img = Image.frombytes(mode.rstrip(b'\0').decode('ascii'), (width, height), pixels[palette_size:])
+    if palette_size:
+        img.putpalette(bytes(pixels[:palette_size]))
+    if dpi_x or dpi_y:
+        img.info['dpi'] = (dpi_x, dpi_y)
+    return img
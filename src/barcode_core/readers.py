@@ -0,0 +1,167 @@
+import csv
+import json
+import mmap
+import os
+import sys
+from collections import namedtuple
+
+from .options import DEFAULT_OPTIONS
+
+# One batch input record. `overrides` holds the per-row settings that were
+# given (see OVERRIDE_FIELDS); `offset` is the byte offset of the record in
+# the input, or None when the input is not a byte stream.
+Row = namedtuple('Row', 'data overrides offset', defaults=(None, None))
+
+# Columns / keys a row may set besides "data". "type" selects the symbology
+# and "output" the output file name; the rest are the DEFAULT_OPTIONS keys
+# and the two colors.
+OVERRIDE_FIELDS = ('type',) + tuple(DEFAULT_OPTIONS) + ('fill_color', 'back_color', 'output')
+
+_OVERRIDE_KEYS = frozenset(OVERRIDE_FIELDS)
+
+INPUT_FORMATS = ('auto', 'csv', 'jsonl', 'lines')
+
+
+def make_row(record, offset=None):
+    """Row from a mapping with a "data" key and optional override fields."""
+    if 'data' not in record:
+        raise ValueError(f"Input record has no 'data' field: {record!r}")
+    overrides = {key: value for key, value in record.items()
+                 if key in _OVERRIDE_KEYS and value is not None and value != ""}
+    return Row(str(record['data']), overrides, offset)
+
+
+def iter_lines(source, start=0):
+    """
+    Yield (offset, line) for every line of `source`, decoded as UTF-8 with
+    the line ending and a leading byte order mark removed. A path is read
+    through a memory map, so multi-gigabyte files are paged in by the OS
+    instead of read into Python buffers; "-" reads standard input. `start`
+    is a byte offset to begin at, for paths only.
+    """
+    if not isinstance(source, (str, os.PathLike)) or source == '-':
+        if start:
+            raise ValueError("Only input files can be read from an offset")
+        yield from _iter_stream(sys.stdin.buffer if source == '-' else source)
+        return
+    with open(source, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            mapped.seek(start)
+            offset = start
+            for line in iter(mapped.readline, b""):
+                yield offset, decode_line(line, offset)
+                offset += len(line)
+
+
+def decode_line(line, offset):
+    text = line.decode('utf-8') if isinstance(line, bytes) else line
+    if not offset:
+        # Spreadsheet exports often start with a UTF-8 byte order mark.
+        text = text.lstrip('\ufeff')
+    return text.rstrip('\r\n')
+
+
+def _iter_stream(stream):
+    offset = 0
+    for line in stream:
+        yield offset, decode_line(line, offset)
+        offset += len(line) if isinstance(line, bytes) else len(line.encode('utf-8'))
+
+
+def read_lines(source, start=0):
+    """One Row per non-empty line; the whole line is the payload, commas included."""
+    for offset, line in iter_lines(source, start):
+        if line:
+            yield Row(line, {}, offset)
+
+
+def read_jsonl(source, start=0):
+    """
+    One Row per non-empty line of JSON Lines input. A line is either an
+    object with a "data" key and optional override keys, or a bare string.
+    """
+    for offset, line in iter_lines(source, start):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"Invalid JSON at byte {offset}: {e}")
+        if isinstance(record, str):
+            yield Row(record, {}, offset)
+        elif isinstance(record, dict):
+            yield make_row(record, offset)
+        else:
+            raise ValueError(f"Expected an object or string at byte {offset}")
+
+
+def read_csv(source, start=0):
+    """
+    One Row per CSV record. The first line is a header that must contain a
+    "data" column; columns named like OVERRIDE_FIELDS override the batch
+    settings for their row when the cell is not empty, others are ignored.
+    Quoted fields may contain commas and line breaks. A non-zero `start`
+    must be the offset of a record; the header is still read from the top.
+    """
+    lines = iter_lines(source)
+    record_start = None
+
+    def texts():
+        # Remembers where the record csv.reader is currently reading began.
+        # `lines` is looked up on every step, so it can be moved past the header.
+        nonlocal record_start
+        for offset, line in iter(lambda: next(lines, None), None):
+            if record_start is None:
+                record_start = offset
+            yield line + "\n"
+
+    reader = csv.reader(texts())
+    header = next(reader, None)
+    if header is None:
+        return
+    if start:
+        lines.close()
+        lines = iter_lines(source, start)
+    record_start = None
+    header = [name.strip().lower() for name in header]
+    if 'data' not in header:
+        raise ValueError("CSV input needs a 'data' column in its header")
+    for record in reader:
+        offset, record_start = record_start, None
+        if not any(record):
+            continue
+        yield make_row(dict(zip(header, record)), offset)
+
+
+READERS = {
+    'csv': read_csv,
+    'jsonl': read_jsonl,
+    'lines': read_lines,
+}
+
+
+def detect_format(source):
+    if source == '-' or not isinstance(source, (str, os.PathLike)):
+        return 'lines'
+    extension = os.fspath(source).split('.')[-1].lower()
+    if extension == 'csv':
+        return 'csv'
+    if extension in ('jsonl', 'ndjson'):
+        return 'jsonl'
+    return 'lines'
+
+
+def read_rows(source, input_format='auto', start=0):
+    """
+    Stream Rows from a file path, "-" for standard input, or an open file.
+    `input_format` is one of INPUT_FORMATS; "auto" picks CSV for .csv files,
+    JSON Lines for .jsonl/.ndjson and one payload per line otherwise.
+    `start` skips to the byte offset of a record, such as Row.offset.
+    """
+    if input_format not in INPUT_FORMATS:
+        raise ValueError(f"Unknown input format {input_format!r}; use one of {', '.join(INPUT_FORMATS)}")
+    if input_format == 'auto':
+        input_format = detect_format(source)
+    return READERS[input_format](source, start)
@@ -0,0 +1,140 @@
+import importlib
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from collections import namedtuple
+
+# Seconds each plugin module took to import in this process, in load order.
+# A module whose libraries were already loaded by something else costs
+# next to nothing here.
+IMPORT_TIMES = {}
+
+# One line of an import-time report: `self` is the module's own import time
+# and `cumulative` includes the modules it imported first, both in seconds;
+# `depth` is 0 for modules imported by the statement itself.
+ImportCost = namedtuple('ImportCost', 'module self cumulative depth')
+
+_IMPORTTIME_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)')
+
+
+class Registry:
+    """
+    Named plugins that are imported the first time they are used. Each name
+    maps to a "module:attribute" target; get() imports the module, caches
+    the attribute and records the import cost in IMPORT_TIMES, so a
+    symbology or writer whose library is never used is never loaded.
+    """
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.targets = {}
+        self.plugins = {}
+        self.lock = threading.Lock()
+
+    def register(self, name, target):
+        """Add or replace the plugin `name`; `target` is "package.module:attribute"."""
+        with self.lock:
+            self.targets[name] = target
+            self.plugins.pop(name, None)
+
+    def __contains__(self, name):
+        return name in self.targets
+
+    def names(self):
+        return list(self.targets)
+
+    def loaded(self):
+        """Names of the plugins imported so far."""
+        return [name for name in self.targets if name in self.plugins]
+
+    def module(self, name):
+        """The module of plugin `name`, imported if it was not yet."""
+        try:
+            target = self.targets[name]
+        except KeyError:
+            raise ValueError(f"Unsupported {self.kind} {name!r}")
+        module_name = target.partition(':')[0]
+        module = sys.modules.get(module_name)
+        if module is None:
+            started = time.perf_counter()
+            module = importlib.import_module(module_name)
+            IMPORT_TIMES.setdefault(module_name, time.perf_counter() - started)
+        return module
+
+    def get(self, name):
+        plugin = self.plugins.get(name)
+        if plugin is None:
+            plugin = getattr(self.module(name), self.targets[name].partition(':')[2])
+            with self.lock:
+                self.plugins[name] = plugin
+        return plugin
+
+
+# Encoders by code type. QR Code takes (data, version, error_correction,
+# box_size, border), the linear types (data, barcode_type, module_width,
+# module_height, font_size, text_distance) and the rest (data).
+SYMBOLOGIES = Registry('barcode type')
+SYMBOLOGIES.register('QR Code', 'barcode_core.symbologies.qr:encode_qr_code')
+for _name in ('EAN13', 'EAN8', 'Code128', 'Code39', 'UPCA', 'ISBN13', 'ISBN10', 'ISSN', 'PZN', 'JAN', 'ITF',
+              'GS1-128'):
+    SYMBOLOGIES.register(_name, 'barcode_core.symbologies.linear:encode_barcode')
+SYMBOLOGIES.register('DataMatrix', 'barcode_core.symbologies.datamatrix:encode_datamatrix')
+SYMBOLOGIES.register('Aztec', 'barcode_core.symbologies.aztec:encode_aztec')
+SYMBOLOGIES.register('PDF417', 'barcode_core.symbologies.pdf417:encode_pdf417')
+
+# Writers drawing a Symbol as vectors, by file extension:
+# (symbol, file_path, fill_color, back_color).
+SYMBOL_WRITERS = Registry('vector format')
+SYMBOL_WRITERS.register('svg', 'barcode_core.svg:write_svg')
+SYMBOL_WRITERS.register('pdf', 'barcode_core.pdf:write_pdf')
+
+# Writers embedding a plain image in a format Pillow cannot write, by file
+# extension: (img, file_path).
+IMAGE_WRITERS = Registry('image format')
+IMAGE_WRITERS.register('svg', 'barcode_core.svg:save_as_svg')
+IMAGE_WRITERS.register('pdf', 'barcode_core.pdf:save_as_pdf')
+
+
+def import_costs(statement="import barcode_core", python=None):
+    """
+    Import cost of every module `statement` loads in a fresh interpreter,
+    measured with `python -X importtime`, as ImportCost records in the
+    order the imports finished. Modules the interpreter loads at start-up
+    are included. Raises RuntimeError if the statement fails.
+    """
+    # The child finds this copy of the package even when it is not installed.
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    path = os.pathsep.join(filter(None, [package_root, os.environ.get('PYTHONPATH')]))
+    result = subprocess.run([python or sys.executable, '-X', 'importtime', '-c', statement], capture_output=True,
+                            text=True, env=dict(os.environ, PYTHONPATH=path))
+    if result.returncode != 0:
+        raise RuntimeError(f"{statement!r} failed: {result.stderr.strip()}")
+    costs = []
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            costs.append(ImportCost(match.group(4), int(match.group(1)) / 1e6, int(match.group(2)) / 1e6,
+                                    len(match.group(3)) // 2))
+    return costs
+
+
+def startup_report(statement="import barcode_core", top=15, python=None):
+    """
+    Text report of the import time of `statement` in a fresh interpreter,
+    broken down by top-level package (numpy, PIL, qrcode, ...) with the
+    slowest first, e.g. to see which libraries a command loads before it
+    does any work.
+    """
+    costs = import_costs(statement, python)
+    packages = {}
+    for cost in costs:
+        package = cost.module.split('.')[0]
+        packages[package] = packages.get(package, 0) + cost.self
+    total = sum(packages.values())
+    lines = [f"{statement}: {total * 1000:.1f} ms importing {len(costs)} modules"]
+    for package, seconds in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]:
+        lines.append(f"{seconds * 1000:9.1f} ms  {package}")
+    return "\n".join(lines)
@@ -0,0 +1,280 @@
+import asyncio
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import partial
+from itertools import islice
+
+from .cache import configure_cache, get_cache
+from .generators import encode_symbol
+from .pipeline import DEFAULT_CHUNKSIZE, default_workers, run_chunk
+from .raster import rasterize
+
+INTERACTIVE = 'interactive'
+BATCH = 'batch'
+
+# Snapshot of a batch for progress displays. `total` is None when the input
+# length is unknown, and `eta` (seconds) then too.
+BatchProgress = namedtuple('BatchProgress', 'done total elapsed rate eta paused')
+
+
+class BatchCancelled(Exception):
+    """Raised inside a batch, and by its future, once the batch is cancelled."""
+
+
+def warm_worker():
+    """Render a QR code and a linear barcode, loading the libraries and fonts a first real job would."""
+    for barcode_type in ('QR Code', 'Code128'):
+        rasterize(encode_symbol('0', barcode_type))
+
+
+class BatchJob:
+    """
+    Handle of one batch running on a Scheduler. Its items only ever take
+    workers that no interactive job is waiting for. pause() stops new items
+    from starting, resume() lets them go on and cancel() drops the queued
+    items and ends the batch with BatchCancelled; items already running
+    finish first. `future` resolves to whatever the batch function returned.
+    """
+
+    def __init__(self, scheduler, total=None, limit=None):
+        self.scheduler = scheduler
+        self.total = total
+        self.limit = limit or scheduler.workers
+        self.future = Future()
+        self.done = 0
+        self.running = 0
+        self.paused = False
+        self.cancelled = False
+        self.started = time.monotonic()
+        self.paused_at = None
+        self.paused_for = 0.0
+
+    def pause(self):
+        self.scheduler.call(self.set_paused, True)
+
+    def resume(self):
+        self.scheduler.call(self.set_paused, False)
+
+    def cancel(self):
+        self.scheduler.call(self.scheduler.cancel_batch, self)
+
+    def set_paused(self, paused):
+        # Runs on the scheduler's event loop.
+        if paused == self.paused or self.cancelled:
+            return
+        self.paused = paused
+        if paused:
+            self.paused_at = time.monotonic()
+        else:
+            self.paused_for += time.monotonic() - self.paused_at
+            self.paused_at = None
+            self.scheduler.dispatch()
+
+    def progress(self):
+        """BatchProgress with the items finished so far, their rate and the remaining time."""
+        now = self.paused_at or time.monotonic()
+        elapsed = now - self.started - self.paused_for
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        eta = None
+        if self.total is not None and rate > 0:
+            eta = max(0, self.total - self.done) / rate
+        return BatchProgress(self.done, self.total, elapsed, rate, eta, self.paused)
+
+    def map(self, task, iterable, workers=None, chunksize=None, window=None):
+        """
+        Drop-in for pipeline.bounded_imap that runs the chunks on the
+        scheduler's batch lane; `workers` is ignored, the pool is shared.
+        Results come back in input order.
+        """
+        chunksize = chunksize or DEFAULT_CHUNKSIZE
+        window = window or self.limit * 2
+        items = iter(iterable)
+        pending = deque()
+        while True:
+            while len(pending) < window:
+                if self.cancelled:
+                    raise BatchCancelled()
+                chunk = list(islice(items, chunksize))
+                if not chunk:
+                    break
+                pending.append(self.scheduler.submit_batch(self, run_chunk, task, chunk))
+            if not pending:
+                return
+            results = pending.popleft().result()
+            self.done += len(results)
+            yield from results
+
+
+class Scheduler:
+    """
+    Owns the worker process pool of an application and shares it between
+    two lanes. Interactive jobs (a preview, a single save) always get the
+    next free worker; batch items fill whatever capacity is left, so a long
+    export never makes the user wait for more than the chunk a worker is
+    busy with.
+
+    Queues and dispatching live on an asyncio event loop in a background
+    thread; every public method is thread-safe and returns at once, so it
+    can be called from a GUI event loop. Job functions and their arguments
+    must be picklable.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or default_workers()
+        if self.workers < 1:
+            raise ValueError("Worker count must be at least 1")
+        # Workers get a render cache configured like this process's.
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=configure_cache,
+                                            initargs=get_cache().settings())
+        self.lanes = {INTERACTIVE: deque(), BATCH: deque()}
+        self.busy = 0
+        self.closing = False
+        self.closed = False
+        self.call_lock = threading.Lock()
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="scheduler", daemon=True)
+        self.thread.start()
+
+    def call(self, function, *args):
+        """Run `function(*args)` on the event loop; returns False once the scheduler is shut down."""
+        with self.call_lock:
+            if self.closed:
+                return False
+            self.loop.call_soon_threadsafe(function, *args)
+        return True
+
+    def submit(self, function, *args, **kwargs):
+        """Run `function(*args, **kwargs)` on the interactive lane; returns a concurrent.futures.Future."""
+        future = Future()
+        if not self.call(self.enqueue, INTERACTIVE, (partial(function, *args, **kwargs), future, None)):
+            future.cancel()
+        return future
+
+    def warm_up(self):
+        """
+        Start every worker process now and have it render once, so the first
+        jobs do not pay for process start-up and imports. Returns the
+        futures of the warm-up renders.
+        """
+        return [self.submit(warm_worker) for _ in range(self.workers)]
+
+    def submit_batch(self, batch, function, *args):
+        future = Future()
+        if not self.call(self.enqueue, BATCH, (partial(function, *args), future, batch)):
+            future.cancel()
+        return future
+
+    def start(self, function, *args, total=None, limit=None, **kwargs):
+        """
+        Run `function(*args, mapper=job.map, **kwargs)` in a thread of its
+        own and return its BatchJob. `function` is a batch entry point such
+        as batch.run_batch or tiff.write_tiff_pages, which then renders
+        through the batch lane; a generator is consumed into a list. `total`
+        is the number of items, if known, for the ETA; `limit` caps the
+        workers this batch may use at once.
+        """
+        job = BatchJob(self, total, limit)
+
+        def run():
+            if not job.future.set_running_or_notify_cancel():
+                return
+            try:
+                result = function(*args, mapper=job.map, **kwargs)
+                if hasattr(result, '__next__'):
+                    result = list(result)
+            except BaseException as e:
+                job.future.set_exception(BatchCancelled() if job.cancelled else e)
+            else:
+                job.future.set_result(result)
+
+        threading.Thread(target=run, name="batch", daemon=True).start()
+        return job
+
+    def enqueue(self, lane, entry):
+        if self.closing or (entry[2] is not None and entry[2].cancelled):
+            entry[1].cancel()
+            return
+        self.lanes[lane].append(entry)
+        self.dispatch()
+
+    def next_entry(self):
+        if self.lanes[INTERACTIVE]:
+            return self.lanes[INTERACTIVE].popleft()
+        batch_lane = self.lanes[BATCH]
+        for position, entry in enumerate(batch_lane):
+            batch = entry[2]
+            if not batch.paused and batch.running < batch.limit:
+                del batch_lane[position]
+                return entry
+        return None
+
+    def dispatch(self):
+        # Runs on the event loop whenever a job arrives, a worker frees up or a batch resumes.
+        while not self.closing and self.busy < self.workers:
+            entry = self.next_entry()
+            if entry is None:
+                return
+            self.busy += 1
+            if entry[2] is not None:
+                entry[2].running += 1
+            self.loop.create_task(self.run(entry))
+
+    async def run(self, entry):
+        function, future, batch = entry
+        try:
+            if future.set_running_or_notify_cancel():
+                try:
+                    result = await self.loop.run_in_executor(self.executor, function)
+                except BaseException as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+        finally:
+            self.busy -= 1
+            if batch is not None:
+                batch.running -= 1
+            self.dispatch()
+            if self.closing and not self.busy:
+                self.loop.stop()
+
+    def cancel_batch(self, batch):
+        batch.cancelled = True
+        if batch.paused:
+            # Progress resumes counting, as if the batch had been resumed first.
+            batch.paused_for += time.monotonic() - batch.paused_at
+            batch.paused_at = None
+            batch.paused = False
+        kept = deque()
+        for entry in self.lanes[BATCH]:
+            if entry[2] is batch:
+                entry[1].cancel()
+            else:
+                kept.append(entry)
+        self.lanes[BATCH] = kept
+
+    def shutdown(self):
+        """
+        Cancel every queued job, let the running ones finish and resolve
+        their futures, then stop the loop and the pool. Jobs submitted
+        afterwards come back cancelled.
+        """
+        def stop():
+            self.closing = True
+            for lane in self.lanes.values():
+                for entry in lane:
+                    entry[1].cancel()
+                lane.clear()
+            if not self.busy:
+                self.loop.stop()
+        # `stop` is the last callback the loop ever gets, so every job
+        # submitted before it is queued or running by the time it runs.
+        with self.call_lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.loop.call_soon_threadsafe(stop)
+        self.thread.join()
+        self.loop.close()
+        self.executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,404 @@
+import asyncio
+import ipaddress
+import json
+import mimetypes
+import socket
+from io import BytesIO
+from urllib.parse import parse_qsl, urlsplit
+
+from .archive import ARCHIVE_FORMATS, ArchiveWriter
+from .batch import describe_error, run_batch
+from .cache import get_cache
+from .generators import render_key
+from .naming import DEFAULT_TEMPLATE, plan_outputs
+from .options import BARCODE_TYPES
+from .output import check_profile, render_bytes
+from .readers import read_rows
+from .scheduler import Scheduler
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# A rendering is fully determined by its parameters, whose hash is the ETag,
+# so clients and proxies may keep it for as long as they like.
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Largest request head and POST body accepted, in bytes.
+MAX_HEAD = 64 * 1024
+MAX_BODY = 16 * 1024 * 1024
+
+# Idle keep-alive connections are closed after this many seconds.
+KEEPALIVE_SECONDS = 30
+
+# Archive bytes are handed from the batch thread to the connection in chunks
+# of about this size; at most STREAM_CHUNKS of them wait to be sent.
+STREAM_CHUNK = 64 * 1024
+STREAM_CHUNKS = 16
+
+# Request bodies by Content-Type, as readers.read_rows formats.
+BODY_FORMATS = {
+    'text/csv': 'csv',
+    'application/x-ndjson': 'jsonl',
+    'application/jsonl': 'jsonl',
+    'application/x-jsonlines': 'jsonl',
+    'text/plain': 'lines',
+}
+
+ARCHIVE_TYPES = {'zip': 'application/zip', 'tar': 'application/x-tar', 'tar.gz': 'application/gzip'}
+
+# Archive member listing the items of a batch that failed, if any did.
+ERRORS_MEMBER = 'errors.txt'
+
+REASONS = {200: 'OK', 204: 'No Content', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found',
+           405: 'Method Not Allowed', 411: 'Length Required', 413: 'Payload Too Large',
+           431: 'Request Header Fields Too Large', 500: 'Internal Server Error'}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def is_loopback(host):
+    """Whether `host` names this machine only, so the service is not reachable from the network."""
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def render_params(query, extension=None):
+    """
+    (args, options) for render_bytes from the query of a render request.
+    `data` is required; `type`, `format`, `fill_color`, `back_color` and
+    `profile` default as in render_bytes and every other key is one of
+    options.DEFAULT_OPTIONS. `extension` from the path wins over `format`.
+    """
+    params = dict(query)
+    if 'data' not in params:
+        raise HTTPError(400, "Missing 'data' parameter")
+    data = params.pop('data')
+    barcode_type = params.pop('type', 'QR Code')
+    if barcode_type not in BARCODE_TYPES:
+        raise HTTPError(400, f"Unknown code type {barcode_type!r}")
+    extension = (extension or params.pop('format', 'png')).lower()
+    params.pop('format', None)
+    fill_color = params.pop('fill_color', 'black')
+    back_color = params.pop('back_color', 'white')
+    profile = params.pop('profile', 'default')
+    return (data, extension, barcode_type, fill_color, back_color, profile), params
+
+
+def batch_params(query):
+    """Settings of a batch request; like render_params, plus `archive` and `template`."""
+    params = dict(query)
+    archive_format = params.pop('archive', 'zip')
+    if archive_format not in ARCHIVE_FORMATS:
+        raise HTTPError(400, f"Unknown archive format {archive_format!r}; use one of {', '.join(ARCHIVE_FORMATS)}")
+    template = params.pop('template', DEFAULT_TEMPLATE)
+    (_, extension, barcode_type, fill_color, back_color, profile), options = render_params(dict(params, data=''))
+    options.pop('data', None)
+    return archive_format, template, extension, barcode_type, fill_color, back_color, profile, options
+
+
+def etag_matches(header, etag):
+    if header is None:
+        return False
+    tags = [tag.strip() for tag in header.split(',')]
+    return '*' in tags or etag in tags or f"W/{etag}" in tags
+
+
+class ResponseStream:
+    """
+    Write-only file object that hands bytes from a worker thread to an
+    asyncio connection. Writes block while STREAM_CHUNKS chunks are waiting
+    to be sent, so a slow client throttles the batch feeding it. After
+    abort(), writes raise BrokenPipeError.
+    """
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.queue = asyncio.Queue(STREAM_CHUNKS)
+        self.buffer = bytearray()
+        self.aborted = False
+
+    def write(self, data):
+        if self.aborted:
+            raise BrokenPipeError("The client closed the connection")
+        self.buffer += data
+        if len(self.buffer) >= STREAM_CHUNK:
+            self.put(bytes(self.buffer))
+            self.buffer.clear()
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def put(self, chunk):
+        asyncio.run_coroutine_threadsafe(self.queue.put(chunk), self.loop).result()
+
+    def finish(self):
+        """Send what is buffered and mark the end of the stream; always called last by the writer."""
+        if self.buffer and not self.aborted:
+            self.put(bytes(self.buffer))
+        self.buffer.clear()
+        self.put(None)
+
+    def abort(self):
+        self.aborted = True
+
+
+def write_batch_archive(rows, stream, archive_format, template, extension, barcode_type, fill_color, back_color,
+                        profile, mapper, **options):
+    """
+    Render `rows` into an archive written to `stream`, a ResponseStream.
+    Failed items are listed in an ERRORS_MEMBER at the end of the archive.
+    Runs in the scheduler's batch thread; returns the number of failures.
+    """
+    failed = []
+    try:
+        with ArchiveWriter(stream, archive_format) as archive:
+            items = plan_outputs(rows, "", template, extension, barcode_type)
+            for result in run_batch(items, barcode_type, fill_color, back_color, archive=archive, profile=profile,
+                                    mapper=mapper, **options):
+                if result.error:
+                    failed.append(f"Error: item {result.index} ({result.data!r}): {result.error}\n")
+            if failed:
+                archive.add(ERRORS_MEMBER, ''.join(failed).encode('utf-8'))
+    finally:
+        stream.finish()
+    return len(failed)
+
+
+class RenderServer:
+    """
+    Local HTTP service rendering codes on a pre-warmed scheduler.Scheduler,
+    so no request waits for a process to start or a library to load.
+
+    GET /render?data=...&type=...&format=png (or /render.png?data=...)
+    returns one code; the other query keys are the options of
+    generators.generate_image plus `fill_color`, `back_color` and `profile`.
+    Responses carry a strong ETag, the render_key of the parameters, and a
+    long-lived Cache-Control; If-None-Match is answered with 304 without
+    rendering. Renders are also kept in the memory tier of this process's
+    render cache.
+
+    POST /batch streams back a ZIP (or tar with ?archive=tar) of every
+    payload in the body: CSV, JSON Lines or one value per line, chosen by
+    Content-Type, with per-row settings as in readers.read_rows. The query
+    takes the same settings as /render plus `template`. Batch items only
+    use workers no single render is waiting for.
+
+    GET /health answers 200 once the workers are warm. The service only
+    binds to loopback addresses.
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, workers=None):
+        if not is_loopback(host):
+            raise ValueError(f"The service only listens on this machine; {host!r} is not a loopback address")
+        self.host = host
+        self.port = port
+        self.scheduler = Scheduler(workers)
+        self.server = None
+
+    async def start(self):
+        await asyncio.gather(*(asyncio.wrap_future(future) for future in self.scheduler.warm_up()))
+        self.server = await asyncio.start_server(self.handle, self.host, self.port, limit=MAX_HEAD,
+                                                 family=socket.AF_INET6 if ':' in self.host else socket.AF_INET)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+        self.scheduler.shutdown()
+
+    async def handle(self, reader, writer):
+        try:
+            while await self.handle_request(reader, writer):
+                pass
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+            pass
+        finally:
+            writer.close()
+
+    async def handle_request(self, reader, writer):
+        """Answer one request; returns whether the connection stays open for another."""
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), KEEPALIVE_SECONDS)
+        except asyncio.LimitOverrunError:
+            await self.send(writer, 431, b"Request head too large\n", keep_alive=False)
+            return False
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+            return False
+        lines = head.decode('latin-1').split('\r\n')
+        try:
+            method, target, version = lines[0].split(' ')
+        except ValueError:
+            await self.send(writer, 400, b"Malformed request line\n", keep_alive=False)
+            return False
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(':')
+            if name:
+                headers[name.strip().lower()] = value.strip()
+        connection = headers.get('connection', '').lower()
+        keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+        url = urlsplit(target)
+        query = parse_qsl(url.query, keep_blank_values=True)
+        try:
+            if url.path == '/batch':
+                if method != 'POST':
+                    raise HTTPError(405, "Use POST for /batch")
+                body = await self.read_body(reader, headers)
+                return await self.batch(writer, query, body, headers, keep_alive)
+            if method not in ('GET', 'HEAD'):
+                raise HTTPError(405, f"Use GET for {url.path}")
+            if url.path == '/health':
+                await self.send(writer, 200, b"ok\n", keep_alive=keep_alive, head=method == 'HEAD')
+            elif url.path == '/render' or url.path.startswith('/render.'):
+                extension = url.path.partition('.')[2] or None
+                await self.render(writer, query, extension, headers, keep_alive, method == 'HEAD')
+            else:
+                raise HTTPError(404, f"No such endpoint {url.path}")
+        except HTTPError as e:
+            if e.status in (405, 411, 413):
+                # The body, if any, was not read, so the connection cannot be reused.
+                keep_alive = False
+            await self.send(writer, e.status, f"{e}\n".encode('utf-8'), keep_alive=keep_alive)
+        return keep_alive
+
+    async def read_body(self, reader, headers):
+        if 'chunked' in headers.get('transfer-encoding', '').lower() or 'content-length' not in headers:
+            raise HTTPError(411, "Send the body with a Content-Length")
+        try:
+            length = int(headers['content-length'])
+        except ValueError:
+            raise HTTPError(400, "Invalid Content-Length")
+        if length > MAX_BODY:
+            raise HTTPError(413, f"Bodies are limited to {MAX_BODY} bytes")
+        return await reader.readexactly(length)
+
+    async def render(self, writer, query, extension, headers, keep_alive, head=False):
+        args, options = render_params(query, extension)
+        data, extension, barcode_type, fill_color, back_color, profile = args
+        try:
+            check_profile(profile)
+            key = render_key(data, barcode_type, fill_color, back_color, extension, profile, **options)
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+        etag = f'"{key}"'
+        cache_headers = {'ETag': etag, 'Cache-Control': CACHE_CONTROL}
+        if etag_matches(headers.get('if-none-match'), etag):
+            await self.send(writer, 304, b"", cache_headers, keep_alive)
+            return
+        # Only the memory tier is used on the event loop. The disk tier is
+        # read and written by render_bytes in the worker, whose cache has the
+        # same settings, so a slow disk never stalls other connections.
+        cache = get_cache()
+        content = cache.get(key, disk=False)
+        if content is None:
+            try:
+                content = await asyncio.wrap_future(self.scheduler.submit(render_bytes, *args, **options))
+            except Exception as e:
+                # The parameters are checked already, so this is data the symbology cannot encode.
+                raise HTTPError(400, describe_error(e))
+            cache.put(key, content, disk=False)
+        content_type = mimetypes.guess_type(f"code.{extension}")[0] or 'application/octet-stream'
+        await self.send(writer, 200, content, dict(cache_headers, **{'Content-Type': content_type}), keep_alive,
+                        head)
+
+    async def batch(self, writer, query, body, headers, keep_alive):
+        settings = batch_params(query)
+        archive_format, template, extension, barcode_type, fill_color, back_color, profile, options = settings
+        try:
+            check_profile(profile)
+            render_key('', barcode_type, fill_color, back_color, extension, profile, **options)
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+        content_type = headers.get('content-type', 'text/plain').split(';')[0].strip().lower()
+        if content_type == 'application/json':
+            # A JSON array of payloads or of records, as on JSON Lines lines.
+            try:
+                records = json.loads(body)
+            except ValueError as e:
+                raise HTTPError(400, f"Invalid JSON: {e}")
+            if not isinstance(records, list):
+                raise HTTPError(400, "A JSON body must be an array")
+            body = b''.join(json.dumps(record).encode('utf-8') + b'\n' for record in records)
+            content_type = 'application/x-ndjson'
+        try:
+            rows = list(read_rows(BytesIO(body), BODY_FORMATS.get(content_type, 'lines')))
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+
+        stream = ResponseStream(asyncio.get_running_loop())
+        job = self.scheduler.start(write_batch_archive, rows, stream, *settings[:-1], total=len(rows), **options)
+        name = f"codes.{archive_format}"
+        self.send_head(writer, 200, {'Content-Type': ARCHIVE_TYPES[archive_format],
+                                     'Content-Disposition': f'attachment; filename="{name}"',
+                                     'Transfer-Encoding': 'chunked'}, keep_alive)
+        try:
+            while True:
+                chunk = await stream.queue.get()
+                if chunk is None:
+                    break
+                writer.write(b'%X\r\n%s\r\n' % (len(chunk), chunk))
+                await writer.drain()
+        except ConnectionError:
+            job.cancel()
+            stream.abort()
+            # Let the batch thread run into the abort instead of blocking on a full queue.
+            while await stream.queue.get() is not None:
+                pass
+            return False
+        try:
+            await asyncio.wrap_future(job.future)
+        except Exception:
+            # The archive is cut short; closing without the last chunk tells the client so.
+            return False
+        writer.write(b'0\r\n\r\n')
+        await writer.drain()
+        return keep_alive
+
+    def send_head(self, writer, status, headers=None, keep_alive=True):
+        lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}"]
+        for name, value in (headers or {}).items():
+            lines.append(f"{name}: {value}")
+        lines.append(f"Connection: {'keep-alive' if keep_alive else 'close'}")
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+
+    async def send(self, writer, status, content, headers=None, keep_alive=True, head=False):
+        headers = dict(headers or {})
+        headers.setdefault('Content-Type', 'text/plain; charset=utf-8')
+        if status != 304:
+            headers['Content-Length'] = len(content)
+        self.send_head(writer, status, headers, keep_alive)
+        if not head and status != 304:
+            writer.write(content)
+        await writer.drain()
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=None):
+    """Run a RenderServer until interrupted. Rendered codes use the process-wide cache settings."""
+    server = RenderServer(host, port, workers)
+
+    async def run():
+        await server.start()
+        print(f"Serving codes on http://{host}:{server.port}/ with {server.scheduler.workers} workers", flush=True)
+        await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
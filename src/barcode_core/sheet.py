@@ -0,0 +1,159 @@
+from .batch import DEDUPE_WINDOW, RecentOutputs, SheetResult, encode_batch
+from .registry import SYMBOL_WRITERS
+
+# Points per millimetre.
+mm = 72 / 25.4
+
+# Page sizes in points, as reportlab.lib.pagesizes has them.
+PAGE_SIZES = {
+    'A3': (297 * mm, 420 * mm),
+    'A4': (210 * mm, 297 * mm),
+    'A5': (148 * mm, 210 * mm),
+    'LETTER': (612, 792),
+    'LEGAL': (612, 1008),
+}
+
+
+def parse_page_size(value):
+    """
+    Page size in points from a name in PAGE_SIZES or a "WIDTHxHEIGHT"
+    string in millimetres, e.g. "100x150".
+    """
+    if isinstance(value, (tuple, list)):
+        return tuple(value)
+    name = value.strip().upper()
+    if name in PAGE_SIZES:
+        return PAGE_SIZES[name]
+    try:
+        width, height = (float(part) for part in name.split("X"))
+    except ValueError:
+        raise ValueError(f"Unknown page size {value!r}; use one of {', '.join(PAGE_SIZES)} or WIDTHxHEIGHT in mm")
+    return width * mm, height * mm
+
+
+def parse_grid(value):
+    """(rows, columns) from a "ROWSxCOLUMNS" string such as "10x3"."""
+    try:
+        rows, columns = (int(part) for part in value.lower().split("x"))
+    except ValueError:
+        raise ValueError(f"Invalid grid {value!r}; expected ROWSxCOLUMNS, e.g. 10x3")
+    if rows < 1 or columns < 1:
+        raise ValueError("Grid rows and columns must be at least 1")
+    return rows, columns
+
+
+class LabelSheet:
+    """
+    Lays symbols out on a grid of labels in one PDF, left to right and top to
+    bottom, starting a new page whenever the grid is full.
+
+    Symbols are drawn as vector paths scaled to fit their cell, keeping the
+    aspect ratio. The PDF is written as it goes (see pdf.PdfStream): each
+    page is compressed and written to the file as soon as it is full, and
+    symbols are not kept after they are drawn, so memory stays flat however
+    many labels the sheet holds. Margins and spacing are in millimetres, the
+    caption size in points. `file_path` may also be a binary file object.
+
+    A symbol added with a `key` is written once as a PDF form; `repeat` then
+    places further copies by reference instead of drawing it again. Only the
+    most recent `window` keys can be repeated, refreshed and evicted like the
+    payloads of an encode_batch run with the same window.
+    """
+
+    def __init__(self, file_path, page_size='A4', rows=10, columns=3, margin=10, spacing=2, caption_size=8,
+                 window=DEDUPE_WINDOW):
+        self.page_width, self.page_height = parse_page_size(page_size)
+        self.rows = rows
+        self.columns = columns
+        self.margin = margin * mm
+        self.spacing = spacing * mm
+        self.caption_size = caption_size
+        self.cell_width = (self.page_width - 2 * self.margin - (columns - 1) * self.spacing) / columns
+        self.cell_height = (self.page_height - 2 * self.margin - (rows - 1) * self.spacing) / rows
+        if self.cell_width <= 0 or self.cell_height <= 0:
+            raise ValueError("Margins and spacing leave no room for labels on the page")
+        # The PDF writer, and reportlab with it, is loaded with the first sheet.
+        self.pdf = SYMBOL_WRITERS.module('pdf')
+        self.stream = self.pdf.PdfStream(file_path, self.page_width, self.page_height)
+        self.count = 0
+        self.pages = 0
+        self.forms = RecentOutputs(window)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def add(self, symbol, fill_color="black", back_color="white", caption=None, key=None):
+        width, height = symbol.size()
+        operators = self.pdf.symbol_operators(symbol, fill_color, back_color)
+        if key is None:
+            self.place(width, height, fill_color, caption,
+                       lambda x, y, factor: self.stream.draw(operators, x, y, factor))
+            return
+        self.forms.add(key, (self.stream.add_form(operators, width, height), width, height, fill_color))
+        self.repeat(key, caption)
+
+    def repeat(self, key, caption=None):
+        """Place another copy of the symbol added earlier with `key`."""
+        name, width, height, fill_color = self.forms.get(key)
+        self.place(width, height, fill_color, caption, lambda x, y, factor: self.stream.draw_form(name, x, y, factor))
+
+    def place(self, width, height, fill_color, caption, draw):
+        cell = self.count % (self.rows * self.columns)
+        if cell == 0:
+            if self.count:
+                self.stream.end_page()
+            self.pages += 1
+        row, column = divmod(cell, self.columns)
+        left = self.margin + column * (self.cell_width + self.spacing)
+        bottom = self.page_height - self.margin - (row + 1) * self.cell_height - row * self.spacing
+
+        caption_height = self.caption_size * 1.2 if caption else 0
+        factor = min(self.cell_width / width, (self.cell_height - caption_height) / height)
+        x = left + (self.cell_width - width * factor) / 2
+        y = bottom + caption_height + (self.cell_height - caption_height - height * factor) / 2
+        draw(x, y, factor)
+        if caption:
+            self.stream.draw(f"{self.pdf.color_operands(fill_color)} rg " + self.pdf.text_operators(
+                caption, "Helvetica", self.caption_size, left + self.cell_width / 2, bottom + self.caption_size * 0.3))
+        self.count += 1
+
+    def close(self):
+        if self.count:
+            self.stream.end_page()
+        self.stream.close()
+
+
+def write_label_sheet(datas, file_path, barcode_type='QR Code', fill_color="black", back_color="white",
+                      caption=None, page_size='A4', rows=10, columns=3, margin=10, spacing=2, caption_size=8,
+                      workers=None, dedupe=True, **options):
+    """
+    Encode every payload in `datas` (in parallel) and place them on label
+    sheets in a single PDF. `caption` is an optional str.format template
+    with the fields `index` and `data`. Items that fail to encode are
+    skipped and counted in the returned SheetResult; their error messages
+    are listed in its `failed` field as (index, data, error) tuples.
+    `datas` may also hold readers.Row records; their symbology and option
+    overrides apply, while the sheet keeps one set of colors.
+
+    With `dedupe`, every symbol is stored as a PDF form so that a repeated
+    payload is encoded and drawn once and every further copy refers to it;
+    `reused` in the result counts those copies. The PDF is streamed like
+    LabelSheet's, so memory stays flat on batches of any length.
+    """
+    failed = []
+    reused = 0
+    with LabelSheet(file_path, page_size, rows, columns, margin, spacing, caption_size) as sheet:
+        for item in encode_batch(datas, barcode_type, workers, dedupe=dedupe, **options):
+            if item.error:
+                failed.append((item.index, item.data, item.error))
+                continue
+            text = caption.format(index=item.index, data=item.data) if caption else None
+            if item.duplicate_of is not None:
+                sheet.repeat(item.duplicate_of, text)
+                reused += 1
+            else:
+                sheet.add(item.symbol, fill_color, back_color, text, item.index if dedupe else None)
+    return SheetResult(sheet.count, failed, sheet.pages, reused)
@@ -0,0 +1,214 @@
+import struct
+import zlib
+
+import numpy as np
+from PIL import ImageColor
+
+from .raster import iter_mask_stripes
+
+STRIPED_EXTENSIONS = ('png', 'tif', 'tiff')
+
+# Pixel rows encoded at a time. A stripe of a 20000 pixel wide symbol is
+# about 5 MB as a mask and a few kilobytes once packed to one bit.
+STRIPE_ROWS = 256
+
+# Symbols with more pixels than this are saved in stripes by save_symbol;
+# below it the whole image is small enough to build in memory.
+STRIPE_PIXELS = 2 ** 26
+
+# zlib levels matching the Pillow settings of each output profile.
+PNG_LEVELS = {'default': 6, 'fastest': 1, 'smallest': 9}
+
+# Deflated PNG data is emitted in IDAT chunks of about this many bytes.
+IDAT_SIZE = 2 ** 16
+
+
+def png_chunk(chunk_type, data):
+    return struct.pack('>I', len(data)) + chunk_type + data + struct.pack('>I', zlib.crc32(chunk_type + data))
+
+
+def palette_bytes(fill_color, back_color):
+    return bytes(ImageColor.getrgb(back_color)[:3] + ImageColor.getrgb(fill_color)[:3])
+
+
+class StripedPNG:
+    """
+    Writes a 1-bit palette PNG (index 0 background, 1 fill) from horizontal
+    stripes of a bool mask, deflating each stripe as it arrives. `target` is
+    a path or a binary file object; it is never seeked, so standard output
+    works too.
+    """
+
+    def __init__(self, target, width, height, fill_color="black", back_color="white", profile='default', dpi=None):
+        self.owned = isinstance(target, str)
+        self.file = open(target, 'wb') if self.owned else target
+        self.height = height
+        self.rows = 0
+        self.compressor = zlib.compressobj(PNG_LEVELS.get(profile, 6))
+        self.pending = []
+        self.pending_size = 0
+        self.file.write(b'\x89PNG\r\n\x1a\n')
+        # Bit depth 1, color type 3 (palette), default compression, filter and no interlacing.
+        self.file.write(png_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 1, 3, 0, 0, 0)))
+        self.file.write(png_chunk(b'PLTE', palette_bytes(fill_color, back_color)))
+        if dpi:
+            # Pixels per metre, unit 1 (metre).
+            density = round(dpi / 0.0254)
+            self.file.write(png_chunk(b'pHYs', struct.pack('>IIB', density, density, 1)))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        elif self.owned:
+            self.file.close()
+
+    def add_rows(self, mask):
+        packed = np.packbits(mask, axis=1)
+        # Every scanline starts with its filter type; 0 leaves it unfiltered.
+        scanlines = np.zeros((packed.shape[0], packed.shape[1] + 1), dtype=np.uint8)
+        scanlines[:, 1:] = packed
+        self.emit(self.compressor.compress(scanlines.tobytes()))
+        self.rows += mask.shape[0]
+
+    def emit(self, data, flush=False):
+        if data:
+            self.pending.append(data)
+            self.pending_size += len(data)
+        if self.pending_size >= IDAT_SIZE or (flush and self.pending):
+            self.file.write(png_chunk(b'IDAT', b''.join(self.pending)))
+            self.pending = []
+            self.pending_size = 0
+
+    def close(self):
+        if self.rows != self.height:
+            raise ValueError(f"PNG has {self.rows} of {self.height} rows")
+        self.emit(self.compressor.flush(), flush=True)
+        self.file.write(png_chunk(b'IEND', b''))
+        self.file.flush()
+        if self.owned:
+            self.file.close()
+
+
+class StripedTIFF:
+    """
+    Writes a 1-bit TIFF with one strip per added stripe, deflated when the
+    profile is "smallest" and uncompressed otherwise. Black-on-white images
+    are stored as plain bilevel (WhiteIsZero), others with a two-entry color
+    map. The directory is written last and its offset patched into the
+    header, so `target` must be a path or a seekable binary file object.
+    """
+
+    def __init__(self, target, width, height, fill_color="black", back_color="white", profile='default', dpi=None):
+        self.owned = isinstance(target, str)
+        self.file = open(target, 'w+b') if self.owned else target
+        self.start = self.file.tell()
+        self.width = width
+        self.height = height
+        self.rows_per_strip = None
+        self.deflate = profile == 'smallest'
+        self.palette = palette_bytes(fill_color, back_color)
+        self.dpi = dpi
+        self.offsets = []
+        self.counts = []
+        self.position = 8
+        self.file.write(b'II*\x00\x00\x00\x00\x00')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        elif self.owned:
+            self.file.close()
+
+    def add_rows(self, mask):
+        if self.rows_per_strip is None:
+            self.rows_per_strip = mask.shape[0]
+        data = np.packbits(mask, axis=1).tobytes()
+        if self.deflate:
+            data = zlib.compress(data, 6)
+        self.file.write(data)
+        self.offsets.append(self.position)
+        self.counts.append(len(data))
+        self.position += len(data)
+
+    def close(self):
+        if self.position >= 2 ** 32:
+            raise ValueError("Striped TIFF output is limited to 4 GB")
+        black_on_white = self.palette == bytes([255, 255, 255, 0, 0, 0])
+        entries = [
+            (256, 4, [self.width]),
+            (257, 4, [self.height]),
+            (258, 3, [1]),
+            (259, 3, [8 if self.deflate else 1]),
+            (262, 3, [0 if black_on_white else 3]),
+            (273, 4, self.offsets),
+            (277, 3, [1]),
+            (278, 4, [self.rows_per_strip or self.height]),
+            (279, 4, self.counts),
+        ]
+        if not black_on_white:
+            # ColorMap holds all reds, then greens, then blues, as 16-bit values.
+            colors = [self.palette[channel + 3 * index] * 257 for channel in range(3) for index in range(2)]
+            entries.append((320, 3, colors))
+        if self.dpi:
+            # X and Y resolution as rationals in hundredths, per inch (unit 2).
+            resolution = [round(self.dpi * 100), 100]
+            entries += [(282, 5, resolution), (283, 5, resolution), (296, 3, [2])]
+        # The directory must list its tags in ascending order.
+        entries.sort()
+        if self.position % 2:
+            self.file.write(b'\x00')
+            self.position += 1
+        ifd_offset = self.position
+        extra_offset = ifd_offset + 2 + 12 * len(entries) + 4
+        directory = [struct.pack('<H', len(entries))]
+        extra = []
+        for tag, field_type, values in entries:
+            packed = struct.pack(f"<{len(values)}{'H' if field_type == 3 else 'I'}", *values)
+            # A RATIONAL (type 5) is two LONGs but counts as one value.
+            count = len(values) // 2 if field_type == 5 else len(values)
+            if len(packed) <= 4:
+                directory.append(struct.pack('<HHI', tag, field_type, count) + packed.ljust(4, b'\x00'))
+            else:
+                directory.append(struct.pack('<HHII', tag, field_type, count, extra_offset))
+                extra.append(packed)
+                extra_offset += len(packed)
+        directory.append(struct.pack('<I', 0))
+        self.file.write(b''.join(directory + extra))
+        self.file.seek(self.start + 4)
+        self.file.write(struct.pack('<I', ifd_offset))
+        self.file.seek(0, 2)
+        self.file.flush()
+        if self.owned:
+            self.file.close()
+
+
+def write_striped(symbol, file_path, fill_color="black", back_color="white", extension=None, profile='default',
+                  scale=1, stripe_rows=STRIPE_ROWS):
+    """
+    Save `symbol` as a PNG or TIFF rendered and encoded in stripes of
+    `stripe_rows` pixel rows, so that peak memory is one stripe however
+    large the symbol is. Pixels match rasterize; the file is a 1-bit image
+    like the ones save_image writes for rasterized codes, and records the
+    resolution of fitted symbols.
+    """
+    extension = (extension or file_path.split('.')[-1]).lower()
+    if extension not in STRIPED_EXTENSIONS:
+        raise ValueError(f"Striped output supports {', '.join(STRIPED_EXTENSIONS)}, not {extension!r}")
+    writer_class = StripedPNG if extension == 'png' else StripedTIFF
+    width, height = symbol.size(scale)
+    dpi = symbol.dpi * scale if symbol.dpi else None
+    with writer_class(file_path, width, height, fill_color, back_color, profile, dpi) as writer:
+        for stripe in iter_mask_stripes(symbol, stripe_rows, scale):
+            writer.add_rows(stripe)
+
+
+def needs_stripes(symbol, extension, scale=1):
+    """Whether save_symbol should stream `symbol` in stripes rather than build the whole image."""
+    width, height = symbol.size(scale)
+    return extension in STRIPED_EXTENSIONS and width * height > STRIPE_PIXELS
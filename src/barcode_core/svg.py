@@ -0,0 +1,60 @@
+import base64
+from io import BytesIO, StringIO
+
+import svgwrite
+
+from .vector import symbol_geometry, text_positions
+
+
+def build_svg(symbol, fill_color="black", back_color="white", scale=1, file_path=None):
+    """
+    Build an svgwrite Drawing of `symbol`. All dark modules go into a single
+    path made of merged rectangles, so the element count stays constant no
+    matter how large the symbol is.
+    """
+    width, height = symbol.size(scale)
+    size = (width, height)
+    if symbol.dpi:
+        # Fitted symbols keep their physical size; the view box stays in pixels.
+        size = tuple(f"{pixels * 25.4 / (symbol.dpi * scale):.3f}mm" for pixels in size)
+    dwg = svgwrite.Drawing(file_path, profile='tiny', size=size, debug=False)
+    dwg.viewbox(0, 0, width, height)
+    dwg.add(dwg.rect(insert=(0, 0), size=(width, height), fill=back_color))
+    commands = [f"M{x} {y}h{w}v{h}h-{w}z" for x, y, w, h in symbol_geometry(symbol, scale)]
+    dwg.add(dwg.path(d="".join(commands), fill=fill_color, shape_rendering="crispEdges"))
+    if symbol.text_height():
+        for x, y, text in text_positions(symbol, scale):
+            dwg.add(dwg.text(text, insert=(x, y), fill=fill_color, text_anchor="middle",
+                             font_family="DejaVu Sans Mono, monospace", font_size=symbol.font_size * scale))
+    return dwg
+
+
+def write_svg(symbol, file_path, fill_color="black", back_color="white", scale=1):
+    """Save `symbol` as SVG. `file_path` may also be a binary file object."""
+    dwg = build_svg(symbol, fill_color, back_color, scale)
+    if isinstance(file_path, str):
+        dwg.saveas(file_path)
+    else:
+        text = StringIO()
+        dwg.write(text)
+        file_path.write(text.getvalue().encode('utf-8'))
+
+
+def svg_string(symbol, fill_color="black", back_color="white", scale=1):
+    return build_svg(symbol, fill_color, back_color, scale).tostring()
+
+
+def save_as_svg(img, file_path):
+    # Only used for plain images, which have no module geometry to trace;
+    # save_symbol writes real vector SVG.
+    buffer = BytesIO()
+    img.save(buffer, format='PNG')
+    buffer.seek(0)
+    dwg = svgwrite.Drawing(profile='tiny', size=img.size)
+    image_data = buffer.getvalue()
+    image_base64 = base64.b64encode(image_data).decode('utf-8')
+    dwg.add(dwg.image(href='data:image/png;base64,' + image_base64, insert=(0, 0), size=img.size))
+    if isinstance(file_path, str):
+        dwg.saveas(file_path)
+    else:
+        file_path.write(dwg.tostring().encode('utf-8'))
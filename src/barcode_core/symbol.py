@@ -0,0 +1,114 @@
+import numpy as np
+
+
+class Symbol:
+    """
+    Symbology-independent description of a code, produced by the encoders in
+    generators.py and consumed by every output path.
+
+    `modules` is a boolean matrix (True = dark module); linear barcodes are a
+    single row. Sizes are in device pixels at the default scale: one module
+    is `module_width` wide and `module_height` tall, and `quiet_zone` is a
+    (horizontal, vertical) margin counted in module widths. Linear codes may
+    carry a human-readable `text` line drawn `text_distance` pixels below
+    the bars in a `font_size` pixel font.
+
+    `guards`, when set, is a boolean row marking the modules that are guard
+    bars, which extend `guard_height` pixels below the others, as in EAN
+    codes. `text_blocks` is then a sequence of (column, text) pairs laying
+    the human-readable line out around the guards, each block centred on a
+    module column (fractional or outside the bars); otherwise the whole
+    `text` is centred under the bars.
+
+    `dpi` is the device resolution the pixel sizes were fitted to (see
+    generators.fit_symbol), or None for the default sizes, which assume
+    options.LINEAR_DPI.
+    """
+
+    def __init__(self, modules, module_width=1, module_height=1, quiet_zone=(0, 0), text=None, font_size=0,
+                 text_distance=0, dpi=None, guards=None, guard_height=0, text_blocks=None):
+        self.modules = np.ascontiguousarray(modules, dtype=bool)
+        if self.modules.ndim != 2 or not self.modules.size:
+            raise ValueError("Symbol modules must be a non-empty 2D matrix")
+        self.module_width = int(module_width)
+        self.module_height = int(module_height)
+        self.quiet_zone = tuple(int(q) for q in quiet_zone)
+        self.text = text or None
+        self.font_size = int(font_size)
+        self.text_distance = int(text_distance)
+        self.dpi = dpi
+        self.guards = None
+        self.guard_height = 0
+        if guards is not None and guard_height > 0:
+            self.guards = np.ascontiguousarray(guards, dtype=bool)
+            if self.guards.shape != (self.columns,):
+                raise ValueError("Guard bars must be one row as wide as the symbol")
+            self.guard_height = int(guard_height)
+        self.text_blocks = tuple(text_blocks) if text_blocks else None
+
+    @property
+    def rows(self):
+        return self.modules.shape[0]
+
+    @property
+    def columns(self):
+        return self.modules.shape[1]
+
+    @property
+    def is_linear(self):
+        return self.rows == 1
+
+    def text_height(self, scale=1):
+        """Pixels reserved below the bars for the human-readable line."""
+        if not self.text or not self.font_size:
+            return 0
+        return (self.text_distance + self.font_size // 2) * scale
+
+    def footer_height(self, scale=1):
+        """Pixels below the bars taken by the guard bar extensions and the text line."""
+        return max(self.text_height(scale), self.guard_height * scale)
+
+    def text_layout(self):
+        """(column, text) of every block of the human-readable line."""
+        if self.text_blocks:
+            return self.text_blocks
+        return ((self.columns / 2, self.text),)
+
+    def size(self, scale=1):
+        """(width, height) in pixels of the rendered symbol, quiet zone included."""
+        quiet_x, quiet_y = self.quiet_zone
+        width = (self.columns + 2 * quiet_x) * self.module_width * scale
+        height = (self.rows * self.module_height + 2 * quiet_y * self.module_width) * scale + self.footer_height(scale)
+        return width, height
+
+    def runs(self):
+        """
+        Yield (row, start, length) for every horizontal run of dark modules,
+        row by row. Vector writers draw one shape per run instead of one per
+        module.
+        """
+        edges = np.diff(self.modules.view(np.int8), axis=1, prepend=0, append=0)
+        rows, starts = np.nonzero(edges == 1)
+        ends = np.nonzero(edges == -1)[1]
+        for row, start, end in zip(rows.tolist(), starts.tolist(), ends.tolist()):
+            yield row, start, end - start
+
+    def rectangles(self):
+        """
+        Yield (column, row, width, height) rectangles in module units that
+        together cover every dark module. Horizontal runs are merged first,
+        then identical runs on consecutive rows are stacked into one
+        rectangle, which keeps vector outputs small.
+        """
+        row_runs = {}
+        for row, start, length in self.runs():
+            row_runs.setdefault(row, []).append((start, length))
+        open_runs = {}
+        for row in range(self.rows + 1):
+            current = set(row_runs.get(row, ()))
+            for run in sorted(open_runs):
+                if run not in current:
+                    first_row = open_runs.pop(run)
+                    yield run[0], first_row, run[1], row - first_row
+            for run in current:
+                open_runs.setdefault(run, row)
@@ -0,0 +1,4 @@
+"""
+One module per symbology library, each imported by registry.SYMBOLOGIES the
+first time a code of its type is encoded.
+"""
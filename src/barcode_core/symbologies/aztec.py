@@ -0,0 +1,12 @@
+import pyqrcodeng
+
+from ..symbol import Symbol
+
+# Geometry the previous pyqrcodeng renderer used.
+AZTEC_SCALE = 5
+AZTEC_QUIET_ZONE = 4
+
+
+def encode_aztec(data):
+    qr = pyqrcodeng.create(data)
+    return Symbol(qr.code, AZTEC_SCALE, AZTEC_SCALE, (AZTEC_QUIET_ZONE, AZTEC_QUIET_ZONE))
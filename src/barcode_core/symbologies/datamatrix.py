@@ -0,0 +1,20 @@
+import numpy as np
+from pylibdmtx.pylibdmtx import encode as dmtx_encode
+
+from ..symbol import Symbol
+
+# Fixed geometry of libdmtx's rendering, which the modules are sampled from.
+DATAMATRIX_MODULE_SIZE = 5
+DATAMATRIX_MARGIN = 10
+
+
+def encode_datamatrix(data):
+    encoded = dmtx_encode(data.encode('utf-8'))
+    pixels = np.frombuffer(encoded.pixels, dtype=np.uint8).reshape(encoded.height, encoded.width, encoded.bpp // 8)
+    # Sample the centre of every module of libdmtx's fixed-size rendering.
+    first = DATAMATRIX_MARGIN + DATAMATRIX_MODULE_SIZE // 2
+    rows = (encoded.height - 2 * DATAMATRIX_MARGIN) // DATAMATRIX_MODULE_SIZE
+    columns = (encoded.width - 2 * DATAMATRIX_MARGIN) // DATAMATRIX_MODULE_SIZE
+    centres = pixels[first::DATAMATRIX_MODULE_SIZE, first::DATAMATRIX_MODULE_SIZE, 0][:rows, :columns]
+    quiet = DATAMATRIX_MARGIN // DATAMATRIX_MODULE_SIZE
+    return Symbol(centres < 128, DATAMATRIX_MODULE_SIZE, DATAMATRIX_MODULE_SIZE, (quiet, quiet))
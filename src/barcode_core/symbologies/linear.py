@@ -0,0 +1,128 @@
+import re
+
+import barcode
+import numpy as np
+from barcode.writer import BaseWriter
+
+from ..generators import mm_to_px, pt_to_px
+from ..symbol import Symbol
+
+# python-barcode class of each linear type.
+BARCODE_CLASSES = {
+    'EAN13': 'EAN13',
+    'EAN8': 'EAN8',
+    'Code128': 'Code128',
+    'Code39': 'Code39',
+    'UPCA': 'UPCA',
+    'ISBN13': 'ISBN13',
+    'ISBN10': 'ISBN10',
+    'ISSN': 'ISSN',
+    'PZN': 'PZN',
+    'JAN': 'JAN',
+    'ITF': 'ITF',
+    'GS1-128': 'Gs1_128',
+}
+
+# Types drawn with extended guard bars. They are all python-barcode EAN
+# classes. Its UPC-A class cannot mark guard bars, and its ISBN-10 and ISSN
+# classes build shortened patterns whose text has no EAN blocks, so those
+# keep plain bars.
+GUARD_TYPES = ('EAN13', 'EAN8', 'ISBN13', 'JAN')
+
+# Advance of one character of DejaVu Sans Mono, the font of the text line,
+# in ems.
+GLYPH_ADVANCE = 0.6
+
+
+class OptionsWriter(BaseWriter):
+    """
+    Collects the settings a python-barcode class renders with, its own
+    defaults such as the quiet zone included, without drawing anything.
+    render() returns the module lines.
+    """
+
+    def render(self, code):
+        return code
+
+
+def add_guard_bars(code):
+    # What the EAN classes do for guardbar=True, which their ISBN13
+    # subclass does not take as an argument.
+    code.guardbar = True
+    code.EDGE = code.EDGE.replace('1', 'G')
+    code.MIDDLE = code.MIDDLE.replace('1', 'G')
+
+
+def guard_text_blocks(line, text):
+    """
+    (column, text, span) of each block of the human-readable `text`, placed
+    around the guard bars of the module `line` as python-barcode does: the
+    first block four modules left of the bars, one centred in each gap
+    between guards and the last four modules after the final guard. `span`
+    is the width in modules the block has to itself. None when the text is
+    a single block.
+    """
+    blocks = text.split(' ')
+    if len(blocks) < 2:
+        return None
+    # A guard starts at its first 'G' bar and ends at the next ordinary bar.
+    starts, ends = [], []
+    in_guard = False
+    for run in re.finditer(r'1+|G+', line):
+        if run.group()[0] == 'G' and not in_guard:
+            starts.append(run.start())
+            in_guard = True
+        elif run.group()[0] == '1' and in_guard:
+            ends.append(run.start())
+            in_guard = False
+    if in_guard:
+        ends.append(len(line))
+    placed = [(-4, 8)] + [((end + start) / 2, start - end) for start, end in zip(starts[1:], ends)]
+    placed.append((ends[-1] + 4, 8))
+    return [(column, block, span) for (column, span), block in zip(placed, blocks)]
+
+
+def encode_barcode(data, barcode_type='EAN13', module_width=0.2, module_height=15, font_size=10, text_distance=5):
+    """
+    Symbol of a linear code; sizes are in millimetres and points as
+    python-barcode takes them.
+
+    Modules are a whole number of pixels at LINEAR_DPI, so `module_width`
+    is rounded: the default 0.2 mm becomes 2 pixels (0.169 mm) and the
+    code comes out about 15% narrower than asked. Pass `size_mm` to
+    generators.encode_symbol, which fits the code with fit_symbol, when the
+    printed width matters.
+    """
+    if barcode_type not in BARCODE_CLASSES:
+        raise ValueError("Unsupported barcode type")
+    code = getattr(barcode, BARCODE_CLASSES[barcode_type])(data)
+    # The plain code, e.g. for printers; the guard layout adds separators.
+    text = code.get_fullcode()
+    if barcode_type in GUARD_TYPES:
+        add_guard_bars(code)
+    writer = OptionsWriter()
+    code.writer = writer
+    line = code.render({'module_width': module_width, 'module_height': module_height, 'font_size': font_size,
+                        'text_distance': text_distance})[0]
+
+    # One '0'/'1' character per module; 'G' marks guard bars.
+    pattern = np.frombuffer(line.encode('ascii'), dtype=np.uint8)
+    module_px = mm_to_px(module_width)
+    bar_height = mm_to_px(module_height)
+    quiet_x = -(-mm_to_px(writer.quiet_zone) // module_px)
+    quiet_y = -(-mm_to_px(writer.margin_top) // module_px)
+    font_px = pt_to_px(font_size)
+    guards = pattern == ord('G')
+    guard_height = blocks = None
+    if guards.any():
+        guard_height = round(bar_height * (writer.guard_height_factor - 1))
+        blocks = guard_text_blocks(line, writer.text)
+    if blocks:
+        # Narrow modules leave less room between the guards than the font
+        # needs; it is made smaller rather than letting blocks overlap.
+        fitting = min(span * module_px / (len(block) * GLYPH_ADVANCE) for _, block, span in blocks)
+        font_px = max(1, min(font_px, int(fitting)))
+        blocks = [(column, block) for column, block, _ in blocks]
+    return Symbol(pattern[None, :] != ord('0'), module_px, bar_height, (quiet_x, quiet_y), text=text,
+                  font_size=font_px, text_distance=mm_to_px(text_distance), guards=guards,
+                  guard_height=guard_height or 0, text_blocks=blocks)
@@ -0,0 +1,16 @@
+import numpy as np
+import pdf417gen
+
+from ..symbol import Symbol
+
+# Geometry the previous pdf417gen renderer used.
+PDF417_SCALE = 3
+PDF417_RATIO = 3
+PDF417_QUIET_ZONE = 7
+
+
+def encode_pdf417(data):
+    codes = pdf417gen.encode(data)
+    rows = [''.join(format(value, 'b') for value in row) for row in codes]
+    modules = np.frombuffer(''.join(rows).encode('ascii'), dtype=np.uint8).reshape(len(rows), -1) == ord('1')
+    return Symbol(modules, PDF417_SCALE, PDF417_SCALE * PDF417_RATIO, (PDF417_QUIET_ZONE, PDF417_QUIET_ZONE))
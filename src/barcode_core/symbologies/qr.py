@@ -0,0 +1,22 @@
+import qrcode
+
+from ..symbol import Symbol
+
+ERROR_CORRECTION = {
+    "L": qrcode.constants.ERROR_CORRECT_L,
+    "M": qrcode.constants.ERROR_CORRECT_M,
+    "Q": qrcode.constants.ERROR_CORRECT_Q,
+    "H": qrcode.constants.ERROR_CORRECT_H,
+}
+
+
+def encode_qr_code(data, version, error_correction, box_size, border):
+    qr = qrcode.QRCode(
+        version=version,
+        error_correction=ERROR_CORRECTION[error_correction],
+        box_size=box_size,
+        border=border,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+    return Symbol(qr.modules, box_size, box_size, (border, border))
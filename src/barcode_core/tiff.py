@@ -0,0 +1,87 @@
+from PIL import TiffImagePlugin
+
+from .batch import RecentOutputs, SheetResult, encode_batch
+from .output import to_bilevel
+from .raster import rasterize
+
+DEFAULT_DPI = 300
+
+# Distinct payloads whose finished pages are kept for repeats. Pages are
+# 1-bit, so even a few hundred cost little memory.
+PAGE_WINDOW = 256
+
+
+class TiffPages:
+    """
+    Writes symbols as the pages of one multi-page, 1-bit TIFF compressed with
+    CCITT Group 4, the format RIP software and fax-style archives expect.
+
+    Every page is compressed and written as soon as it is added, so only the
+    current page is held in memory. Pages carry `dpi` as their resolution.
+    Group 4 is bilevel: the fill is black and the background white,
+    whatever the colors of the batch. `file_path` may also be a seekable
+    binary file object.
+    """
+
+    def __init__(self, file_path, dpi=DEFAULT_DPI):
+        if dpi <= 0:
+            raise ValueError("DPI must be positive")
+        self.dpi = dpi
+        self.owned = isinstance(file_path, str)
+        self.file = open(file_path, 'w+b') if self.owned else file_path
+        self.writer = TiffImagePlugin.AppendingTiffWriter(self.file)
+        self.pages = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def page(self, symbol):
+        """The bilevel page image for `symbol`, ready for add_page."""
+        return to_bilevel(rasterize(symbol))
+
+    def add_page(self, img):
+        img.save(self.writer, format='TIFF', compression='group4', dpi=(self.dpi, self.dpi))
+        self.writer.newFrame()
+        self.pages += 1
+
+    def add(self, symbol):
+        img = self.page(symbol)
+        self.add_page(img)
+        return img
+
+    def close(self):
+        self.writer.close()
+        if self.owned:
+            self.file.close()
+
+
+def write_tiff_pages(datas, file_path, barcode_type='QR Code', dpi=DEFAULT_DPI, workers=None, dedupe=True,
+                     **options):
+    """
+    Encode every payload in `datas` (in parallel) and append each as a page
+    of one Group 4 TIFF, in input order. Like write_label_sheet, items that
+    fail to encode are skipped and listed in the returned SheetResult as
+    (index, data, error) tuples, and readers.Row overrides apply except for
+    the colors.
+
+    With `dedupe`, a repeated payload is encoded and rasterized once and its
+    page image written again; `reused` in the result counts those pages.
+    """
+    failed = []
+    reused = 0
+    recent = RecentOutputs(PAGE_WINDOW)
+    with TiffPages(file_path, dpi) as tiff:
+        for item in encode_batch(datas, barcode_type, workers, dedupe=dedupe, window=PAGE_WINDOW, **options):
+            if item.error:
+                failed.append((item.index, item.data, item.error))
+            elif item.duplicate_of is not None:
+                tiff.add_page(recent.get(item.duplicate_of))
+                reused += 1
+            else:
+                img = tiff.add(item.symbol)
+                if dedupe:
+                    recent.add(item.index, img)
+    return SheetResult(tiff.pages, failed, tiff.pages, reused)
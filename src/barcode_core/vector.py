@@ -0,0 +1,66 @@
+"""
+Geometry shared by the vector writers. The writers themselves live in
+svg.py and pdf.py, so that writing one format does not load the library of
+the other; their functions can still be imported from here.
+"""
+import importlib
+
+import numpy as np
+
+# Distance from the alphabetic baseline to the descender line of DejaVu Sans
+# Mono, in ems. The raster text is anchored on the descender line.
+TEXT_DESCENT = 0.24
+
+
+def symbol_geometry(symbol, scale=1):
+    """
+    Yield (x, y, width, height) pixel rectangles for the dark modules of
+    `symbol`, quiet zone offset included, followed by the guard bar
+    extensions.
+    """
+    module_width = symbol.module_width * scale
+    module_height = symbol.module_height * scale
+    left = symbol.quiet_zone[0] * module_width
+    top = symbol.quiet_zone[1] * module_width
+    for column, row, width, height in symbol.rectangles():
+        yield (left + column * module_width, top + row * module_height, width * module_width,
+               height * module_height)
+    if symbol.guards is not None:
+        bottom = top + symbol.rows * module_height
+        for column, width in runs_of(symbol.guards):
+            yield left + column * module_width, bottom, width * module_width, symbol.guard_height * scale
+
+
+def runs_of(row):
+    """(start, length) of every run of True in a boolean row."""
+    edges = np.diff(row.view(np.int8), prepend=0, append=0)
+    starts = np.nonzero(edges == 1)[0]
+    ends = np.nonzero(edges == -1)[0]
+    return zip(starts.tolist(), (ends - starts).tolist())
+
+
+def text_positions(symbol, scale=1):
+    """Yield (center x, baseline y, text) in pixels for every block of the human-readable line."""
+    module_width = symbol.module_width * scale
+    descender = (symbol.quiet_zone[1] * module_width + symbol.rows * symbol.module_height * scale +
+                 symbol.text_distance * scale)
+    baseline = descender - TEXT_DESCENT * symbol.font_size * scale
+    for column, text in symbol.text_layout():
+        yield (symbol.quiet_zone[0] + column) * module_width, baseline, text
+
+
+# Names of the writer modules, imported on first access.
+_WRITERS = {
+    'build_svg': 'svg',
+    'write_svg': 'svg',
+    'svg_string': 'svg',
+    'pdf_color': 'pdf',
+    'draw_symbol_pdf': 'pdf',
+    'write_pdf': 'pdf',
+}
+
+
+def __getattr__(name):
+    if name not in _WRITERS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(f"{__package__}.{_WRITERS[name]}"), name)
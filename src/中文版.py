@@ -1,19 +1,14 @@
+import os
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, colorchooser
-import qrcode
-from barcode import (EAN13, EAN8, Code128, Code39, UPCA, ISBN13, PZN, JAN,
-                     ISBN10, ISSN, ITF, Gs1_128)
-from barcode.writer import ImageWriter
-from pylibdmtx.pylibdmtx import encode as dmtx_encode
-from PIL import Image, ImageTk, ImageOps
-from io import BytesIO
-import pdf417gen
-import pyqrcodeng
+from PIL import ImageTk
 import ttkbootstrap as ttkb
-from reportlab.pdfgen import canvas
-import base64
-import svgwrite
-from reportlab.lib.utils import ImageReader
+from barcode_core import (BARCODE_TYPES, LINEAR_TYPES, FILE_TYPES, DEFAULT_TEMPLATE, save_code,
+                          run_batch, default_workers, plan_outputs, parse_grid,
+                          write_label_sheet, read_rows, Manifest, MANIFEST_NAME,
+                          ArchiveWriter, write_tiff_pages, PROFILES, save_formats, format_paths,
+                          PreviewWorker, PREVIEW_SIZE, PREVIEW_DELAY_MS, generate_preview, Scheduler,
+                          BatchCancelled)
 
 # 导入所需的库
 
@@ -23,7 +18,19 @@ class BarcodeGenerator:
     """
     def __init__(self, root):
         self.root = root
+        # 调度器拥有工作进程池：预览和单个生成优先，批量任务只占用剩余的进程
+        self.scheduler = Scheduler()
+        self.batch_job = None
+        # 预览在后台线程渲染，只保留最新的一次请求
+        self.preview_worker = PreviewWorker(self.render_preview)
+        self.preview_window = None
+        self.preview_job = None
+        self.preview_poll = None
         self.setup_ui()
+        # 预览窗口打开时，任何输入都会（防抖后）触发重新渲染
+        self.root.bind_all('<KeyRelease>', self.schedule_preview, add='+')
+        self.root.bind_all('<<ComboboxSelected>>', self.schedule_preview, add='+')
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
     def setup_ui(self):
         """
@@ -59,6 +66,15 @@ class BarcodeGenerator:
         # 创建批量处理部分
         self.create_batch_processing(frame)
 
+        # 创建附加格式部分
+        self.create_extra_formats(frame)
+
+        # 创建打印尺寸部分
+        self.create_print_size(frame)
+
+        # 创建批量进度部分
+        self.create_progress(frame)
+
         # 创建按钮部分
         self.create_buttons(frame)
 
@@ -66,12 +82,9 @@ class BarcodeGenerator:
         """
         创建条码类型选择部分
         """
-        barcode_types = ["QR Code", "EAN13", "EAN8", "Code128", "Code39", "UPCA",
-                         "ISBN13", "ISBN10", "ISSN", "PZN", "JAN", "ITF", "GS1-128",
-                         "DataMatrix", "Aztec", "PDF417"]
         ttk.Label(parent_frame, text="选择码类型:", style='TLabel').grid(row=0, column=0, sticky=tk.W, pady=5)
         self.barcode_type_combobox = ttk.Combobox(parent_frame,
-                                                  values=barcode_types,
+                                                  values=BARCODE_TYPES,
                                                   state="readonly", style='TCombobox')
         self.barcode_type_combobox.grid(row=0, column=1, sticky=(tk.W, tk.E), pady=5)
         self.barcode_type_combobox.current(0)  # 默认选择第一个
@@ -187,6 +200,94 @@ class BarcodeGenerator:
         self.batch_entry.grid(row=0, column=1, sticky=(tk.W, tk.E), pady=5)
         self.batch_entry.insert(0, "data1,data2,data3")  # 批量数据占位符
 
+        # 并行进程数
+        ttk.Label(self.batch_frame, text="工作进程数:", style='TLabel').grid(row=1, column=0, sticky=tk.W, pady=5)
+        self.workers_entry = ttk.Entry(self.batch_frame, width=10, style='TEntry')
+        self.workers_entry.grid(row=1, column=1, sticky=(tk.W, tk.E), pady=5)
+        self.workers_entry.insert(0, str(default_workers()))
+
+        # 文件名模板
+        ttk.Label(self.batch_frame, text="文件名模板:", style='TLabel').grid(row=2, column=0, sticky=tk.W, pady=5)
+        self.template_entry = ttk.Entry(self.batch_frame, width=40, style='TEntry')
+        self.template_entry.grid(row=2, column=1, sticky=(tk.W, tk.E), pady=5)
+        self.template_entry.insert(0, DEFAULT_TEMPLATE)
+
+        # 输出格式
+        ttk.Label(self.batch_frame, text="输出格式:", style='TLabel').grid(row=3, column=0, sticky=tk.W, pady=5)
+        self.format_combobox = ttk.Combobox(self.batch_frame, values=[pattern[2:] for _, pattern in FILE_TYPES],
+                                            state="readonly", style='TCombobox')
+        self.format_combobox.grid(row=3, column=1, sticky=(tk.W, tk.E), pady=5)
+        self.format_combobox.current(0)
+
+        # 标签页PDF及每页行列数
+        self.sheet_var = tk.IntVar()
+        self.sheet_checkbutton = ttk.Checkbutton(self.batch_frame, text="标签页PDF", variable=self.sheet_var,
+                                                 style='TCheckbutton')
+        self.sheet_checkbutton.grid(row=4, column=0, sticky=tk.W)
+        self.grid_entry = ttk.Entry(self.batch_frame, width=10, style='TEntry')
+        self.grid_entry.grid(row=4, column=1, sticky=(tk.W, tk.E), pady=5)
+        self.grid_entry.insert(0, "10x3")
+
+        # 批量输入文件(CSV/JSONL/每行一个)，填写后代替上面的逗号列表
+        ttk.Label(self.batch_frame, text="输入文件:", style='TLabel').grid(row=5, column=0, sticky=tk.W, pady=5)
+        self.input_entry = ttk.Entry(self.batch_frame, width=40, style='TEntry')
+        self.input_entry.grid(row=5, column=1, sticky=(tk.W, tk.E), pady=5)
+        ttk.Button(self.batch_frame, text="...", width=3, command=self.choose_input_file).grid(row=5, column=2, padx=5)
+
+        # 把整批图像写进一个ZIP或tar压缩包，而不是文件夹
+        self.archive_var = tk.IntVar()
+        ttk.Checkbutton(self.batch_frame, text="打包为压缩包", variable=self.archive_var,
+                        style='TCheckbutton').grid(row=6, column=0, sticky=tk.W)
+
+        # 多页1位G4压缩TIFF及其分辨率，供印刷RIP使用
+        self.tiff_var = tk.IntVar()
+        ttk.Checkbutton(self.batch_frame, text="多页TIFF (DPI)", variable=self.tiff_var,
+                        style='TCheckbutton').grid(row=7, column=0, sticky=tk.W)
+        self.dpi_entry = ttk.Entry(self.batch_frame, width=10, style='TEntry')
+        self.dpi_entry.grid(row=7, column=1, sticky=(tk.W, tk.E), pady=5)
+        self.dpi_entry.insert(0, "300")
+
+        # 编码配置：default为Pillow默认，fastest压缩最快，smallest文件最小
+        ttk.Label(self.batch_frame, text="输出配置:", style='TLabel').grid(row=8, column=0, sticky=tk.W, pady=5)
+        self.profile_combobox = ttk.Combobox(self.batch_frame, values=list(PROFILES), state="readonly",
+                                             style='TCombobox')
+        self.profile_combobox.grid(row=8, column=1, sticky=(tk.W, tk.E), pady=5)
+        self.profile_combobox.current(0)
+
+    def create_extra_formats(self, parent_frame):
+        """
+        创建附加格式输入，保存单个码时同时输出这些格式（逗号分隔，如 svg,pdf）
+        """
+        ttk.Label(parent_frame, text="同时保存为:", style='TLabel').grid(row=6, column=0, sticky=tk.W, pady=5)
+        self.extra_formats_entry = ttk.Entry(parent_frame, width=40, style='TEntry')
+        self.extra_formats_entry.grid(row=6, column=1, sticky=(tk.W, tk.E), pady=5)
+
+    def create_print_size(self, parent_frame):
+        """
+        创建打印尺寸输入：填写宽度（毫米）后按打印机 DPI 取整数像素模块，不做重采样
+        """
+        ttk.Label(parent_frame, text="打印宽度 (毫米):", style='TLabel').grid(row=7, column=0, sticky=tk.W, pady=5)
+        self.size_entry = ttk.Entry(parent_frame, width=10, style='TEntry')
+        self.size_entry.grid(row=7, column=1, sticky=(tk.W, tk.E), pady=5)
+
+        ttk.Label(parent_frame, text="打印机 DPI:", style='TLabel').grid(row=8, column=0, sticky=tk.W, pady=5)
+        self.print_dpi_entry = ttk.Entry(parent_frame, width=10, style='TEntry')
+        self.print_dpi_entry.grid(row=8, column=1, sticky=(tk.W, tk.E), pady=5)
+        self.print_dpi_entry.insert(0, "300")
+
+    def create_progress(self, parent_frame):
+        """
+        创建批量进度行：显示进度和剩余时间，可暂停、继续或取消，仅在批量任务运行时显示
+        """
+        self.progress_frame = ttk.Frame(parent_frame, style='TFrame')
+        self.progress_frame.grid(row=10, column=0, columnspan=2, pady=5, sticky=(tk.W, tk.E))
+        self.progress_label = ttk.Label(self.progress_frame, style='TLabel')
+        self.progress_label.grid(row=0, column=0, sticky=tk.W)
+        self.pause_button = ttk.Button(self.progress_frame, text="暂停", command=self.toggle_pause)
+        self.pause_button.grid(row=0, column=1, padx=5)
+        ttk.Button(self.progress_frame, text="取消", command=self.cancel_batch).grid(row=0, column=2)
+        self.progress_frame.grid_remove()
+
     def create_buttons(self, parent_frame):
         """
         创建生成和预览按钮部分
@@ -222,8 +323,7 @@ class BarcodeGenerator:
         if barcode_type == 'QR Code':
             self.qr_settings_frame.grid()
             self.barcode_settings_frame.grid_remove()
-        elif barcode_type in ['EAN13', 'EAN8', 'Code128', 'Code39', 'UPCA', 'ISBN13', 'ISBN10', 'ISSN', 'PZN', 'JAN',
-                              'ITF', 'GS1-128']:
+        elif barcode_type in LINEAR_TYPES:
             self.qr_settings_frame.grid_remove()
             self.barcode_settings_frame.grid()
         else:
@@ -237,286 +337,452 @@ class BarcodeGenerator:
         color_code = colorchooser.askcolor(title="选择颜色")[1]
         if color_code:
             btn.config(bg=color_code)
+            self.schedule_preview()
+
+    def choose_input_file(self):
+        """
+        选择批量输入文件
+        """
+        file_path = filedialog.askopenfilename(title="选择批量输入文件",
+                                               filetypes=[("CSV文件", "*.csv"), ("JSON Lines文件", "*.jsonl"),
+                                                          ("文本文件", "*.txt"), ("所有文件", "*.*")])
+        if file_path:
+            self.input_entry.delete(0, tk.END)
+            self.input_entry.insert(0, file_path)
+
+    def batch_rows(self):
+        """
+        批量数据：有输入文件时逐行流式读取，否则使用逗号分隔的列表
+        """
+        input_path = self.input_entry.get().strip()
+        if input_path:
+            return read_rows(input_path)
+        return [data.strip() for data in self.batch_entry.get().split(',')]
 
     def on_generate_or_preview(self, preview=False):
         """
         处理生成或预览按钮的点击事件
         """
-        fill_color = self.fill_color_btn['bg'] if self.fill_color_btn['bg'] != "SystemButtonFace" else "black"
-        back_color = self.back_color_btn['bg'] if self.back_color_btn['bg'] != "SystemButtonFace" else "white"
-
-        if fill_color == "SystemButtonFace":
-            fill_color = "black"
-        if back_color == "SystemButtonFace":
-            back_color = "white"
+        if preview:
+            self.show_preview()
+            return
+        fill_color, back_color = self.current_colors()
 
+        filetypes = [(f"{name}文件", pattern) for name, pattern in FILE_TYPES] + [("所有文件", "*.*")]
         try:
             if self.batch_var.get() == 1:
-                batch_data = self.batch_entry.get().split(',')
-                for data in batch_data:
-                    img = self.generate_image(data.strip(), fill_color, back_color)
-                    if not preview:
-                        output_path = filedialog.asksaveasfilename(defaultextension=".png",
-                                                                   filetypes=[("PNG文件", "*.png"),
-                                                                              ("JPG文件", "*.jpg"),
-                                                                              ("BMP文件", "*.bmp"),
-                                                                              ("GIF文件", "*.gif"),
-                                                                              ("TIFF文件", "*.tiff"),
-                                                                              ("ICO文件", "*.ico"),
-                                                                              ("WEBP文件", "*.webp"),
-                                                                              ("SVG文件", "*.svg"),
-                                                                              ("PDF文件", "*.pdf"),
-                                                                              ("EPS文件", "*.eps"),
-                                                                              ("PBM文件", "*.pbm"),
-                                                                              ("PGM文件", "*.pgm"),
-                                                                              ("PPM文件", "*.ppm"),
-                                                                              ("XBM文件", "*.xbm"),
-                                                                              ("XPM文件", "*.xpm"),
-                                                                              ("PCX文件", "*.pcx"),
-                                                                              ("TGA文件", "*.tga"),
-                                                                              ("所有文件", "*.*")])
-                        if output_path:
-                            self.save_image(img, output_path)
+                if self.batch_job is not None and not self.batch_job.future.done():
+                    raise ValueError("已有批量任务正在运行")
+                batch_data = self.batch_rows()
+                if self.sheet_var.get() == 1:
+                    output_path = filedialog.asksaveasfilename(defaultextension=".pdf", filetypes=[("PDF", "*.pdf")],
+                                                               title="保存标签页")
+                    if output_path:
+                        self.start_sheet(batch_data, output_path, fill_color, back_color)
+                elif self.tiff_var.get() == 1:
+                    output_path = filedialog.asksaveasfilename(defaultextension=".tif", title="保存多页TIFF",
+                                                               filetypes=[("TIFF", "*.tif *.tiff")])
+                    if output_path:
+                        self.start_tiff(batch_data, output_path)
+                elif self.archive_var.get() == 1:
+                    output_path = filedialog.asksaveasfilename(
+                        defaultextension=".zip", title="保存压缩包",
+                        filetypes=[("ZIP", "*.zip"), ("TAR", "*.tar"), ("TAR.GZ", "*.tar.gz")])
+                    if output_path:
+                        self.start_archive(batch_data, output_path, fill_color, back_color)
+                else:
+                    directory = filedialog.askdirectory(title="选择输出文件夹")
+                    if directory:
+                        self.start_batch(batch_data, directory, fill_color, back_color)
             else:
                 data = self.data_entry.get()
-                img = self.generate_image(data, fill_color, back_color)
-                if preview:
-                    self.preview_image(img)
-                else:
-                    output_path = filedialog.asksaveasfilename(defaultextension=".png",
-                                                               filetypes=[("PNG文件", "*.png"),
-                                                                          ("JPG文件", "*.jpg"),
-                                                                          ("BMP文件", "*.bmp"),
-                                                                          ("GIF文件", "*.gif"),
-                                                                          ("TIFF文件", "*.tiff"),
-                                                                          ("ICO文件", "*.ico"),
-                                                                          ("WEBP文件", "*.webp"),
-                                                                          ("SVG文件", "*.svg"),
-                                                                          ("PDF文件", "*.pdf"),
-                                                                          ("EPS文件", "*.eps"),
-                                                                          ("PBM文件", "*.pbm"),
-                                                                          ("PGM文件", "*.pgm"),
-                                                                          ("PPM文件", "*.ppm"),
-                                                                          ("XBM文件", "*.xbm"),
-                                                                          ("XPM文件", "*.xpm"),
-                                                                          ("PCX文件", "*.pcx"),
-                                                                          ("TGA文件", "*.tga"),
-                                                                          ("所有文件", "*.*")])
-                    if output_path:
-                        self.save_image(img, output_path)
+                output_path = filedialog.asksaveasfilename(defaultextension=".png", filetypes=filetypes)
+                if output_path:
+                    self.save_code(data, output_path, fill_color, back_color)
         except Exception as e:
             messagebox.showerror("错误", f"发生错误: {e}")
 
-    def generate_image(self, data, fill_color="black", back_color="white"):
+    def start_batch(self, batch_data, directory, fill_color, back_color):
         """
-        根据输入的数据和参数生成条码/二维码的图像
+        在后台启动多进程批量导出，并在输出文件夹中记录断点清单
         """
+        workers = int(self.workers_entry.get())
+        if workers < 1:
+            raise ValueError("工作进程数必须至少为1")
         barcode_type = self.barcode_type_combobox.get()
-        if barcode_type == 'QR Code':
-            version = int(self.version_entry.get())
-            error_correction = self.error_correction_combobox.get()
-            box_size = int(self.box_size_entry.get())
-            border = int(self.border_entry.get())
-            self.validate_inputs(data, barcode_type, version, box_size, border, None, None, None, None)
-            img = self.generate_qr_code(data, version, error_correction, box_size, border, fill_color=fill_color,
-                                        back_color=back_color)
-        elif barcode_type == 'DataMatrix':
-            img = self.generate_datamatrix(data, fill_color=fill_color, back_color=back_color)
-        elif barcode_type == 'Aztec':
-            img = self.generate_aztec(data, fill_color=fill_color, back_color=back_color)
-        elif barcode_type == 'PDF417':
-            img = self.generate_pdf417(data, fill_color=fill_color, back_color=back_color)
+        options = self.get_options()
+        profile = self.profile_combobox.get()
+        items = plan_outputs(batch_data, directory, self.template_entry.get(), self.format_combobox.get(),
+                             barcode_type)
+        manifest_path = os.path.join(directory, MANIFEST_NAME)
+        if os.path.exists(manifest_path) and not messagebox.askyesno(
+                "继续导出", "该文件夹中有之前导出留下的断点清单。\n是否跳过已经保存的图像，从中断处继续？"):
+            os.remove(manifest_path)
+
+        def export(mapper):
+            with Manifest(manifest_path) as manifest:
+                return list(run_batch(items, barcode_type, fill_color, back_color, manifest=manifest,
+                                      profile=profile, mapper=mapper, **options))
+
+        self.track_batch(self.scheduler.start(export, total=self.batch_total(batch_data), limit=workers))
+        self.root.after(100, self.poll_batch, self.batch_job.future)
+
+    def poll_batch(self, future):
+        """
+        轮询批量任务，完成后汇总结果
+        """
+        if not future.done():
+            self.root.after(100, self.poll_batch, future)
+            return
+        try:
+            results = future.result()
+        except BatchCancelled:
+            messagebox.showinfo("已取消", "批量导出已取消，已完成的文件会保留")
+            return
+        except Exception as e:
+            messagebox.showerror("错误", f"批量导出失败: {e}")
+            return
+        failed = [result for result in results if result.error]
+        if failed:
+            details = "\n".join(f"{result.data}: {result.error}" for result in failed[:10])
+            messagebox.showerror("错误", f"{len(results)} 个图像中有 {len(failed)} 个失败:\n{details}")
         else:
-            module_width = float(self.module_width_entry.get())
-            module_height = float(self.module_height_entry.get())
-            font_size = int(self.font_size_entry.get())
-            text_distance = int(self.text_distance_entry.get())
-            self.validate_inputs(data, barcode_type, None, None, None, module_width, module_height, font_size,
-                                 text_distance)
-            img = self.generate_barcode(data, barcode_type, module_width, module_height, font_size, text_distance,
-                                        fill_color=fill_color, back_color=back_color)
-        return img
-
-    def generate_qr_code(self, data, version, error_correction, box_size, border, fill_color="black",
-                         back_color="white"):
-        """
-        生成二维码图像
-        """
-        error_correction_map = {
-            "L": qrcode.constants.ERROR_CORRECT_L,
-            "M": qrcode.constants.ERROR_CORRECT_M,
-            "Q": qrcode.constants.ERROR_CORRECT_Q,
-            "H": qrcode.constants.ERROR_CORRECT_H,
-        }
-
-        qr = qrcode.QRCode(
-            version=version,
-            error_correction=error_correction_map[error_correction],
-            box_size=box_size,
-            border=border,
-        )
-        qr.add_data(data)
-        qr.make(fit=True)
-        img = qr.make_image(fill_color=fill_color, back_color=back_color).convert("RGB")
-        return img
-
-    def generate_barcode(self, data, barcode_type='EAN13', module_width=0.2, module_height=15, font_size=10,
-                         text_distance=5, fill_color="black", back_color="white"):
-        """
-        生成条形码图像
-        """
-        writer = ImageWriter()
-        writer.set_options({
-            'module_width': module_width,
-            'module_height': module_height,
-            'font_size': font_size,
-            'text_distance': text_distance,
-        })
-
-        # 条形码类型映射
-        barcode_class = {
-            'EAN13': EAN13,
-            'EAN8': EAN8,
-            'Code128': Code128,
-            'Code39': Code39,
-            'UPCA': UPCA,
-            'ISBN13': ISBN13,
-            'ISBN10': ISBN10,
-            'ISSN': ISSN,
-            'PZN': PZN,
-            'JAN': JAN,
-            'ITF': ITF,
-            'GS1-128': Gs1_128
-        }.get(barcode_type)
-
-        if not barcode_class:
-            raise ValueError("不支持的条码类型")
-
-        barcode = barcode_class(data, writer=writer)
-
-        barcode_bytes = BytesIO()
-        barcode.write(barcode_bytes)
-        barcode_bytes.seek(0)
-        img = Image.open(barcode_bytes).convert("RGB")
-
-        # 应用填充颜色和背景颜色
-        img = ImageOps.colorize(ImageOps.grayscale(img), black=fill_color, white=back_color)
-
-        return img
-
-    def generate_datamatrix(self, data, fill_color="black", back_color="white"):
-        """
-        生成DataMatrix码图像
-        """
-        encoded = dmtx_encode(data.encode('utf-8'))
-        img = Image.frombytes('RGB', (encoded.width, encoded.height), encoded.pixels)
-        img = ImageOps.colorize(ImageOps.grayscale(img), black=fill_color, white=back_color)
-        return img
-
-    def generate_aztec(self, data, fill_color="black", back_color="white"):
-        """
-        生成Aztec码图像
-        """
-        qr = pyqrcodeng.create(data)
-        buffer = BytesIO()
-        qr.png(buffer, scale=5, module_color=fill_color, background=back_color)
-        img = Image.open(buffer)
-        return img
-
-    def generate_pdf417(self, data, fill_color="black", back_color="white"):
-        """
-        生成PDF417码图像
-        """
-        codes = pdf417gen.encode(data)
-        img = pdf417gen.render_image(codes, scale=3, ratio=3)
-        img = ImageOps.colorize(ImageOps.grayscale(img), black=fill_color, white=back_color)
-        return img
-
-    def save_image(self, img, file_path):
+            resumed = sum(result.resumed for result in results)
+            reused = sum(result.duplicate_of is not None and not result.resumed for result in results)
+            note = f"\n重复数据复用已有结果，少渲染 {reused} 次" if reused else ""
+            if resumed:
+                note += f"\n其中 {resumed} 个在之前的导出中已保存，已跳过"
+            stats = [result.stats for result in results if result.stats is not None]
+            if stats:
+                note += (f"\n平均每个图像 {sum(s.size for s in stats) / len(stats):.0f} 字节，"
+                         f"编码用时 {sum(s.seconds for s in stats) * 1000 / len(stats):.1f} 毫秒")
+            messagebox.showinfo("成功", f"{len(results)} 个图像保存成功{note}")
+
+    def start_archive(self, batch_data, file_path, fill_color, back_color):
+        """
+        在后台把批量图像边生成边写入一个压缩包，格式由扩展名决定
+        """
+        workers = int(self.workers_entry.get())
+        if workers < 1:
+            raise ValueError("工作进程数必须至少为1")
+        barcode_type = self.barcode_type_combobox.get()
+        options = self.get_options()
+        profile = self.profile_combobox.get()
+        items = plan_outputs(batch_data, "", self.template_entry.get(), self.format_combobox.get(), barcode_type)
+
+        def export(mapper):
+            with ArchiveWriter(file_path) as archive:
+                return list(run_batch(items, barcode_type, fill_color, back_color, archive=archive,
+                                      profile=profile, mapper=mapper, **options))
+
+        self.track_batch(self.scheduler.start(export, total=self.batch_total(batch_data), limit=workers))
+        self.root.after(100, self.poll_batch, self.batch_job.future)
+
+    def start_sheet(self, datas, file_path, fill_color, back_color):
+        """
+        在后台把所有码排版到一个多页标签PDF
+        """
+        workers = int(self.workers_entry.get())
+        if workers < 1:
+            raise ValueError("工作进程数必须至少为1")
+        rows, columns = parse_grid(self.grid_entry.get())
+        barcode_type = self.barcode_type_combobox.get()
+        options = self.get_options()
+        self.track_batch(self.scheduler.start(write_label_sheet, datas, file_path, barcode_type, fill_color,
+                                              back_color, total=self.batch_total(datas), limit=workers, rows=rows,
+                                              columns=columns, **options))
+        self.root.after(100, self.poll_sheet, self.batch_job.future)
+
+    def start_tiff(self, datas, file_path):
+        """
+        在后台把所有码逐页写入一个G4压缩的多页TIFF
         """
-        保存图像到指定路径
+        workers = int(self.workers_entry.get())
+        if workers < 1:
+            raise ValueError("工作进程数必须至少为1")
+        dpi = float(self.dpi_entry.get())
+        barcode_type = self.barcode_type_combobox.get()
+        options = self.get_options()
+        self.track_batch(self.scheduler.start(write_tiff_pages, datas, file_path, barcode_type, dpi,
+                                              total=self.batch_total(datas), limit=workers, **options))
+        self.root.after(100, self.poll_sheet, self.batch_job.future, "多页TIFF")
+
+    def poll_sheet(self, future, name="标签页"):
+        """
+        轮询标签页或多页TIFF任务，完成后汇总结果
         """
+        if not future.done():
+            self.root.after(100, self.poll_sheet, future, name)
+            return
         try:
-            extension = file_path.split('.')[-1].lower()
-            if extension == 'pdf':
-                self.save_as_pdf(img, file_path)
-            elif extension == 'svg':
-                self.save_as_svg(img, file_path)
-            else:
-                img.save(file_path)
-            messagebox.showinfo("成功", f"图像成功保存到 {file_path}")
+            result = future.result()
+        except BatchCancelled:
+            messagebox.showinfo("已取消", f"{name}生成已取消")
+            return
         except Exception as e:
-            messagebox.showerror("错误", f"保存图像失败: {e}")
+            messagebox.showerror("错误", f"{name}生成失败: {e}")
+            return
+        total = result.written + len(result.failed)
+        if result.failed:
+            details = "\n".join(f"{data}: {error}" for _, data, error in result.failed[:10])
+            messagebox.showerror("错误", f"{total} 个码中有 {len(result.failed)} 个失败:\n{details}")
+        else:
+            note = f"\n重复数据复用已有结果，少渲染 {result.reused} 次" if result.reused else ""
+            messagebox.showinfo("成功", f"{result.written} 个码已排入 {result.pages} 页{note}")
 
-    def save_as_pdf(self, img, file_path):
+    def get_options(self):
         """
-        将图像保存为PDF格式
+        从界面控件读取当前码类型的参数
+        """
+        barcode_type = self.barcode_type_combobox.get()
+        if barcode_type == 'QR Code':
+            options = {
+                'version': int(self.version_entry.get()),
+                'error_correction': self.error_correction_combobox.get(),
+                'box_size': int(self.box_size_entry.get()),
+                'border': int(self.border_entry.get()),
+            }
+        elif barcode_type in LINEAR_TYPES:
+            options = {
+                'module_width': float(self.module_width_entry.get()),
+                'module_height': float(self.module_height_entry.get()),
+                'font_size': int(self.font_size_entry.get()),
+                'text_distance': int(self.text_distance_entry.get()),
+            }
+        else:
+            options = {}
+        if self.size_entry.get().strip():
+            options['size_mm'] = float(self.size_entry.get())
+            options['print_dpi'] = float(self.print_dpi_entry.get())
+        return options
+
+    def save_code(self, data, file_path, fill_color, back_color):
         """
+        保存条码到指定路径，SVG和PDF格式输出为矢量图，重复的码直接使用缓存
+        """
+        extras = [extension for extension in self.extra_formats_entry.get().split(',') if extension.strip()]
+        barcode_type = self.barcode_type_combobox.get()
+        profile = self.profile_combobox.get()
+        # 在调度器的交互通道中运行，即使有批量任务也会优先获得下一个空闲进程；
+        # 任务先编码再写文件，输入错误由 poll_save 报告
+        if extras:
+            future = self.scheduler.submit(save_formats, data, format_paths(file_path, extras), barcode_type,
+                                           fill_color, back_color, profile, **self.get_options())
+        else:
+            future = self.scheduler.submit(save_code, data, file_path, barcode_type, fill_color, back_color,
+                                           profile, **self.get_options())
+        self.root.after(50, self.poll_save, future, file_path)
+
+    def poll_save(self, future, file_path):
+        """
+        轮询保存任务，完成后报告结果
+        """
+        if not future.done():
+            self.root.after(50, self.poll_save, future, file_path)
+            return
         try:
-            buffer = BytesIO()
-            img.save(buffer, format='PNG')
-            buffer.seek(0)
-            pdf_canvas = canvas.Canvas(file_path, pagesize=(img.width, img.height))
-            pdf_canvas.drawImage(ImageReader(buffer), 0, 0, width=img.width, height=img.height)
-            pdf_canvas.showPage()
-            pdf_canvas.save()
+            result = future.result()
         except Exception as e:
-            messagebox.showerror("错误", f"保存PDF失败: {e}")
+            messagebox.showerror("错误", f"保存图像失败: {e}")
+            return
+        if isinstance(result, list):
+            self.show_format_results(result)
+        else:
+            messagebox.showinfo("成功", f"图像成功保存到 {file_path}\n"
+                                      f"{result.size} 字节，编码用时 {result.seconds * 1000:.1f} 毫秒")
+
+    def show_format_results(self, results):
+        """
+        汇总多格式保存中各格式的结果
+        """
+        lines = [f"{result.path}: 失败 - {result.error}" if result.error else
+                 f"{result.path}: {result.stats.size} 字节，{result.stats.seconds * 1000:.1f} 毫秒"
+                 for result in results]
+        if any(result.error for result in results):
+            messagebox.showerror("错误", "部分格式保存失败:\n" + "\n".join(lines))
+        else:
+            messagebox.showinfo("成功", "图像已保存:\n" + "\n".join(lines))
 
-    def save_as_svg(self, img, file_path):
+    def current_colors(self):
         """
-        将图像保存为SVG格式
+        读取当前的填充色和背景色
         """
-        buffer = BytesIO()
-        img.save(buffer, format='PNG')
-        buffer.seek(0)
-        dwg = svgwrite.Drawing(file_path, profile='tiny', size=img.size)
-        image_data = buffer.getvalue()
-        image_base64 = base64.b64encode(image_data).decode('utf-8')
-        dwg.add(dwg.image(href='data:image/png;base64,' + image_base64, insert=(0, 0), size=img.size))
-        dwg.save()
+        fill_color = self.fill_color_btn['bg']
+        back_color = self.back_color_btn['bg']
+        if fill_color == "SystemButtonFace":
+            fill_color = "black"
+        if back_color == "SystemButtonFace":
+            back_color = "white"
+        return fill_color, back_color
 
-    def preview_image(self, img):
+    def show_preview(self):
         """
-        预览生成的图像
+        打开（或重新显示）唯一的预览窗口，并立即渲染当前设置
         """
-        preview_window = tk.Toplevel(self.root)
-        preview_window.title("预览")
-        preview_window.geometry("600x600")
-        preview_canvas = tk.Canvas(preview_window, width=600, height=600)
-        preview_canvas.pack()
+        if self.preview_window is None:
+            self.preview_window = tk.Toplevel(self.root)
+            self.preview_window.title("预览")
+            self.preview_window.protocol("WM_DELETE_WINDOW", self.hide_preview)
+            width, height = PREVIEW_SIZE
+            self.preview_canvas = tk.Canvas(self.preview_window, width=width, height=height)
+            self.preview_canvas.pack()
+            self.preview_status = ttk.Label(self.preview_window, style='TLabel')
+            self.preview_status.pack(fill=tk.X)
+        else:
+            self.preview_window.deiconify()
+            self.preview_window.lift()
+        self.request_preview()
 
-        img.thumbnail((600, 600), Image.LANCZOS)
-        tk_img = ImageTk.PhotoImage(img)
+    def hide_preview(self):
+        """
+        隐藏预览窗口（保留以便复用），并取消尚未完成的渲染
+        """
+        if self.preview_job is not None:
+            self.root.after_cancel(self.preview_job)
+            self.preview_job = None
+        if self.preview_poll is not None:
+            self.root.after_cancel(self.preview_poll)
+            self.preview_poll = None
+        self.preview_worker.cancel()
+        self.preview_window.withdraw()
 
-        preview_canvas.create_image(300, 300, image=tk_img, anchor=tk.CENTER)
-        preview_canvas.image = tk_img
-        preview_window.mainloop()
+    def preview_visible(self):
+        return self.preview_window is not None and self.preview_window.state() != 'withdrawn'
 
-    def validate_inputs(self, data, barcode_type, version, box_size, border, module_width, module_height, font_size,
-                        text_distance):
+    def schedule_preview(self, event=None):
         """
-        验证输入的参数是否合法
+        防抖：每次修改都重新计时，停止输入一段时间后才渲染
         """
-        if not data:
-            raise ValueError("请输入要编码的数据")
+        if not self.preview_visible():
+            return
+        if self.preview_job is not None:
+            self.root.after_cancel(self.preview_job)
+        self.preview_job = self.root.after(PREVIEW_DELAY_MS, self.request_preview)
 
-        if barcode_type == 'QR Code':
-            if not (1 <= version <= 40):
-                raise ValueError("QR Code版本必须在1到40之间")
-            if box_size <= 0:
-                raise ValueError("方块大小必须大于0")
-            if border < 0:
-                raise ValueError("边框大小不能为负数")
+    def request_preview(self):
+        """
+        在主线程读取当前设置，交给后台线程渲染；旧的请求会被取代
+        """
+        self.preview_job = None
+        try:
+            if self.batch_var.get() == 1:
+                first = next(iter(self.batch_rows()), None)
+                if first is None:
+                    raise ValueError("没有可预览的批量数据")
+                data = first if isinstance(first, str) else first.data
+            else:
+                data = self.data_entry.get()
+            fill_color, back_color = self.current_colors()
+            barcode_type = self.barcode_type_combobox.get()
+            options = self.get_options()
+        except Exception as e:
+            self.preview_worker.cancel()
+            self.preview_status.config(text=f"错误: {e}")
+            return
+        self.preview_status.config(text="正在渲染...")
+        self.preview_worker.submit(data, barcode_type, fill_color, back_color, options)
+        # 只在后台线程有任务时轮询结果，空闲后停止，下次请求再重新开始
+        if self.preview_poll is None:
+            self.preview_poll = self.root.after(50, self.poll_preview)
+
+    def render_preview(self, token, data, barcode_type, fill_color, back_color, options):
+        """
+        在后台线程中按画布大小直接渲染（整数像素模块，无重采样）；被取代的结果会被丢弃
+        """
+        if token.cancelled:
+            return None
+        future = self.scheduler.submit(generate_preview, data, barcode_type, fill_color, back_color, PREVIEW_SIZE,
+                                       **options)
+        # 有新的请求时，若还没有工作进程开始这次渲染，就把它从调度队列中撤下；
+        # result() 因此抛出的 CancelledError 会随被取代的渲染一起丢弃
+        token.on_cancel(future.cancel)
+        img = future.result()
+        return None if token.cancelled else img
+
+    def poll_preview(self):
+        """
+        在主线程中只绘制最新完成的渲染结果
+        """
+        self.preview_poll = None
+        busy = self.preview_worker.busy()
+        result = self.preview_worker.poll()
+        if result is not None:
+            if result.error is not None:
+                self.preview_status.config(text=f"错误: {result.error}")
+            else:
+                width, height = PREVIEW_SIZE
+                tk_img = ImageTk.PhotoImage(result.image)
+                self.preview_canvas.delete("all")
+                self.preview_canvas.create_image(width // 2, height // 2, image=tk_img, anchor=tk.CENTER)
+                self.preview_canvas.image = tk_img
+                self.preview_status.config(text="")
+        if busy and self.preview_visible():
+            self.preview_poll = self.root.after(50, self.poll_preview)
+
+    def batch_total(self, batch_data):
+        """
+        批量数据的条数；从文件流式读取时未知，返回None
+        """
+        return len(batch_data) if isinstance(batch_data, list) else None
+
+    def track_batch(self, job):
+        """
+        显示批量进度行并开始定时刷新
+        """
+        self.batch_job = job
+        self.pause_button.config(text="暂停")
+        self.progress_frame.grid()
+        self.poll_progress()
+
+    def poll_progress(self):
+        """
+        刷新批量进度、速度和预计剩余时间，任务结束后隐藏进度行
+        """
+        job = self.batch_job
+        if job is None or job.future.done():
+            self.progress_frame.grid_remove()
+            return
+        progress = job.progress()
+        if progress.total:
+            text = f"已完成 {progress.done} / {progress.total} ({progress.done * 100 / progress.total:.0f}%)"
+        else:
+            text = f"已完成 {progress.done}"
+        text += f"，每秒 {progress.rate:.0f} 个"
+        if progress.eta is not None:
+            text += f"，剩余约 {int(progress.eta) // 60}:{int(progress.eta) % 60:02d}"
+        if progress.paused:
+            text = "已暂停 - " + text
+        self.progress_label.config(text=text)
+        self.root.after(250, self.poll_progress)
+
+    def toggle_pause(self):
+        """
+        暂停或继续当前批量任务；正在处理的项目会先完成
+        """
+        if self.batch_job is None:
+            return
+        if self.pause_button['text'] == "暂停":
+            self.batch_job.pause()
+            self.pause_button.config(text="继续")
         else:
-            if module_width <= 0:
-                raise ValueError("模块宽度必须大于0")
-            if module_height <= 0:
-                raise ValueError("模块高度必须大于0")
-            if font_size <= 0:
-                raise ValueError("字体大小必须大于0")
-            if text_distance < 0:
-                raise ValueError("文字距离不能为负数")
+            self.batch_job.resume()
+            self.pause_button.config(text="暂停")
+
+    def cancel_batch(self):
+        """
+        取消当前批量任务
+        """
+        if self.batch_job is not None:
+            self.batch_job.cancel()
+
+    def on_close(self):
+        """
+        关闭窗口时取消批量任务并停止工作进程
+        """
+        self.cancel_batch()
+        self.preview_worker.close()
+        self.scheduler.shutdown()
+        self.root.destroy()
 
 if __name__ == "__main__":
     root = ttkb.Window()
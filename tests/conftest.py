@@ -0,0 +1,16 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from barcode_core.cache import configure_cache, get_cache  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    # Every test starts with an empty in-memory cache and leaves the default one behind.
+    settings = get_cache().settings()
+    yield configure_cache()
+    configure_cache(*settings)
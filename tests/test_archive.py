@@ -0,0 +1,84 @@
+import io
+import tarfile
+import zipfile
+
+import pytest
+
+from barcode_core.archive import ArchiveWriter, archive_format_for
+from barcode_core.batch import run_batch
+from barcode_core.manifest import Manifest
+from barcode_core.naming import plan_outputs
+
+
+class WriteOnly(io.RawIOBase):
+    """A pipe-like binary stream that cannot seek or tell."""
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.data += data
+        return len(data)
+
+
+@pytest.mark.parametrize('archive_format', ['zip', 'tar'])
+def test_archive_repeats(tmp_path, archive_format):
+    path = str(tmp_path / f"codes.{archive_format}")
+    with ArchiveWriter(path) as archive:
+        results = list(run_batch(plan_outputs(["a", "b", "a"], ""), workers=1, archive=archive))
+    assert [result.duplicate_of for result in results] == [None, None, 0]
+    names = [result.output_path for result in results]
+    if archive_format == 'zip':
+        with zipfile.ZipFile(path) as f:
+            assert f.namelist() == names
+            assert f.read(names[2]) == f.read(names[0])
+    else:
+        with tarfile.open(path) as f:
+            members = f.getmembers()
+            assert [member.name for member in members] == names
+            assert members[2].islnk() and members[2].linkname == names[0]
+
+
+def test_archive_cannot_resume(tmp_path):
+    with Manifest(str(tmp_path / "manifest.jsonl")) as manifest, ArchiveWriter(str(tmp_path / "a.zip")) as archive:
+        with pytest.raises(ValueError):
+            list(run_batch([("a", "a.png")], workers=1, manifest=manifest, archive=archive))
+
+
+def test_archive_format_for():
+    formats = [archive_format_for(name) for name in ("a.TAR", "a.tar.gz", "a.tgz", "a.zip", "a", io.BytesIO())]
+    assert formats == ['tar', 'tar.gz', 'tar.gz', 'zip', 'zip', 'zip']
+
+
+@pytest.mark.parametrize('archive_format', ['zip', 'tar', 'tar.gz'])
+def test_archives_stream_to_unseekable_targets(archive_format):
+    target = WriteOnly()
+    with ArchiveWriter(target, archive_format) as archive:
+        results = list(run_batch(plan_outputs(["a", "b"], "", ext="svg"), workers=1, archive=archive))
+    content = io.BytesIO(bytes(target.data))
+    if archive_format == 'zip':
+        with zipfile.ZipFile(content) as f:
+            assert f.namelist() == [result.output_path for result in results]
+            assert f.read(results[0].output_path).startswith(b"<?xml")
+    else:
+        with tarfile.open(fileobj=content) as f:
+            assert f.getnames() == [result.output_path for result in results]
+
+
+def test_zip_stores_compressed_formats():
+    target = io.BytesIO()
+    with ArchiveWriter(target, 'zip') as archive:
+        archive.add("a.png", b"x" * 1000)
+        archive.add("a.svg", b"x" * 1000)
+    with zipfile.ZipFile(target) as f:
+        assert [info.compress_type for info in f.infolist()] == [zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED]
+
+
+def test_unknown_format_and_zip_links():
+    with pytest.raises(ValueError):
+        ArchiveWriter(io.BytesIO(), 'rar')
+    with ArchiveWriter(io.BytesIO(), 'zip') as archive, pytest.raises(ValueError):
+        archive.link("b.png", "a.png")
@@ -0,0 +1,55 @@
+import os
+
+from barcode_core.batch import DuplicateFinder, encode_batch, run_batch
+from barcode_core.naming import plan_outputs
+
+
+def batch(values, directory, **kwargs):
+    return list(run_batch(plan_outputs(values, str(directory)), workers=1, **kwargs))
+
+
+def test_repeats_are_rendered_once_and_linked(tmp_path):
+    results = batch(["a", "b", "a"], tmp_path, link_duplicates=True)
+    assert [result.duplicate_of for result in results] == [None, None, 0]
+    assert results[2].stats is None
+    first, _, repeat = (os.stat(result.output_path) for result in results)
+    assert (first.st_ino, first.st_nlink) == (repeat.st_ino, 2)
+
+
+def test_repeats_are_copied_by_default(tmp_path):
+    results = batch(["a", "a"], tmp_path)
+    assert results[1].duplicate_of == 0
+    first, repeat = (os.stat(result.output_path) for result in results)
+    assert first.st_ino != repeat.st_ino
+    with open(results[0].output_path, 'rb') as a, open(results[1].output_path, 'rb') as b:
+        assert a.read() == b.read()
+
+
+def test_only_identical_renderings_are_shared(tmp_path):
+    items = [("a", str(tmp_path / "1.png")), ("a", str(tmp_path / "2.svg")),
+             ("a", str(tmp_path / "3.png"), {'box_size': 3}), ("a", str(tmp_path / "4.png"), {'box_size': 3})]
+    results = list(run_batch(items, workers=1))
+    assert [result.duplicate_of for result in results] == [None, None, None, 2]
+    assert [result.duplicate_of for result in batch(["a", "a"], tmp_path, dedupe=False)] == [None, None]
+
+
+def test_repeats_of_a_failed_item_fail(tmp_path):
+    results = batch(["bad", "bad"], tmp_path, barcode_type='EAN8')
+    assert results[1].duplicate_of == 0
+    assert results[0].error and results[1].error == results[0].error
+    assert not any(os.path.exists(result.output_path) for result in results)
+
+
+def test_duplicate_finder_window():
+    finder = DuplicateFinder(window=2)
+    assert [finder(key, position) for position, key in enumerate("abab")] == [None, None, 0, 1]
+    # "c" evicts "a", the least recently seen key.
+    assert finder("c", 4) is None
+    assert finder("b", 5) == 1
+    assert finder("a", 6) is None
+
+
+def test_encode_batch_encodes_repeats_once():
+    items = list(encode_batch(["a", "b", "a"], workers=1))
+    assert [item.duplicate_of for item in items] == [None, None, 0]
+    assert items[2].symbol is None and items[0].symbol is not None
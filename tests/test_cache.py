@@ -0,0 +1,38 @@
+import numpy as np
+from PIL import Image
+
+from barcode_core.cache import RenderCache
+from barcode_core.generators import generate_image, render_key
+
+
+def test_render_key_ignores_color_spelling_and_unused_options():
+    assert render_key("x", fill_color="black") == render_key("x", fill_color="#000000")
+    assert render_key("x", module_width=0.5) == render_key("x")
+    assert render_key("x", box_size=5) != render_key("x")
+    assert render_key("x", file_format='png') != render_key("x", file_format='svg')
+
+
+def test_generate_image_cache_skips_png_encoding_and_keeps_resolution(monkeypatch):
+    first = generate_image("cached", size_mm=20, print_dpi=300, fill_color="red")
+
+    def fail(*args, **kwargs):
+        raise AssertionError("the image cache must not go through a file format")
+    monkeypatch.setattr(Image.Image, 'save', fail)
+    monkeypatch.setattr(Image, 'open', fail)
+    second = generate_image("cached", size_mm=20, print_dpi=300, fill_color="red")
+    assert second is not first
+    assert second.mode == first.mode == 'P'
+    assert second.getpalette() == first.getpalette()
+    assert second.info['dpi'] == first.info['dpi'] == (300, 300)
+    assert np.array_equal(np.asarray(second), np.asarray(first))
+
+
+def test_memory_tier_evicts_least_recently_used_and_disk_tier_survives(tmp_path):
+    cache = RenderCache(max_bytes=10, directory=str(tmp_path))
+    cache.put('aa1', b'12345')
+    cache.put('aa2', b'12345')
+    cache.get('aa1')
+    cache.put('aa3', b'12345')
+    assert list(cache.entries) == ['aa1', 'aa3']
+    assert RenderCache(0, str(tmp_path)).get('aa2') == b'12345'
+    assert cache.stats().evictions == 1
@@ -0,0 +1,44 @@
+import pytest
+
+from barcode_core.generators import encode_symbol, fit_symbol, symbol_size_mm
+
+
+def test_fit_gives_whole_pixel_modules_at_the_print_resolution():
+    symbol = encode_symbol("hello", box_size=10, border=4)
+    modules = symbol.columns + 2 * symbol.quiet_zone[0]
+    assert modules == 29
+    # 30 mm at 203 dpi is 239.8 dots, 8.27 per module: 8 dots, 232 in all.
+    fitted = fit_symbol(symbol, 30, 203)
+    assert (fitted.module_width, fitted.module_height, fitted.dpi) == (8, 8, 203)
+    assert fitted.size() == (232, 232)
+    assert symbol_size_mm(fitted) == pytest.approx((232 * 25.4 / 203,) * 2)
+    assert (fitted.modules == symbol.modules).all()
+
+
+def test_exact_sizes_are_met():
+    symbol = encode_symbol("hello", size_mm=29 * 4 * 25.4 / 600, print_dpi=600)
+    assert symbol.module_width == 4
+    assert symbol.size() == (116, 116)
+
+
+def test_linear_codes_keep_bar_height_and_text_in_millimetres():
+    symbol = encode_symbol("123456789012", 'EAN13')
+    fitted = encode_symbol("123456789012", 'EAN13', size_mm=40, print_dpi=600)
+    modules = symbol.columns + 2 * symbol.quiet_zone[0]
+    assert fitted.module_width == round(40 * 600 / 25.4 / modules)
+    assert fitted.module_height == 2 * symbol.module_height
+    assert fitted.font_size == 2 * symbol.font_size
+    assert fitted.guard_height == 2 * symbol.guard_height
+
+
+def test_sizes_below_one_pixel_per_module_are_rejected():
+    symbol = encode_symbol("hello")
+    # 29 modules need at least 29 pixels: 2.46 mm at 300 dpi.
+    assert fit_symbol(symbol, 2.46, 300).module_width == 1
+    with pytest.raises(ValueError, match="use at least 2.46 mm"):
+        fit_symbol(symbol, 2.4, 300)
+    with pytest.raises(ValueError):
+        encode_symbol("hello", size_mm=1, print_dpi=203)
+    for size_mm, dpi in ((0, 300), (10, 0)):
+        with pytest.raises(ValueError):
+            fit_symbol(symbol, size_mm, dpi)
@@ -0,0 +1,84 @@
+import json
+import os
+
+import pytest
+
+from barcode_core.batch import run_batch
+from barcode_core.cli import main
+from barcode_core.manifest import Manifest
+from barcode_core.naming import plan_outputs
+
+
+def batch(values, directory, **kwargs):
+    return list(run_batch(plan_outputs(values, str(directory)), workers=1, **kwargs))
+
+
+def test_resume_skips_finished_items(tmp_path):
+    manifest_path = str(tmp_path / "manifest.jsonl")
+    with Manifest(manifest_path) as manifest:
+        first = batch(["a", "b", "c", "d"], tmp_path, manifest=manifest)
+    os.remove(first[2].output_path)
+    with Manifest(manifest_path) as manifest:
+        assert manifest.resume_point() == (2, None)
+        second = batch(["a", "b", "c", "d"], tmp_path, manifest=manifest)
+    assert [result.resumed for result in second] == [True, True, False, True]
+    assert os.path.exists(first[2].output_path)
+
+
+def test_resume_refuses_other_settings(tmp_path):
+    manifest_path = str(tmp_path / "manifest.jsonl")
+    with Manifest(manifest_path) as manifest:
+        batch(["a"], tmp_path, manifest=manifest)
+    with Manifest(manifest_path) as manifest, pytest.raises(ValueError):
+        batch(["a"], tmp_path, manifest=manifest, box_size=3)
+
+
+def test_command_line_resume_counts(tmp_path, capsys):
+    source = tmp_path / "values.txt"
+    source.write_text("a\nb\nc\nd\n")
+    out = tmp_path / "out"
+    argv = ["-i", str(source), "--output-dir", str(out), "--resume", "--workers", "1"]
+    assert main(argv) == 0
+    assert "4 of 4 codes written" in capsys.readouterr().out
+    os.remove(out / "000003_d.png")
+    assert main(argv) == 0
+    assert "1 of 1 codes written" in capsys.readouterr().out
+    assert main(argv) == 0
+    assert "4 already done" in capsys.readouterr().out
+
+
+def test_changed_or_corrupt_files_run_again(tmp_path):
+    manifest_path = str(tmp_path / "manifest.jsonl")
+    with Manifest(manifest_path) as manifest:
+        first = batch(["a", "b", "c"], tmp_path, manifest=manifest)
+    # Same size, different bytes: only --verify notices.
+    with open(first[1].output_path, 'r+b') as f:
+        f.seek(-1, os.SEEK_END)
+        f.write(b"\0")
+    with Manifest(manifest_path) as manifest:
+        assert manifest.is_done(1)
+    with Manifest(manifest_path, verify=True) as manifest:
+        assert not manifest.is_done(1) and manifest.is_done(2)
+
+
+def test_record_cut_short_is_ignored(tmp_path):
+    manifest_path = tmp_path / "manifest.jsonl"
+    with Manifest(str(manifest_path)) as manifest:
+        batch(["a", "b"], tmp_path, manifest=manifest)
+    with open(manifest_path, 'a') as f:
+        f.write('{"index": 2, "off')
+    with Manifest(str(manifest_path)) as manifest:
+        assert manifest.resume_point() == (1, None)
+        manifest.record(2, None, "x", error="failed")
+    lines = manifest_path.read_text().splitlines()
+    assert json.loads(lines[-1])['index'] == 2
+
+
+def test_failed_items_are_not_done(tmp_path):
+    manifest_path = str(tmp_path / "manifest.jsonl")
+    with Manifest(manifest_path) as manifest:
+        results = batch(["1234567", "bad", "7654321"], tmp_path, manifest=manifest, barcode_type='EAN8')
+    assert results[1].error
+    with Manifest(manifest_path) as manifest:
+        assert [manifest.is_done(index) for index in range(3)] == [True, False, True]
+        assert manifest.resume_point() == (1, None)
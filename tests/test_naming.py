@@ -0,0 +1,55 @@
+import os
+
+import pytest
+
+from barcode_core.naming import OutputNamer, index_prefixed, plan_outputs, sanitize_filename
+from barcode_core.readers import Row
+
+
+def test_sanitize_replaces_unsafe_characters():
+    assert sanitize_filename('a/b\\c:d*e?"f<g>h|i\x01') == "a_b_c_d_e__f_g_h_i_"
+    assert sanitize_filename("  name. ") == "name"
+    assert sanitize_filename("...") == "_"
+    assert sanitize_filename("x" * 100) == "x" * 80
+
+
+@pytest.mark.parametrize('value', ["CON", "nul", "com1.txt", "LPT9"])
+def test_sanitize_prefixes_reserved_names(value):
+    assert sanitize_filename(value) == "_" + value
+
+
+def test_templates():
+    namer = OutputNamer("out", "{type}-{index:03d}-{data}.{ext}", ext=".SVG", barcode_type="QR Code")
+    assert namer(7, "a/b") == os.path.join("out", "QR Code-007-a_b.svg")
+    assert namer(8, "x", barcode_type="EAN13") == os.path.join("out", "EAN13-008-x.svg")
+    with pytest.raises(ValueError):
+        OutputNamer("out", "{missing}.{ext}")
+
+
+def test_collisions_get_suffixes():
+    namer = OutputNamer("", "{data}.{ext}")
+    names = [namer(index, data) for index, data in enumerate(["a", "A", "a", "a_1"])]
+    assert names == ["a.png", "A_1.png", "a_2.png", "a_1_1.png"]
+
+
+def test_explicit_names_get_extension_and_suffix():
+    namer = OutputNamer("")
+    assert namer(0, "x", name="label") == "label.png"
+    assert namer(1, "y", name="label") == "label_1.png"
+    assert namer(2, "z", name="LABEL.png") == "LABEL_2.png"
+
+
+def test_index_prefixed():
+    assert index_prefixed("{index:06d}_{data}.{ext}")
+    assert index_prefixed("{index}-{data}.{ext}")
+    assert not index_prefixed("{index}{data}.{ext}")
+    assert not index_prefixed("x{index}_{data}.{ext}")
+    assert not index_prefixed("{data}_{index}.{ext}")
+
+
+def test_plan_outputs(tmp_path):
+    directory = str(tmp_path / "new")
+    items = list(plan_outputs(["a", Row("b", {'output': "b-name", 'type': "EAN8"}, 12)], directory, start=5))
+    assert os.path.isdir(directory)
+    assert items == [("a", os.path.join(directory, "000005_a.png")),
+                     ("b", os.path.join(directory, "b-name.png"), {'type': "EAN8"}, 12)]
@@ -0,0 +1,95 @@
+import io
+
+import pytest
+from PIL import Image
+
+from barcode_core import output
+from barcode_core.cache import configure_cache
+
+
+def count_encodes(monkeypatch):
+    calls = []
+    encode = output.encode_symbol
+
+    def counting(*args, **kwargs):
+        calls.append(args)
+        return encode(*args, **kwargs)
+    monkeypatch.setattr(output, 'encode_symbol', counting)
+    return calls
+
+
+def test_save_code_encodes_a_png_once_and_then_uses_the_cache(tmp_path, monkeypatch):
+    calls = count_encodes(monkeypatch)
+    paths = [tmp_path / f"{i}.png" for i in range(3)]
+    for path in paths:
+        output.save_code("hello", str(path))
+    assert len(calls) == 1
+    assert paths[0].read_bytes() == paths[1].read_bytes() == paths[2].read_bytes()
+    assert Image.open(paths[0]).size == (290, 290)
+
+
+def test_save_code_without_cache_encodes_once_per_save(tmp_path, monkeypatch):
+    configure_cache(0)
+    calls = count_encodes(monkeypatch)
+    output.save_code("hello", str(tmp_path / "a.tiff"))
+    assert len(calls) == 1
+
+
+def test_save_formats_writes_every_format_from_one_encode(tmp_path, monkeypatch):
+    calls = count_encodes(monkeypatch)
+    paths = output.format_paths(str(tmp_path / "code.png"), ["svg", "pdf", "xpm"])
+    results = output.save_formats("hello", paths)
+    assert len(calls) == 1
+    assert [result.error is None for result in results] == [True, True, True, False]
+    assert (tmp_path / "code.svg").read_bytes().startswith(b"<?xml")
+    assert (tmp_path / "code.pdf").read_bytes().startswith(b"%PDF")
+
+
+def saved_params(monkeypatch):
+    params = []
+    save = Image.Image.save
+
+    def recording(img, fp, format=None, **kwargs):
+        params.append((format, img.mode, kwargs))
+        return save(img, fp, format, **kwargs)
+    monkeypatch.setattr(Image.Image, 'save', recording)
+    return params
+
+
+@pytest.mark.parametrize('profile, expected', [
+    ('default', {}),
+    ('fastest', {'compress_level': 1}),
+    ('smallest', {'optimize': True}),
+])
+def test_profiles_select_png_encoder_settings(monkeypatch, profile, expected):
+    configure_cache(0)
+    params = saved_params(monkeypatch)
+    content = output.render_bytes("hello", 'png', profile=profile)
+    assert params == [('PNG', 'P', expected)]
+    assert Image.open(io.BytesIO(content)).size == (290, 290)
+
+
+def test_smallest_tiff_is_group4_for_black_on_white():
+    configure_cache(0)
+    plain = Image.open(io.BytesIO(output.render_bytes("hello", 'tiff', profile='smallest')))
+    assert (plain.mode, plain.info['compression']) == ('1', 'group4')
+    colored = Image.open(io.BytesIO(output.render_bytes("hello", 'tiff', fill_color="red", profile='smallest')))
+    assert (colored.mode, colored.info['compression']) == ('P', 'tiff_adobe_deflate')
+    fastest = Image.open(io.BytesIO(output.render_bytes("hello", 'tiff', profile='fastest')))
+    assert fastest.info['compression'] == 'packbits'
+
+
+def test_unknown_profile():
+    with pytest.raises(ValueError, match="Unknown output profile 'tiny'"):
+        output.render_bytes("hello", 'png', profile='tiny')
+    with pytest.raises(ValueError):
+        output.save_code("hello", "unused.png", profile='tiny')
+
+
+def test_encode_stats(tmp_path):
+    content, stats = output.timed_render("hello", 'webp', profile='fastest')
+    assert (stats.extension, stats.profile, stats.size) == ('webp', 'fastest', len(content))
+    assert stats.seconds >= 0
+    path = tmp_path / "code.png"
+    stats = output.save_code("hello", str(path), profile='smallest')
+    assert (stats.extension, stats.profile, stats.size) == ('png', 'smallest', path.stat().st_size)
@@ -0,0 +1,10 @@
+from barcode_core.pipeline import bounded_imap
+
+
+def test_bounded_imap_keeps_order():
+    values = list(range(50))
+    assert list(bounded_imap(abs, (-value for value in values), workers=2, chunksize=3)) == values
+
+
+def test_bounded_imap_runs_small_input_in_process():
+    assert list(bounded_imap(lambda value: value * 2, [1, 2, 3], workers=4)) == [2, 4, 6]
@@ -0,0 +1,83 @@
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+from PIL import Image
+
+from barcode_core.preview import PREVIEW_SIZE, PreviewWorker, generate_preview
+
+
+def test_preview_fits_the_canvas_with_whole_pixel_modules():
+    small = generate_preview("hi", box_size=1, border=0)
+    assert small.size == (588, 588)
+    large = generate_preview("hi", box_size=100)
+    assert large.width <= PREVIEW_SIZE[0] and large.height <= PREVIEW_SIZE[1]
+    barcode = generate_preview("123456789012", 'EAN13')
+    assert barcode.width <= PREVIEW_SIZE[0] and barcode.height <= PREVIEW_SIZE[1]
+
+
+def test_cached_preview_skips_png_encoding(monkeypatch):
+    first = generate_preview("cached preview")
+
+    def fail(*args, **kwargs):
+        raise AssertionError("the preview cache must not go through a file format")
+    monkeypatch.setattr(Image.Image, 'save', fail)
+    monkeypatch.setattr(Image, 'open', fail)
+    second = generate_preview("cached preview")
+    assert np.array_equal(np.asarray(second), np.asarray(first))
+    assert generate_preview("cached preview", size=(100, 100)).size != first.size
+
+
+def wait_for_result(worker, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        result = worker.poll()
+        if result is not None:
+            return result
+        time.sleep(0.01)
+    raise AssertionError("no preview result")
+
+
+def test_newer_request_cancels_the_queued_job_of_a_superseded_render():
+    jobs = []
+    started = threading.Semaphore(0)
+
+    def render(token, value):
+        job = Future()
+        jobs.append(job)
+        token.on_cancel(job.cancel)
+        started.release()
+        return job.result(timeout=5)
+
+    worker = PreviewWorker(render)
+    worker.submit("old")
+    assert started.acquire(timeout=5)
+    generation = worker.submit("new")
+    assert jobs[0].cancelled()
+    assert started.acquire(timeout=5)
+    jobs[1].set_result("image")
+    result = wait_for_result(worker)
+    assert (result.generation, result.image, result.error) == (generation, "image", None)
+    assert len(jobs) == 2
+    worker.close()
+
+
+def test_worker_is_idle_once_the_last_result_is_ready():
+    release = threading.Event()
+
+    def render(token, value):
+        release.wait(timeout=5)
+        return value
+
+    worker = PreviewWorker(render)
+    assert not worker.busy()
+    worker.submit("image")
+    assert worker.busy()
+    release.set()
+    deadline = time.monotonic() + 5
+    while worker.busy() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not worker.busy()
+    assert worker.poll().image == "image"
+    worker.close()
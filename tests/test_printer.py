@@ -0,0 +1,74 @@
+import io
+
+import pytest
+
+from barcode_core.generators import encode_symbol
+from barcode_core.printer import PrinterJob, dots, language_for, write_printer_job, zpl_field
+
+
+def label(language, dpi, data, barcode_type='QR Code', **options):
+    job = PrinterJob(io.BytesIO(), language, dpi)
+    return job.label(encode_symbol(data, barcode_type, **options), data, barcode_type, options)
+
+
+def test_dots_per_millimetre():
+    # 10 pixels at 300 dpi are 10 dots at 300 dpi and 6.77 at 203 dpi (8 dots/mm).
+    assert [dots(10, 300), dots(10, 203), dots(177, 203), dots(1, 203)] == [10, 7, 120, 1]
+    assert dots(7, 203, source_dpi=203) == 7
+
+
+def test_zpl_field_escapes_command_characters():
+    assert zpl_field("a^b~c_d é") == "a_5Eb_7Ec_5Fd _C3_A9"
+
+
+@pytest.mark.parametrize('dpi, expected', [
+    (203, b"^XA^CI28^PW231^LL231^LH0,0^FO28,28^BQN,2,7^FH^FDMA,a_5Eb_7Ec^FS^XZ\n"),
+    (300, b"^XA^CI28^PW330^LL330^LH0,0^FO40,40^BQN,2,10^FH^FDMA,a_5Eb_7Ec^FS^XZ\n"),
+])
+def test_zpl_qr_code(dpi, expected):
+    assert label('zpl', dpi, "a^b~c", error_correction='M', version=2) == expected
+
+
+@pytest.mark.parametrize('dpi, expected', [
+    (203, b"^XA^CI28^PW173^LL179^LH0,0^FO39,6^BY1,3^BEN,120,Y,N^FH^FD123456789012^FS^XZ\n"),
+    (300, b"^XA^CI28^PW346^LL271^LH0,0^FO78,12^BY2,3^BEN,177,Y,N^FH^FD123456789012^FS^XZ\n"),
+])
+def test_zpl_ean13_leaves_the_check_digit_to_the_printer(dpi, expected):
+    assert label('zpl', dpi, "123456789012", 'EAN13') == expected
+
+
+@pytest.mark.parametrize('dpi, expected', [
+    (203, b'\nN\nq157\nQ186,24\nB15,6,0,3C,1,3,120,B,"ABC-1"\nP1\n'),
+    (300, b'\nN\nq314\nQ281,24\nB30,12,0,3C,2,6,177,B,"ABC-1"\nP1\n'),
+])
+def test_epl_code39(dpi, expected):
+    assert label('epl', dpi, "abc-1", 'Code39') == expected
+
+
+def test_epl_quotes_and_bitmap_fallback():
+    assert b'"a\\"b"' in label('epl', 203, 'a"b', 'Code128')
+    aztec = label('epl', 300, "hello", 'Aztec')
+    symbol = encode_symbol("hello", 'Aztec')
+    width, height = symbol.size()
+    assert aztec.startswith(f"\nN\nq{width}\nQ{height},24\nGW0,0,{-(-width // 8)},{height},".encode())
+    zpl = label('zpl', 300, "hello", 'Aztec')
+    total = -(-width // 8) * height
+    assert zpl.startswith(f"^XA^CI28^PW{width}^LL{height}^LH0,0^FO0,0^GFA,{total},{total},{-(-width // 8)},".encode())
+
+
+def test_job_writes_labels_and_reuses_repeats():
+    target = io.BytesIO()
+    result = write_printer_job(["1234567", "7654321", "bad", "1234567"], target, 'zpl', 'EAN8', dpi=203, workers=1)
+    assert (result.written, result.reused) == (3, 1)
+    assert [(index, data) for index, data, _ in result.failed] == [(2, "bad")]
+    labels = target.getvalue().splitlines()
+    assert len(labels) == 3 and labels[0] == labels[2] != labels[1]
+    assert b"^B8N," in labels[0] and b"^FD1234567^FS" in labels[0]
+
+
+def test_language_and_settings():
+    assert [language_for(name) for name in ("a.EPL", "a.zpl", "a", io.BytesIO())] == ['epl', 'zpl', 'zpl', 'zpl']
+    with pytest.raises(ValueError):
+        PrinterJob(io.BytesIO(), 'dpl')
+    with pytest.raises(ValueError):
+        PrinterJob(io.BytesIO(), 'zpl', dpi=0)
@@ -0,0 +1,59 @@
+import io
+
+import pytest
+
+from barcode_core.readers import Row, detect_format, read_csv, read_jsonl, read_lines, read_rows
+
+
+def test_csv_rows_carry_overrides_and_offsets(tmp_path):
+    source = tmp_path / "rows.csv"
+    source.write_text("data,type,box_size,unknown\n123,EAN8,,x\n456,,3,y\n")
+    rows = list(read_rows(str(source)))
+    assert [(row.data, row.overrides) for row in rows] == [("123", {'type': 'EAN8'}), ("456", {'box_size': '3'})]
+    assert [row.data for row in read_rows(str(source), start=rows[1].offset)] == ["456"]
+
+
+def test_csv_quoted_fields_and_byte_order_mark(tmp_path):
+    source = tmp_path / "rows.csv"
+    content = '\ufeffData,Output\n"a,b",first\n\n"line\nbreak",\n'.encode('utf-8')
+    source.write_bytes(content)
+    rows = list(read_csv(str(source)))
+    assert [(row.data, row.overrides) for row in rows] == [("a,b", {'output': "first"}), ("line\nbreak", {})]
+    assert [row.offset for row in rows] == [content.index(b'"a,b"'), content.index(b'"line')]
+
+
+def test_csv_needs_a_data_column(tmp_path):
+    source = tmp_path / "rows.csv"
+    source.write_text("value\n1\n")
+    with pytest.raises(ValueError):
+        list(read_csv(str(source)))
+
+
+def test_jsonl_objects_and_strings(tmp_path):
+    source = tmp_path / "rows.jsonl"
+    content = '{"data": 12, "fill_color": "red", "other": 1}\n\n"plain"\n'
+    source.write_text(content)
+    rows = list(read_jsonl(str(source)))
+    assert rows == [Row("12", {'fill_color': "red"}, 0), Row("plain", {}, content.index('"plain"'))]
+
+
+@pytest.mark.parametrize('line', ['{"data": ', '5', '[1, 2]', 'true', 'null'])
+def test_jsonl_rejects_other_values(tmp_path, line):
+    source = tmp_path / "rows.jsonl"
+    source.write_text('"ok"\n' + line + '\n')
+    with pytest.raises(ValueError, match="at byte 5"):
+        list(read_jsonl(str(source)))
+
+
+def test_lines_keep_commas_and_skip_blank_lines():
+    stream = io.BytesIO(b"a,b\r\n\nc\n")
+    assert list(read_lines(stream)) == [Row("a,b", {}, 0), Row("c", {}, 6)]
+    with pytest.raises(ValueError):
+        list(read_lines(io.BytesIO(b"a\n"), start=1))
+
+
+def test_format_detection():
+    formats = [detect_format(name) for name in ("a.CSV", "a.jsonl", "a.ndjson", "a.txt", "-")]
+    assert formats == ['csv', 'jsonl', 'jsonl', 'lines', 'lines']
+    with pytest.raises(ValueError):
+        read_rows("a.txt", "xml")
@@ -0,0 +1,30 @@
+from barcode_core.registry import import_costs, startup_report
+
+# Libraries that only the renderers and writers need.
+HEAVY_PACKAGES = ('numpy', 'PIL', 'reportlab', 'qrcode', 'barcode')
+
+
+def loaded_packages(statement):
+    return {cost.module.split('.')[0] for cost in import_costs(statement)}
+
+
+def test_package_import_loads_no_rendering_library():
+    assert not loaded_packages("import barcode_core") & set(HEAVY_PACKAGES)
+
+
+def test_command_line_parser_loads_no_rendering_library():
+    statement = "from barcode_core.cli import build_parser; build_parser()"
+    assert not loaded_packages(statement) & set(HEAVY_PACKAGES)
+
+
+def test_png_command_loads_no_pdf_or_batch_modules(tmp_path):
+    statement = f"from barcode_core.cli import main; main(['1234', '-o', {str(tmp_path / 'a.png')!r}])"
+    modules = {cost.module for cost in import_costs(statement)}
+    assert 'PIL' in modules and 'reportlab' not in modules
+    assert not {'barcode_core.batch', 'barcode_core.sheet', 'barcode_core.printer', 'barcode_core.tiff'} & modules
+
+
+def test_startup_report_lists_packages():
+    report = startup_report("import barcode_core")
+    assert report.startswith("import barcode_core: ")
+    assert "barcode_core" in report
@@ -0,0 +1,68 @@
+import time
+from concurrent.futures import CancelledError
+
+import pytest
+
+from barcode_core.scheduler import BatchCancelled, Scheduler
+
+
+def slow_square(value, seconds=0.05):
+    time.sleep(seconds)
+    return value * value
+
+
+def square_all(values, mapper):
+    return list(mapper(slow_square, values, chunksize=1))
+
+
+def wait_until(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = Scheduler(workers=1)
+    yield scheduler
+    scheduler.shutdown()
+
+
+def test_interactive_jobs_go_ahead_of_queued_batch_items(scheduler):
+    job = scheduler.start(square_all, range(20), total=20)
+    wait_until(lambda: job.done >= 1)
+    assert scheduler.submit(slow_square, 3).result(timeout=10) == 9
+    assert job.done < 10
+    assert job.future.result(timeout=30) == [value * value for value in range(20)]
+    assert job.progress().done == 20
+
+
+def test_cancelling_a_paused_batch_lets_its_progress_move_on(scheduler):
+    job = scheduler.start(square_all, range(100), total=100)
+    wait_until(lambda: job.done >= 1)
+    job.pause()
+    wait_until(lambda: job.progress().paused)
+    job.cancel()
+    with pytest.raises(BatchCancelled):
+        job.future.result(timeout=10)
+    first = job.progress()
+    time.sleep(0.05)
+    second = job.progress()
+    assert not second.paused
+    assert second.elapsed > first.elapsed
+    assert second.done < 100
+
+
+def test_shutdown_resolves_running_jobs_and_cancels_the_rest():
+    scheduler = Scheduler(workers=1)
+    scheduler.warm_up()[0].result(timeout=30)
+    running = scheduler.submit(slow_square, 4, 0.3)
+    wait_until(lambda: running.running())
+    queued = scheduler.submit(slow_square, 5)
+    scheduler.shutdown()
+    assert running.result(timeout=1) == 16
+    assert queued.cancelled()
+    late = scheduler.submit(slow_square, 6)
+    with pytest.raises(CancelledError):
+        late.result(timeout=1)
@@ -0,0 +1,97 @@
+import asyncio
+import io
+import zipfile
+
+import pytest
+from PIL import Image
+
+from barcode_core.cache import RenderCache, configure_cache
+from barcode_core.server import RenderServer
+
+
+async def request(port, method, target, headers=(), body=b""):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    head = [f"{method} {target} HTTP/1.1", "Host: localhost", "Connection: close",
+            f"Content-Length: {len(body)}", *headers]
+    writer.write(("\r\n".join(head) + "\r\n\r\n").encode('latin-1') + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, content = response.partition(b"\r\n\r\n")
+    lines = head.decode('latin-1').split("\r\n")
+    fields = dict(line.split(": ", 1) for line in lines[1:])
+    if fields.get('Transfer-Encoding') == 'chunked':
+        chunks = []
+        while True:
+            size, _, content = content.partition(b"\r\n")
+            size = int(size, 16)
+            if not size:
+                break
+            chunks.append(content[:size])
+            content = content[size + 2:]
+        content = b"".join(chunks)
+    return int(lines[0].split(" ")[1]), fields, content
+
+
+def serve(scenario):
+    async def run():
+        server = RenderServer(port=0, workers=1)
+        await server.start()
+        try:
+            await scenario(server.port)
+        finally:
+            server.close()
+    asyncio.run(run())
+
+
+def test_render_answers_a_matching_etag_with_304():
+    async def scenario(port):
+        status, headers, content = await request(port, 'GET', "/render.png?data=hello&box_size=4")
+        assert status == 200 and headers['Content-Type'] == 'image/png'
+        assert Image.open(io.BytesIO(content)).size == (116, 116)
+        etag = headers['ETag']
+        status, headers, content = await request(port, 'GET', "/render.png?data=hello&box_size=4",
+                                                 [f"If-None-Match: {etag}"])
+        assert (status, headers['ETag'], content) == (304, etag, b"")
+        status, _, content = await request(port, 'GET', "/render?data=bad&type=EAN13&format=svg")
+        assert status == 400 and b"EAN code can only contain numbers" in content
+    serve(scenario)
+
+
+def test_render_never_reads_the_disk_cache_on_the_event_loop(tmp_path, monkeypatch):
+    configure_cache(directory=str(tmp_path))
+    read_disk = RenderCache.read_disk
+
+    def checked(self, key):
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return read_disk(self, key)
+        raise AssertionError("disk read on the event loop")
+    monkeypatch.setattr(RenderCache, 'read_disk', checked)
+
+    async def scenario(port):
+        for _ in range(2):
+            status, _, _ = await request(port, 'GET', "/render.svg?data=disk")
+            assert status == 200
+    serve(scenario)
+    assert any(path.is_file() for path in tmp_path.rglob('*'))
+
+
+@pytest.mark.parametrize('archive', ['zip', 'tar'])
+def test_batch_streams_an_archive_with_failures_listed(archive):
+    async def scenario(port):
+        body = b"123456789012\nnot a number\n123456789012\n"
+        status, headers, content = await request(port, 'POST', f"/batch?type=EAN13&archive={archive}", body=body)
+        assert status == 200
+        if archive == 'zip':
+            with zipfile.ZipFile(io.BytesIO(content)) as members:
+                names = members.namelist()
+                assert b"not a number" in members.read('errors.txt')
+        else:
+            import tarfile
+            with tarfile.open(fileobj=io.BytesIO(content)) as members:
+                names = members.getnames()
+        assert len([name for name in names if name.endswith('.png')]) == 2
+        assert 'errors.txt' in names
+    serve(scenario)
@@ -0,0 +1,114 @@
+import io
+import re
+import zlib
+
+import pytest
+
+from barcode_core.generators import encode_symbol
+from barcode_core.sheet import LabelSheet, parse_grid, parse_page_size, write_label_sheet
+
+OBJECT = re.compile(rb'(\d+) 0 obj\n(.*?)\nendobj\n', re.S)
+
+
+def read_pdf(content):
+    """Objects of a PDF by number, checking that the cross-reference table points at each of them."""
+    objects = {int(number): body for number, body in OBJECT.findall(content)}
+    xref = int(re.search(rb'startxref\n(\d+)\n%%EOF\n$', content).group(1))
+    entries = re.findall(rb'(\d{10}) 00000 n ', content[xref:])
+    assert len(entries) == len(objects)
+    for number, offset in enumerate(entries, 1):
+        assert content[int(offset):].startswith(b"%d 0 obj\n" % number)
+    return objects
+
+
+def stream(body):
+    return zlib.decompress(body[body.index(b'stream\n') + 7:body.rindex(b'\nendstream')]).decode('latin-1')
+
+
+def pages(objects):
+    """Content of every page in order, with the forms its resources name."""
+    tree = next(body for body in objects.values() if body.startswith(b'<</Type/Pages'))
+    result = []
+    for number in re.findall(rb'(\d+) 0 R', tree):
+        page = objects[int(number)]
+        content = objects[int(re.search(rb'/Contents (\d+) 0 R', page).group(1))]
+        forms = re.search(rb'/XObject<<(.*?)>>', page).group(1).decode()
+        result.append((stream(content), forms))
+    return result
+
+
+def test_parse_sizes():
+    assert parse_page_size("a4") == pytest.approx((595.28, 841.89), abs=0.01)
+    assert parse_page_size("100x150") == pytest.approx((283.46, 425.2), abs=0.01)
+    assert parse_grid("10x3") == (10, 3)
+    for value in ("10", "0x3"):
+        with pytest.raises(ValueError):
+            parse_grid(value)
+    with pytest.raises(ValueError):
+        parse_page_size("B7")
+
+
+def test_grid_pages_and_captions(tmp_path):
+    path = tmp_path / "sheet.pdf"
+    result = write_label_sheet([str(index) for index in range(7)], str(path), rows=2, columns=2, workers=1,
+                               caption="#{index} {data} (c)", dedupe=False)
+    assert (result.written, result.pages, result.reused, result.failed) == (7, 2, 0, [])
+    content = pages(read_pdf(path.read_bytes()))
+    assert len(content) == 2
+    captions = [re.findall(r'\((.*?)\) Tj', operators) for operators, _ in content]
+    assert captions == [[f"#{index} {index} \\(c\\)" for index in range(4)],
+                        [f"#{index} {index} \\(c\\)" for index in range(4, 7)]]
+    # Without dedupe, symbols are drawn inline.
+    assert all(" re\n" in operators and forms == "" for operators, forms in content)
+
+
+def test_cells_fill_rows_left_to_right(tmp_path):
+    path = tmp_path / "sheet.pdf"
+    with LabelSheet(str(path), page_size="100x100", rows=2, columns=2, margin=0, spacing=0) as sheet:
+        for _ in range(4):
+            sheet.add(encode_symbol("x", box_size=1, border=0))
+    operators, _ = pages(read_pdf(path.read_bytes()))[0]
+    origins = [float(value) for match in re.findall(r'q \S+ 0 0 \S+ (\S+) (\S+) cm', operators) for value in match]
+    half = 50 * 72 / 25.4
+    assert origins == pytest.approx([0, half, half, half, 0, 0, half, 0], abs=1e-3)
+
+
+def test_repeats_refer_to_one_form(tmp_path):
+    path = tmp_path / "sheet.pdf"
+    result = write_label_sheet(["a", "b", "a", "a", "b"], str(path), rows=2, columns=2, workers=1)
+    assert (result.written, result.pages, result.reused) == (5, 2, 3)
+    objects = read_pdf(path.read_bytes())
+    forms = [number for number, body in objects.items() if b'/Subtype/Form' in body]
+    assert len(forms) == 2
+    content = pages(objects)
+    placed = [re.findall(r'/(X\d+) Do', operators) for operators, _ in content]
+    a, b = (f"X{number}" for number in forms)
+    assert placed == [[a, b, a, a], [b]]
+    assert content[1][1] == f"/{b} {b[1:]} 0 R"
+
+
+def test_pages_are_written_as_they_fill():
+    target = io.BytesIO()
+    sheet = LabelSheet(target, rows=1, columns=2)
+    symbol = encode_symbol("x")
+    for _ in range(3):
+        sheet.add(symbol)
+    # The first page is in the file before the sheet is closed.
+    assert target.getvalue().count(b'/Type/Page/') == 1
+    sheet.close()
+    assert len(pages(read_pdf(target.getvalue()))) == 2
+
+
+def test_repeat_window_evicts_old_forms(tmp_path):
+    with LabelSheet(str(tmp_path / "sheet.pdf"), window=2) as sheet:
+        for key in range(3):
+            sheet.add(encode_symbol(str(key)), key=key)
+        sheet.repeat(1)
+        with pytest.raises(KeyError):
+            sheet.repeat(0)
+
+
+def test_failed_items_are_listed(tmp_path):
+    result = write_label_sheet(["1234567", "bad", "7654321"], str(tmp_path / "sheet.pdf"), 'EAN8', workers=1)
+    assert result.written == 2
+    assert [(index, data) for index, data, _ in result.failed] == [(1, "bad")]
@@ -0,0 +1,18 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from barcode_core import output, stripes
+from barcode_core.generators import encode_symbol
+from barcode_core.raster import rasterize
+
+
+@pytest.mark.parametrize('extension', ['png', 'tiff'])
+@pytest.mark.parametrize('data, barcode_type', [("striped", 'QR Code'), ("123456789012", 'EAN13')])
+def test_striped_output_matches_the_whole_image(tmp_path, monkeypatch, extension, data, barcode_type):
+    monkeypatch.setattr(stripes, 'STRIPE_PIXELS', 1000)
+    monkeypatch.setattr(stripes, 'STRIPE_ROWS', 7)
+    path = tmp_path / f"code.{extension}"
+    output.save_code(data, str(path), barcode_type, fill_color="navy", back_color="#ffeecc")
+    expected = rasterize(encode_symbol(data, barcode_type), "navy", "#ffeecc").convert('RGB')
+    assert np.array_equal(np.asarray(Image.open(path).convert('RGB')), np.asarray(expected))
@@ -0,0 +1,79 @@
+import re
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+from barcode_core.generators import encode_symbol
+from barcode_core.svg import svg_string
+from barcode_core.symbol import Symbol
+
+SVG = '{http://www.w3.org/2000/svg}'
+SUBPATH = re.compile(r'M(\d+) (\d+)h(\d+)v(\d+)h-\d+z')
+
+MODULES = [[1, 1, 1, 0],
+           [1, 1, 1, 0],
+           [0, 1, 0, 1]]
+
+
+def parse(symbol, **kwargs):
+    root = ET.fromstring(svg_string(symbol, **kwargs))
+    background, path = root.find(SVG + 'rect'), root.find(SVG + 'path')
+    rectangles = [tuple(map(int, match)) for match in SUBPATH.findall(path.get('d'))]
+    return root, background, path, rectangles
+
+
+def paint(rectangles, width, height):
+    canvas = np.zeros((height, width), dtype=np.uint8)
+    for x, y, w, h in rectangles:
+        canvas[y:y + h, x:x + w] += 1
+    return canvas
+
+
+def test_view_box_covers_matrix_and_quiet_zone():
+    symbol = Symbol(MODULES, 3, 3, (2, 2))
+    root, background, _, _ = parse(symbol)
+    assert root.get('viewBox') == "0,0,24,21"
+    assert (background.get('width'), background.get('height')) == ("24", "21")
+
+
+def test_dark_modules_are_merged_rectangles():
+    symbol = Symbol(MODULES, 3, 3, (2, 2))
+    _, _, _, rectangles = parse(symbol)
+    # The 2x3 block at the top left is one rectangle, not six.
+    assert (6, 6, 9, 6) in rectangles
+    assert len(rectangles) < np.count_nonzero(MODULES)
+    canvas = paint(rectangles, 24, 21)
+    # No overlaps, and every module is painted exactly where the matrix is dark.
+    assert canvas.max() == 1
+    expected = np.kron(np.array(MODULES, dtype=np.uint8), np.ones((3, 3), dtype=np.uint8))
+    assert np.array_equal(canvas[6:15, 6:18], expected)
+    assert canvas.sum() == expected.sum()
+
+
+def test_qr_code_geometry_matches_the_matrix():
+    symbol = encode_symbol("hello", box_size=4, border=2)
+    root, _, _, rectangles = parse(symbol)
+    size = (symbol.columns + 4) * 4
+    assert root.get('viewBox') == f"0,0,{size},{size}"
+    canvas = paint(rectangles, size, size)
+    assert np.array_equal(canvas[8::4, 8::4][:symbol.rows, :symbol.columns], symbol.modules)
+
+
+def test_colors():
+    _, background, path, _ = parse(Symbol(MODULES), fill_color="#123456", back_color="yellow")
+    assert background.get('fill') == "yellow"
+    assert path.get('fill') == "#123456"
+
+
+def test_fitted_symbols_keep_their_physical_size():
+    root, _, _, _ = parse(Symbol(MODULES, 3, 3, (2, 2), dpi=254))
+    assert (root.get('width'), root.get('height')) == ("2.400mm", "2.100mm")
+
+
+def test_linear_text_and_guards():
+    symbol = encode_symbol('123456789012', 'EAN13')
+    root, _, _, rectangles = parse(symbol)
+    assert [text.text for text in root.iter(SVG + 'text')] == ['1', '234567', '890128', '>']
+    bottom = symbol.quiet_zone[1] * symbol.module_width + symbol.module_height
+    guards = [rectangle for rectangle in rectangles if rectangle[1] == bottom]
+    assert len(guards) == 6 and all(h == symbol.guard_height for _, _, _, h in guards)
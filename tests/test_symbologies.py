@@ -0,0 +1,113 @@
+import barcode
+import numpy as np
+import pytest
+import qrcode
+from barcode.writer import ImageWriter
+
+from barcode_core.generators import encode_symbol, generate_image, mm_to_px, symbol_size_mm
+from barcode_core.raster import rasterize_mask
+from barcode_core.symbologies.linear import BARCODE_CLASSES, GUARD_TYPES, add_guard_bars
+
+LINEAR_SAMPLES = {
+    'EAN13': '123456789012',
+    'EAN8': '1234567',
+    'Code128': 'hello',
+    'Code39': 'HELLO',
+    'UPCA': '12345678901',
+    'ISBN13': '9781234567897',
+    'JAN': '4901234567894',
+    'ITF': '12345678',
+    'GS1-128': '0101234567890128',
+}
+
+# One module is exactly 3 pixels at this width, so both renderers agree on
+# where every module lies.
+MODULE_MM = 0.254
+
+
+@pytest.mark.parametrize('border, box_size', [(4, 10), (0, 3)])
+def test_qr_code_matches_the_qrcode_image_pixel_for_pixel(border, box_size):
+    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_H, box_size=box_size, border=border)
+    qr.add_data("https://example.com")
+    qr.make(fit=True)
+    expected = np.asarray(qr.make_image().convert('L')) < 128
+    mask = rasterize_mask(encode_symbol("https://example.com", box_size=box_size, border=border))
+    assert np.array_equal(mask, expected)
+
+
+def python_barcode_mask(data, barcode_type):
+    code = getattr(barcode, BARCODE_CLASSES[barcode_type])(data, writer=ImageWriter())
+    if barcode_type in GUARD_TYPES:
+        add_guard_bars(code)
+    img = code.render({'module_width': MODULE_MM, 'write_text': False, 'text': ''})
+    return np.asarray(img.convert('L')) < 128
+
+
+def module_centres(row, columns, module_px):
+    first = np.nonzero(row)[0][0]
+    return row[first + module_px // 2::module_px][:columns]
+
+
+@pytest.mark.parametrize('barcode_type', list(LINEAR_SAMPLES))
+def test_linear_bars_and_guards_match_python_barcode(barcode_type):
+    data = LINEAR_SAMPLES[barcode_type]
+    symbol = encode_symbol(data, barcode_type, module_width=MODULE_MM)
+    mask = rasterize_mask(symbol)
+    theirs = python_barcode_mask(data, barcode_type)
+    module_px = symbol.module_width
+    top = symbol.quiet_zone[1] * module_px
+    bars = module_centres(mask[top + 10], symbol.columns, module_px)
+    assert np.array_equal(bars, symbol.modules[0])
+    assert np.array_equal(bars, module_centres(theirs[top + 10], symbol.columns, module_px))
+    guard_row = top + symbol.module_height + 2
+    if barcode_type in GUARD_TYPES:
+        guards = module_centres(mask[guard_row], symbol.columns, module_px)
+        assert guards.any() and np.array_equal(guards, symbol.guards)
+        assert np.array_equal(guards, module_centres(theirs[guard_row], symbol.columns, module_px))
+    else:
+        assert symbol.guards is None
+
+
+def test_linear_quiet_zone_follows_the_python_barcode_class():
+    code39 = encode_symbol('HELLO', 'Code39')
+    ean13 = encode_symbol('123456789012', 'EAN13')
+    assert code39.quiet_zone[0] * code39.module_width == pytest.approx(mm_to_px(2.54), abs=code39.module_width)
+    assert ean13.quiet_zone[0] * ean13.module_width == pytest.approx(mm_to_px(6.5), abs=ean13.module_width)
+
+
+def test_ean13_text_is_laid_out_around_the_guards():
+    symbol = encode_symbol('123456789012', 'EAN13')
+    assert symbol.text == '1234567890128'
+    assert [text for _, text in symbol.text_blocks] == ['1', '234567', '890128', '>']
+    columns = [column for column, _ in symbol.text_blocks]
+    assert columns[0] < 0 < columns[1] < symbol.columns / 2 < columns[2] < symbol.columns < columns[3]
+    # Narrow modules shrink the font so the six-digit blocks fit between the guards.
+    assert symbol.font_size * 0.6 * 6 <= 42 * symbol.module_width
+    wide = encode_symbol('123456789012', 'EAN13', module_width=0.33)
+    assert wide.font_size > symbol.font_size
+
+
+def test_linear_module_width_is_whole_pixels_unless_fitted():
+    # 0.2 mm is 2.36 pixels at 300 dpi and is drawn 2 pixels wide.
+    plain = encode_symbol('123456789012', 'EAN13')
+    assert plain.module_width == 2
+    modules = plain.columns + 2 * plain.quiet_zone[0]
+    assert symbol_size_mm(plain)[0] == pytest.approx(modules * 2 * 25.4 / 300)
+    # A width of three pixels per module at 300 dpi is met exactly.
+    size_mm = modules * 3 * 25.4 / 300
+    fitted = encode_symbol('123456789012', 'EAN13', size_mm=size_mm, print_dpi=300)
+    assert fitted.module_width == 3
+    assert symbol_size_mm(fitted)[0] == pytest.approx(size_mm)
+
+
+@pytest.mark.parametrize('barcode_type, data', [('Aztec', 'hello'), ('PDF417', 'hello world, hello world'),
+                                                ('DataMatrix', 'hello')])
+def test_2d_symbologies_render_with_a_quiet_zone(barcode_type, data):
+    try:
+        img = generate_image(data, barcode_type)
+    except ImportError as e:
+        # pylibdmtx loads the libdmtx shared library on first use.
+        pytest.skip(str(e))
+    pixels = np.asarray(img)
+    assert img.mode == 'P'
+    assert pixels.any() and not pixels[0].any() and not pixels[:, 0].any()
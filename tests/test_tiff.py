@@ -0,0 +1,31 @@
+import numpy as np
+from PIL import Image, ImageSequence
+
+from barcode_core.generators import encode_symbol
+from barcode_core.raster import rasterize_mask
+from barcode_core.tiff import write_tiff_pages
+
+
+def test_pages_are_group4_bilevel_with_dpi(tmp_path):
+    path = tmp_path / "codes.tiff"
+    result = write_tiff_pages(["a", "b", "1234567"], str(path), dpi=600, workers=1)
+    assert (result.written, result.pages, result.reused, result.failed) == (3, 3, 0, [])
+    with Image.open(path) as img:
+        assert img.n_frames == 3
+        for frame, data in zip(ImageSequence.Iterator(img), ["a", "b", "1234567"]):
+            assert frame.mode == "1"
+            assert frame.info['compression'] == 'group4'
+            assert frame.info['dpi'] == (600, 600)
+            # Dark modules are black (0) on white.
+            assert np.array_equal(~np.asarray(frame), rasterize_mask(encode_symbol(data)))
+
+
+def test_repeats_reuse_pages(tmp_path):
+    path = tmp_path / "codes.tiff"
+    result = write_tiff_pages(["1234567", "bad", "7654321", "1234567"], str(path), 'EAN8', workers=1)
+    assert (result.written, result.reused) == (3, 1)
+    assert [(index, data) for index, data, _ in result.failed] == [(1, "bad")]
+    with Image.open(path) as img:
+        pages = [np.asarray(frame).copy() for frame in ImageSequence.Iterator(img)]
+    assert len(pages) == 3
+    assert np.array_equal(pages[0], pages[2]) and not np.array_equal(pages[0], pages[1])